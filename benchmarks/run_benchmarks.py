@@ -0,0 +1,421 @@
+"""Benchmarks of generation and finalization of synthetic Pyreball reports.
+
+Each case prints a synthetic report with the given numbers of headings,
+references, tables, figures and code blocks by `pyreball.Report`
+and measures wall time (split into printing and finalization), peak memory
+traced by `tracemalloc`, and the size of the output. Cumulative times of the
+main internal stages are measured too. The results are written into a JSON file
+and optionally compared with a baseline file produced by an earlier run.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import contextlib
+import functools
+import gc
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# metrics of time can be noisy, so they have a larger tolerance by default
+TIME_METRICS = ["wall_time_s", "print_time_s", "finalize_time_s"]
+SIZE_METRICS = ["peak_memory_bytes", "output_bytes"]
+
+# functions, whose cumulative time is measured, as (module, function name);
+# the times are inclusive, i.e. they contain the times of nested stages
+STAGES = [
+    ("pyreball.html", "print_table"),
+    ("pyreball.html", "print_figure"),
+    ("pyreball.html", "print_code_block"),
+    ("pyreball.html", "_write_to_html"),
+    ("pyreball.__main__", "_patch_references"),
+    ("pyreball.__main__", "_insert_heading_title_and_toc"),
+    ("pyreball.__main__", "_insert_js_and_css_links"),
+    ("pyreball.__main__", "_insert_inline_highlight_script"),
+]
+
+
+class Case(NamedTuple):
+    headings: int
+    references: int
+    tables: int
+    table_rows: int
+    figures: int
+    code_blocks: int
+
+
+CASES = {
+    "small": Case(
+        headings=20, references=10, tables=5, table_rows=100, figures=2, code_blocks=5
+    ),
+    "medium": Case(
+        headings=200,
+        references=100,
+        tables=20,
+        table_rows=1000,
+        figures=5,
+        code_blocks=50,
+    ),
+    "large": Case(
+        headings=1000,
+        references=500,
+        tables=50,
+        table_rows=5000,
+        figures=10,
+        code_blocks=200,
+    ),
+}
+
+CODE_SNIPPET = "\n".join(
+    f"def function_{i}(x):\n    return x * {i}  # comment {i}" for i in range(10)
+)
+
+
+def _spread(count: int, total: int) -> List[int]:
+    """Get indices of `count` elements spread evenly among `total` positions."""
+    if count <= 0:
+        return []
+    return sorted({i * total // count for i in range(count)})
+
+
+def print_synthetic_report(report: Any, case: Case) -> None:
+    """Print a synthetic report with the numbers of elements given by the case."""
+    import pyreball as pb
+
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        plt = None
+
+    positions = max(case.headings, case.tables, case.figures, case.code_blocks, 1)
+    table_positions = set(_spread(case.tables, positions))
+    figure_positions = set(_spread(case.figures, positions))
+    code_block_positions = set(_spread(case.code_blocks, positions))
+    references = [pb.Reference() for _ in range(case.references)]
+    df = (
+        pd.DataFrame({f"column_{i}": range(i, case.table_rows + i) for i in range(5)})
+        if pd is not None
+        else None
+    )
+
+    # references are assigned to the headings, the first of them to other elements
+    element_references: Iterator[Optional[Any]] = iter(references)
+    for position in range(positions):
+        if position < case.headings:
+            report.print_h2(
+                f"Section {position}", reference=next(element_references, None)
+            )
+            if references:
+                # links to preceding as well as following elements
+                report.print_div(
+                    f"See {references[position % len(references)]} "
+                    f"and {references[(position * 7 + 3) % len(references)]}."
+                )
+        if position in table_positions and df is not None:
+            report.print_table(
+                df,
+                caption=f"Table {position}",
+                reference=next(element_references, None),
+            )
+        if position in figure_positions and plt is not None:
+            fig, ax = plt.subplots()
+            ax.plot(range(100), [i * i for i in range(100)])
+            report.print_figure(
+                fig,
+                caption=f"Figure {position}",
+                reference=next(element_references, None),
+            )
+            plt.close(fig)
+        if position in code_block_positions:
+            report.print_code_block(
+                CODE_SNIPPET,
+                caption=f"Code {position}",
+                reference=next(element_references, None),
+            )
+
+
+def _get_output_size(html_path: Path) -> int:
+    size = html_path.stat().st_size
+    html_dir_path = html_path.with_suffix("")
+    if html_dir_path.is_dir():
+        size += sum(path.stat().st_size for path in html_dir_path.rglob("*"))
+    return size
+
+
+def _timed(
+    function: Callable[..., Any], stage_name: str, stage_times: Dict[str, float]
+) -> Callable[..., Any]:
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stage_times[stage_name] += time.perf_counter() - start_time
+
+    return wrapper
+
+
+def _instrument_stages() -> Dict[str, float]:
+    """Wrap the functions of the stages, so that their cumulative times are measured.
+
+    Returns:
+        Dictionary with the cumulative times, updated by the wrapped functions.
+    """
+    stage_times: Dict[str, float] = {}
+    for module_name, function_name in STAGES:
+        module = importlib.import_module(module_name)
+        stage_name = f"{module_name}.{function_name}"
+        stage_times[stage_name] = 0.0
+        setattr(
+            module,
+            function_name,
+            _timed(getattr(module, function_name), stage_name, stage_times),
+        )
+    return stage_times
+
+
+def _import_optional_dependencies() -> None:
+    for module_name in ["pandas", "matplotlib.pyplot", "pygments"]:
+        with contextlib.suppress(ImportError):
+            importlib.import_module(module_name)
+
+
+def _build_report(case: Case, html_path: Path) -> Tuple[float, float]:
+    import pyreball as pb
+
+    start_time = time.perf_counter()
+    report = pb.Report(html_path, keep_stdout=False)
+    print_synthetic_report(report, case)
+    finalize_start_time = time.perf_counter()
+    report.close()
+    end_time = time.perf_counter()
+    return finalize_start_time - start_time, end_time - finalize_start_time
+
+
+def run_case(case: Case, repeat: int) -> Dict[str, Any]:
+    """
+    Measure a case in the current process.
+
+    Times are the minimum over the repetitions, the peak memory is measured
+    by an extra run with `tracemalloc`, because tracing slows the code down.
+    """
+    stage_times = _instrument_stages()
+    # the imports of pandas and matplotlib should not be measured
+    _import_optional_dependencies()
+    with tempfile.TemporaryDirectory() as directory:
+        html_path = Path(directory) / "report.html"
+        timings = []
+        stage_timings = []
+        for i in range(repeat):
+            # each run starts with a cold cache of highlighted code
+            os.environ["PYREBALL_CACHE_DIR"] = str(Path(directory) / f"cache_{i}")
+            for stage_name in stage_times:
+                stage_times[stage_name] = 0.0
+            timings.append(_build_report(case, html_path))
+            stage_timings.append(dict(stage_times))
+        output_bytes = _get_output_size(html_path)
+
+        os.environ["PYREBALL_CACHE_DIR"] = str(Path(directory) / "cache_memory")
+        # garbage of the previous runs would be collected during the measured run
+        # at times depending on the number of repetitions
+        gc.collect()
+        tracemalloc.start()
+        _build_report(case, html_path)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    fastest = min(range(repeat), key=lambda i: sum(timings[i]))
+    print_time, finalize_time = timings[fastest]
+    return {
+        "parameters": case._asdict(),
+        "metrics": {
+            "wall_time_s": round(print_time + finalize_time, 4),
+            "print_time_s": round(print_time, 4),
+            "finalize_time_s": round(finalize_time, 4),
+            "peak_memory_bytes": peak_memory,
+            "output_bytes": output_bytes,
+        },
+        "stages": {
+            stage_name: round(stage_time, 4)
+            for stage_name, stage_time in stage_timings[fastest].items()
+        },
+    }
+
+
+def _get_pyreball_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("pyreball")
+    except Exception:
+        return "unknown"
+
+
+def run_benchmarks(case_names: List[str], repeat: int) -> Dict[str, Any]:
+    """Run each case in a new process, so that the cases do not affect each other."""
+    results: Dict[str, Any] = {
+        "metadata": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pyreball": _get_pyreball_version(),
+            "repeat": repeat,
+        },
+        "cases": {},
+    }
+    mp_context = multiprocessing.get_context("spawn")
+    for case_name in case_names:
+        with mp_context.Pool(1) as pool:
+            results["cases"][case_name] = pool.apply(
+                run_case, (CASES[case_name], repeat)
+            )
+        metrics = results["cases"][case_name]["metrics"]
+        print(
+            f"{case_name}: {metrics['wall_time_s']:.3f} s "
+            f"(print {metrics['print_time_s']:.3f} s, "
+            f"finalize {metrics['finalize_time_s']:.3f} s), "
+            f"peak memory {metrics['peak_memory_bytes'] / 2**20:.1f} MiB, "
+            f"output {metrics['output_bytes'] / 2**20:.2f} MiB"
+        )
+    return results
+
+
+def compare_with_baseline(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    time_tolerance: float,
+    size_tolerance: float,
+    compare_times: bool = False,
+) -> List[str]:
+    """
+    Compare the results with a baseline.
+
+    Times are compared only if `compare_times` is set, because they depend
+    on the machine, on which the baseline was recorded.
+
+    Returns:
+        Descriptions of the metrics that are worse than in the baseline
+        by more than the tolerance (relative).
+    """
+    metrics = (TIME_METRICS if compare_times else []) + SIZE_METRICS
+    environment_keys = ["python", "platform"]
+    baseline_environment = [baseline["metadata"][key] for key in environment_keys]
+    if compare_times and baseline_environment != [
+        results["metadata"][key] for key in environment_keys
+    ]:
+        print(
+            "Warning: the baseline was recorded with a different Python or platform "
+            f"({', '.join(baseline_environment)}), so the times are not comparable."
+        )
+    regressions = []
+    for case_name, case_results in results["cases"].items():
+        baseline_case = baseline["cases"].get(case_name)
+        if baseline_case is None:
+            continue
+        if baseline_case["parameters"] != case_results["parameters"]:
+            print(f"{case_name}: parameters differ from the baseline, skipped.")
+            continue
+        for metric in metrics:
+            value = case_results["metrics"][metric]
+            baseline_value = baseline_case["metrics"][metric]
+            tolerance = time_tolerance if metric in TIME_METRICS else size_tolerance
+            ratio = value / baseline_value if baseline_value else 1.0
+            status = "REGRESSION" if ratio > 1 + tolerance else "ok"
+            print(
+                f"{case_name} {metric}: {baseline_value} -> {value} "
+                f"({ratio - 1:+.1%}) {status}"
+            )
+            if status == "REGRESSION":
+                regressions.append(
+                    f"{case_name} {metric} {ratio - 1:+.1%} "
+                    f"(tolerance {tolerance:.0%})"
+                )
+    return regressions
+
+
+def parse_arguments(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--cases",
+        default=",".join(CASES),
+        help=f"Comma-separated names of the cases. Available: {', '.join(CASES)}.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Number of repetitions of each case."
+    )
+    parser.add_argument("--output", type=Path, help="Path to the output JSON file.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Path to a JSON file with baseline results."
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative increase of times compared to the baseline.",
+    )
+    parser.add_argument(
+        "--size-tolerance",
+        type=float,
+        default=0.05,
+        help="Allowed relative increase of peak memory and output size.",
+    )
+    parser.add_argument(
+        "--compare-times",
+        action="store_true",
+        help=(
+            "Compare also the times with the baseline. "
+            "The baseline must be recorded on the same machine."
+        ),
+    )
+    parsed_args = parser.parse_args(args)
+    unknown_cases = set(parsed_args.cases.split(",")) - set(CASES)
+    if unknown_cases:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown_cases))}.")
+    if parsed_args.repeat < 1:
+        parser.error("--repeat must be a positive integer.")
+    return parsed_args
+
+
+def main(args: List[str]) -> int:
+    parsed_args = parse_arguments(args)
+    results = run_benchmarks(parsed_args.cases.split(","), repeat=parsed_args.repeat)
+    if parsed_args.output is not None:
+        with open(parsed_args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if parsed_args.baseline is not None:
+        with open(parsed_args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(
+            results,
+            baseline,
+            time_tolerance=parsed_args.time_tolerance,
+            size_tolerance=parsed_args.size_tolerance,
+            compare_times=parsed_args.compare_times,
+        )
+        if regressions:
+            print("Regressions found:\n" + "\n".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,5 +1,11 @@
+from pyreball.cache import cached
 from pyreball.html import (
+    AsyncReport,
     Reference,
+    Report,
+    Section,
+    Sections,
+    build_sections,
     print,
     print_code_block,
     print_div,
@@ -39,8 +45,14 @@ __all__ = [
     "print_h5",
     "print_h6",
     "print_table",
+    "AsyncReport",
     "Reference",
+    "Report",
+    "Section",
+    "Sections",
+    "build_sections",
     "set_title",
+    "cached",
     "a",
     "bold",
     "code",
@@ -1,114 +1,145 @@
 import argparse
+import ast
+import base64
+import functools
+import hashlib
+import html
+import importlib
 import json
+import locale
 import logging
+import mimetypes
+import multiprocessing
+import multiprocessing.connection
 import os
 import re
+import runpy
+import shutil
+import subprocess
 import sys
 import textwrap
+import time
+import traceback
 import typing
 import xml
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
+from urllib.parse import urlparse
 from xml.dom.minidom import parseString
 
-from pyreball._common import get_default_path_to_config
+from pyreball._common import (
+    get_build_profile_path,
+    get_default_path_to_config,
+    get_references_path,
+)
 from pyreball.constants import (
+    ASSETS_DIRECTORY_NAME,
     CONFIG_INI_FILENAME,
     HTML_TEMPLATE_FILENAME,
     LINKS_INI_FILENAME,
+    RUNTIME_SCRIPT_FILENAME,
     STYLES_TEMPLATE_FILENAME,
 )
+from pyreball.utils.config_cache import get_compiled_config
+from pyreball.utils.fan_out import ArgumentSet, format_script_args, load_argument_sets
+from pyreball.utils.highlight import HIGHLIGHT_CLASS, get_highlight_style_definitions
 from pyreball.utils.param import (
     ChoiceParameter,
     IntegerParameter,
+    ParametersType,
     StringParameter,
-    Substitutor,
+    _parameter_cache,
     carefully_remove_directory_if_exists,
     check_and_fix_parameters,
     check_paging_sizes_string_parameter,
-    get_external_links_from_config,
-    get_file_config,
     merge_parameter_dictionaries,
 )
-from pyreball.utils.template import get_css, get_html
+from pyreball.utils.profiling import PROFILE_MODES, get_profile_results_path
+from pyreball.utils.template import render_css, render_html
+from pyreball.utils.trace import (
+    mark_script_start,
+    start_tracing,
+    trace_span,
+    write_trace,
+)
 
 logger = logging.getLogger(__name__)
 
+# how often the watched files are checked for changes, in seconds
+_WATCH_POLL_INTERVAL = 0.5
 
-def _replace_ids(lines: List[str]) -> List[str]:
-    """
-    Replace IDs of HTML elements to create working anchors based on references.
-
-    Args:
-        lines: Lines of the html file.
 
-    Returns:
-        Updated lines of the html file.
+def _patch_references(html_path: Path) -> None:
     """
-    # collect all ids in form of "table-N-M", "img-N-M"
-    all_table_and_img_ids = set()
-    chapter_text_replacemenets = []
-    for line in lines:
-        # we need to replace "table", "img", "code-block" and chapter IDs.
-        results = re.findall(r"table-id[\d]+-[\d]+", line)
-        if results:
-            all_table_and_img_ids.update(results)
-        results = re.findall(r"img-id[\d]+-[\d]+", line)
-        if results:
-            all_table_and_img_ids.update(results)
-        results = re.findall(r"code-block-id[\d]+-[\d]+", line)
-        if results:
-            all_table_and_img_ids.update(results)
-        # now collect heading references:
-        results = re.findall(r"ch_id[\d]+_[^\"]+", line)
-        if results:
-            all_table_and_img_ids.update(results)
-            # obtain also the heading text
-            search_result_text = re.search(results[0] + r"\">([^<]+)<", line)
-            link_text = search_result_text.group(1) if search_result_text else ""
-            search_result_id = re.search(r"_(id[\d]+)_", results[0])
-            link_id = search_result_id.group(1) if search_result_id else ""
-            if link_id and link_text:
-                chapter_text_replacemenets.append((f">{link_id}<", f">{link_text}<"))
-    # Prepare all replacement definitions for a substitutor below
-    replacements = []
-    for element_id in all_table_and_img_ids:
-        # Tables, images and code blocks:
-        re_results = re.search(r"(.+)-(id\d+)-(\d+)", element_id)
-        if re_results:
-            # this must be first
-            replacements.append(
-                (
-                    f"ref-{re_results.group(2)}",
-                    f"{re_results.group(1)}-{re_results.group(3)}",
-                )
-            )
-            # this must be second (because it would catch the first case as well)
-            replacements.append(
-                (
-                    f"{re_results.group(2)}(-{re_results.group(3)})?",
-                    re_results.group(3),
-                )
-            )
+    Fill in the links to references, so that they point to the referenced elements.
 
-        # Headings
-        re_results = re.search(r"ch_(id\d+)_(.+)", element_id)
-        if re_results:
-            # this must be first
-            replacements.append(
-                (
-                    f"ref-{re_results.group(1)}",
-                    f"ch_{re_results.group(2)}",
-                )
-            )
-            # this must be second (because it would catch the first case as well)
-            replacements.append((element_id, f"ch_{re_results.group(2)}"))
-    # add also replacements for links to chapters
-    replacements += chapter_text_replacemenets
+    While the report is printed, the positions of the links in the file and
+    the anchors of the referenced elements are recorded (see `get_references_path`).
+    Each link is then patched at its position, i.e. the ID of the reference
+    in its href attribute is replaced by the anchor, and its default text
+    by the number of the element or the text of the heading.
+    Links to references that were not used for any element are kept as they are.
 
-    # replace all table-N-M with table-M and Table N with Table M
-    substitutor = Substitutor(replacements=replacements)
-    return [substitutor.sub(line) for line in lines]
+    Args:
+        html_path: Path to the html file.
+    """
+    references_path = get_references_path(html_path)
+    if not references_path.is_file():
+        return
+    with open(references_path) as f:
+        records = [json.loads(line) for line in f]
+    os.remove(references_path)
+
+    targets: Dict[str, Tuple[str, str]] = {}
+    patches: List[Tuple[int, str, str]] = []
+    for record in records:
+        if record[0] == "target":
+            _, reference_id, anchor, text = record
+            targets[reference_id] = (anchor, text)
+        elif record[0] == "shift":
+            # the beginning of the file was rewritten after the links were written
+            patches = [
+                (offset + record[1], kind, reference_id)
+                for offset, kind, reference_id in patches
+            ]
+        else:
+            kind, offset, reference_id = record
+            patches.append((offset, kind, reference_id))
+
+    encoding = locale.getpreferredencoding(False)
+    with open(html_path, "rb") as f:
+        content = f.read()
+    parts = []
+    position = 0
+    for offset, kind, reference_id in sorted(patches):
+        if reference_id not in targets:
+            continue
+        anchor, text = targets[reference_id]
+        if kind == "link":
+            original, replacement = f"ref-{reference_id}", anchor
+        else:
+            original, replacement = reference_id, text
+        original_bytes = original.encode(encoding)
+        if content[offset : offset + len(original_bytes)] != original_bytes:
+            logger.warning(f"Link to reference {reference_id} could not be filled in.")
+            continue
+        parts += [content[position:offset], replacement.encode(encoding)]
+        position = offset + len(original_bytes)
+    parts.append(content[position:])
+    with open(html_path, "wb") as f:
+        f.write(b"".join(parts))
 
 
 def _get_node_text(node: xml.dom.minidom.Element) -> str:
@@ -218,10 +249,12 @@ def _contains_class(html_text: str, class_name: str) -> bool:
     Returns:
         True if the HTML text contains the given class name.
     """
+    # the class name must be separated by whitespace or quotes
+    # and the search must not leave the value of the attribute
     pattern = (
-        r'class\s*=\s*["\']\s*(?:\S+\s+)*'
+        r'class\s*=\s*["\'][^"\']*(?<![^\s"\'])'
         + re.escape(class_name)
-        + r'(?:\s+\S+)*\s*["\']'
+        + r'(?![^\s"\'])'
     )
     return re.search(pattern, html_text) is not None
 
@@ -247,19 +280,158 @@ def _fill_bokeh_version_in_external_links(external_links: Dict[str, List[str]])
         ]
 
 
+def _get_runtime_script_element() -> str:
+    """Get the script element with Pyreball runtime.
+
+    The runtime initializes elements whose configuration is stored
+    in `pyreball-init` JSON script elements, e.g. Plotly figures.
+    """
+    with open(get_default_path_to_config() / RUNTIME_SCRIPT_FILENAME) as f:
+        return f"<script>\n{f.read()}</script>"
+
+
+def _get_highlight_style_element() -> str:
+    """Get the style element for code highlighted at build time."""
+    return f"<style>\n{get_highlight_style_definitions()}\n</style>"
+
+
+def _copy_asset_to_assets_directory(asset_path: Path, assets_dir_path: Path) -> Path:
+    """Copy a file into the assets directory under a content-hashed name.
+
+    The file is copied only if the assets directory does not contain it yet.
+    Thanks to the hash in the name, the same file is never copied twice
+    and different versions of files with the same name do not collide.
+
+    Args:
+        asset_path: Path to the file to be copied.
+        assets_dir_path: Path to the assets directory.
+
+    Returns:
+        Path to the copied file.
+    """
+    with open(asset_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    target_path = assets_dir_path / f"{asset_path.stem}.{digest}{asset_path.suffix}"
+    if not target_path.exists():
+        assets_dir_path.mkdir(parents=True, exist_ok=True)
+        # copy through a temporary file so that no report can see a partial file
+        tmp_path = assets_dir_path / f".{target_path.name}.{os.getpid()}.tmp"
+        shutil.copyfile(asset_path, tmp_path)
+        os.replace(tmp_path, target_path)
+    return target_path
+
+
+def _localize_link(
+    link: str,
+    asset_cache_path: Path,
+    assets_dir_path: Optional[Path],
+    html_dir_path: Path,
+) -> str:
+    """Replace the remote URL in a link element by a relative path to a local copy.
+
+    The local file is looked up in the asset cache directory by the last
+    component of the URL path, e.g. `jquery-3.7.0.js`.
+    Elements without any URL, e.g. inline scripts, are returned unchanged,
+    as well as links whose file is missing in the cache.
+
+    Args:
+        link: Link element from external links config, e.g. a script element.
+        asset_cache_path: Directory with the files supplied by the user.
+        assets_dir_path: Directory, where the files are copied.
+            If None, the link points directly to the file in the cache.
+        html_dir_path: Directory with the HTML file.
+
+    Returns:
+        Link element pointing to a file in the assets directory.
+    """
+    url_pattern = r'(?:src|href)\s*=\s*["\'](?P<url>(?:https?:)?//[^"\']+)["\']'
+    m = re.search(url_pattern, link)
+    if m is None:
+        return link
+    url = m.group("url")
+    filename = Path(urlparse(url).path).name
+    asset_path = asset_cache_path / filename
+    if not filename or not asset_path.is_file():
+        logger.warning(
+            f"File '{filename}' for link {url} not found in asset cache "
+            f"directory '{asset_cache_path}'. The remote link is kept."
+        )
+        return link
+    if assets_dir_path is None:
+        target_path = asset_path
+    else:
+        target_path = _copy_asset_to_assets_directory(
+            asset_path=asset_path, assets_dir_path=assets_dir_path
+        )
+    relative_path = Path(os.path.relpath(target_path, html_dir_path)).as_posix()
+    localized_link = link.replace(url, relative_path)
+    # local files are not served with CORS headers
+    return re.sub(r'\s+crossorigin\s*=\s*["\'][^"\']*["\']', "", localized_link)
+
+
+# Groups of links that are loaded asynchronously with deferred script loading.
+# plotly.js does not depend on any other library and the runtime waits for it
+# before creating the figures, so it does not delay any other initialization.
+_ASYNC_LINK_GROUPS = {"plotly"}
+
+
+def _defer_inline_script(script_element: str) -> str:
+    """Postpone execution of an inline script until the deferred scripts are run."""
+    m = re.fullmatch(r"\s*<script>(.*)</script>\s*", script_element, re.DOTALL)
+    if m is None:
+        return script_element
+    return (
+        '<script>document.addEventListener("DOMContentLoaded", function () {'
+        f"{m.group(1)}"
+        "});</script>"
+    )
+
+
+def _make_link_non_blocking(link: str, attribute: str) -> str:
+    """Add defer or async attribute to an external script element.
+
+    Inline scripts are postponed until the document is parsed, because
+    they may use the libraries from the deferred scripts.
+    Other elements are returned unchanged.
+
+    Args:
+        link: Link element, e.g. a script element.
+        attribute: Either `defer` or `async`.
+
+    Returns:
+        Non-blocking element.
+    """
+    if re.match(r"<script\s[^>]*\bsrc\s*=", link):
+        return re.sub(r"\s*></script>", f" {attribute}></script>", link, count=1)
+    return _defer_inline_script(link)
+
+
+def _get_preload_hint(link: str) -> Optional[str]:
+    """Get preload hint element for a stylesheet link element."""
+    m = re.match(r'<link\s+rel="stylesheet"\s+href="([^"]+)"', link)
+    if m is None:
+        return None
+    return f'<link rel="preload" href="{m.group(1)}" as="style">'
+
+
 def _insert_js_and_css_links(
-    html_content: str, external_links: Dict[str, List[str]]
+    html_content: str,
+    external_links: Dict[str, List[str]],
+    link_resolver: Optional[Callable[[str], str]] = None,
+    use_jquery: bool = True,
+    deferred_scripts: bool = False,
 ) -> str:
     groups_of_links_to_add = set()
     add_jquery = False
-    if (
-        _contains_class(html_text=html_content, class_name="inline-highlight")
-        or _contains_class(html_text=html_content, class_name="block-highlight")
-        or _contains_class(html_text=html_content, class_name="pyreball-code-wrapper")
-    ):
-        add_jquery = True
+    if _contains_class(
+        html_text=html_content, class_name="inline-highlight"
+    ) or _contains_class(html_text=html_content, class_name="block-highlight"):
+        # only the inline scripts of the jquery runtime need jQuery
+        add_jquery = use_jquery
         groups_of_links_to_add.add("highlight_js")
     if _contains_class(html_text=html_content, class_name="pyreball-table-wrapper"):
+        # DataTables is a jQuery plugin even in version 2,
+        # so jQuery is needed regardless of the runtime
         add_jquery = True
         groups_of_links_to_add.add("datatables")
     if _contains_class(html_text=html_content, class_name="pyreball-altair-fig"):
@@ -270,30 +442,68 @@ def _insert_js_and_css_links(
         groups_of_links_to_add.add("bokeh")
 
     # gather all links; jquery must be first
+    groups = (["jquery"] if add_jquery else []) + sorted(groups_of_links_to_add)
+    links = []
+    for group in groups:
+        group_links = external_links[group]
+        if link_resolver is not None:
+            group_links = [link_resolver(link) for link in group_links]
+        if deferred_scripts:
+            attribute = "async" if group in _ASYNC_LINK_GROUPS else "defer"
+            group_links = [
+                _make_link_non_blocking(link, attribute) for link in group_links
+            ]
+        links += group_links
+    if deferred_scripts:
+        preload_hints = [_get_preload_hint(link) for link in links]
+        links = [hint for hint in preload_hints if hint is not None] + links
     links_to_add = "\n".join(
-        (external_links["jquery"] if add_jquery else [])
-        + [
-            el
-            for group in sorted(groups_of_links_to_add)
-            for el in external_links[group]
-        ]
+        links
+        + (
+            [_get_highlight_style_element()]
+            if _contains_class(html_text=html_content, class_name=HIGHLIGHT_CLASS)
+            else []
+        )
+        + (
+            [_get_runtime_script_element()]
+            if _contains_class(html_text=html_content, class_name="pyreball-init")
+            else []
+        )
     )
     html_content = re.sub("<!--PYREBALL_HEAD_LINKS-->", links_to_add, html_content)
     return html_content
 
 
-def _insert_inline_highlight_script(html_content: str) -> str:
+def _insert_inline_highlight_script(
+    html_content: str, use_jquery: bool = True, deferred_scripts: bool = False
+) -> str:
     if _contains_class(html_text=html_content, class_name="inline-highlight"):
-        script_text = textwrap.dedent(
-            """
-        <script>
-            $(document).ready(function () {
-                $('code.inline-highlight').each(function (i, block) {
-                    hljs.highlightBlock(block);
+        if use_jquery:
+            script_text = textwrap.dedent(
+                """
+            <script>
+                $(document).ready(function () {
+                    $('code.inline-highlight').each(function (i, block) {
+                        hljs.highlightBlock(block);
+                    });
                 });
-            });
-        </script>"""
-        )
+            </script>"""
+            )
+            if deferred_scripts:
+                # jQuery is not available before the deferred scripts are run
+                script_text = "\n" + _defer_inline_script(script_text)
+        else:
+            script_text = textwrap.dedent(
+                """
+            <script>
+                document.addEventListener("DOMContentLoaded", function () {
+                    var blocks = document.querySelectorAll("code.inline-highlight");
+                    for (var i = 0; i < blocks.length; i++) {
+                        hljs.highlightElement(blocks[i]);
+                    }
+                });
+            </script>"""
+            )
         html_content = re.sub(
             "<!--PYREBALL_INLINE_HIGHLIGHT_SCRIPT-->", script_text, html_content
         )
@@ -305,8 +515,156 @@ def _insert_inline_highlight_script(html_content: str) -> str:
     return html_content
 
 
+def _get_local_asset_path(src: str, html_dir_path: Path) -> Optional[Path]:
+    """Get path to the file referenced by a relative URL, if the file exists."""
+    if re.match(r"^(?:[a-zA-Z][a-zA-Z\d+.-]*:|//|#)", src):
+        # remote URLs, data URIs etc.
+        return None
+    path = html_dir_path / src
+    return path if path.is_file() else None
+
+
+def _write_escaped_text_file(
+    src_path: Path, tag: str, f: TextIO, chunk_size: int = 2**16
+) -> None:
+    """Copy a text file into an inline script or style element chunk by chunk.
+
+    Closing tags in the file are escaped, so that they do not terminate
+    the element prematurely.
+
+    Args:
+        src_path: Path to the copied file.
+        tag: Name of the element, i.e. `script` or `style`.
+        f: Output file.
+        chunk_size: Number of characters read at once.
+    """
+    pattern = re.compile(f"</({tag})", re.IGNORECASE)
+    tail = ""
+    with open(src_path, encoding="utf-8") as src:
+        while True:
+            chunk = src.read(chunk_size)
+            text = tail + chunk
+            if not chunk:
+                f.write(pattern.sub(r"<\\/\1", text))
+                break
+            # keep the end that can contain an incomplete closing tag for later
+            cut = text.find("<", max(0, len(text) - len(tag) - 1))
+            if cut == -1:
+                cut = len(text)
+            f.write(pattern.sub(r"<\\/\1", text[:cut]))
+            tail = text[cut:]
+
+
+def _write_base64_file(src_path: Path, f: TextIO, chunk_size: int = 3 * 2**16) -> None:
+    """Copy a binary file in base64 encoding chunk by chunk.
+
+    Args:
+        src_path: Path to the copied file.
+        f: Output file.
+        chunk_size: Number of bytes read at once. Must be divisible by 3.
+    """
+    with open(src_path, "rb") as src:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            f.write(base64.b64encode(chunk).decode("ascii"))
+
+
+def _get_file_digest(path: Path, chunk_size: int = 2**16) -> str:
+    """Get SHA-256 digest of the contents of a file, reading it chunk by chunk."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# copies the data URIs of inlined images to the images with the same contents
+_INLINED_IMAGES_SCRIPT = (
+    "<script>\n"
+    'document.querySelectorAll("img[data-pyreball-src]").forEach(function (img) {\n'
+    "  img.src = document.getElementById(img.dataset.pyreballSrc).src;\n"
+    "});\n"
+    "</script>\n"
+)
+
+_LOCAL_ASSET_PATTERN = re.compile(
+    r'<script\s+src="(?P<script>[^"]+)"[^>]*></script>'
+    r'|<link\s+rel="stylesheet"\s+href="(?P<style>[^"]+)"[^>]*>'
+    r'|<img\s+src="(?P<img>[^"]+)"'
+)
+
+
+def _inline_local_assets(html_path: Path) -> None:
+    """Inline all local files referenced by the HTML file to make it self-contained.
+
+    Scripts and stylesheets are copied into script and style elements,
+    each content only once, even if it is referenced multiple times.
+    Images are embedded as data URIs. Images with the same contents,
+    e.g. a figure printed twice, share a single data URI, which is copied
+    to the other images by a small script when the page is loaded.
+    Remote links are kept.
+    The HTML file is processed line by line and the assets are copied
+    in chunks, so the whole report is never held in memory.
+
+    Args:
+        html_path: Path to the HTML file.
+    """
+    html_dir_path = html_path.parent
+    tmp_path = html_path.with_name(f".{html_path.name}.tmp")
+    inlined_digests: Set[str] = set()
+    images_reused = False
+    with open(html_path) as f_in, open(tmp_path, "w") as f_out:
+        for line in f_in:
+            position = 0
+            for m in _LOCAL_ASSET_PATTERN.finditer(line):
+                kind = cast(str, m.lastgroup)
+                asset_path = _get_local_asset_path(m.group(kind), html_dir_path)
+                if asset_path is None:
+                    continue
+                f_out.write(line[position : m.start()])
+                position = m.end()
+                digest = _get_file_digest(asset_path)
+                if kind == "img":
+                    image_id = f"pyreball-inlined-{digest[:16]}"
+                    if digest in inlined_digests:
+                        f_out.write(f'<img data-pyreball-src="{image_id}"')
+                        images_reused = True
+                        continue
+                    inlined_digests.add(digest)
+                    mime_type = mimetypes.guess_type(asset_path.name)[0]
+                    f_out.write(f'<img id="{image_id}" src="data:{mime_type};base64,')
+                    _write_base64_file(asset_path, f_out)
+                    f_out.write('"')
+                elif digest not in inlined_digests:
+                    inlined_digests.add(digest)
+                    f_out.write(f"<{kind}>\n")
+                    _write_escaped_text_file(asset_path, kind, f_out)
+                    f_out.write(f"\n</{kind}>")
+            rest = line[position:]
+            if images_reused and "</body>" in rest:
+                body_end = rest.index("</body>")
+                rest = rest[:body_end] + _INLINED_IMAGES_SCRIPT + rest[body_end:]
+                images_reused = False
+            f_out.write(rest)
+        if images_reused:
+            f_out.write(_INLINED_IMAGES_SCRIPT)
+    os.replace(tmp_path, html_path)
+
+
 def _finish_html_file(
-    html_path: Path, include_toc: bool, external_links: Dict[str, List[str]]
+    html_path: Path,
+    include_toc: bool,
+    external_links: Dict[str, List[str]],
+    asset_cache_path: Optional[Path] = None,
+    assets_dir_path: Optional[Path] = None,
+    self_contained: bool = False,
+    use_jquery: bool = True,
+    deferred_scripts: bool = False,
 ) -> None:
     """
     Load the printed HTML and finish substitutions to make it complete.
@@ -314,20 +672,63 @@ def _finish_html_file(
     Args:
         html_path: Path to the HTML file.
         include_toc: Whether to include the table of contents.
+        external_links: Dictionary with external links.
+        asset_cache_path: Optional directory with local copies of the files
+            from external links. When set, the files used by the report
+            are copied to the assets directory and linked relatively
+            instead of the remote URLs.
+        assets_dir_path: Directory, where the files from the asset cache
+            are copied. Defaults to the assets directory next to the HTML file.
+        self_contained: Whether to inline all local files, i.e. files
+            from the asset cache and from the directory of the report,
+            into the HTML file.
+        use_jquery: Whether to use jQuery in the inline scripts. jQuery is
+            linked for DataTables regardless of this value.
+        deferred_scripts: Whether to load the scripts from external links
+            without blocking the page rendering.
     """
+    report_name = html_path.name
+    with trace_span("patch references", "finish", report_name):
+        _patch_references(html_path)
     with open(html_path) as f:
         lines = f.readlines()
 
-    lines = _replace_ids(lines)
-    lines = _insert_heading_title_and_toc(lines=lines, include_toc=include_toc)
+    with trace_span("insert title and table of contents", "finish", report_name):
+        lines = _insert_heading_title_and_toc(lines=lines, include_toc=include_toc)
 
     html_content = "".join(lines)
-    html_content = _insert_js_and_css_links(html_content, external_links)
-    html_content = _insert_inline_highlight_script(html_content)
+    link_resolver = None
+    if asset_cache_path is not None:
+        link_resolver = functools.partial(
+            _localize_link,
+            asset_cache_path=asset_cache_path,
+            assets_dir_path=(
+                None
+                if self_contained
+                else assets_dir_path or html_path.parent / ASSETS_DIRECTORY_NAME
+            ),
+            html_dir_path=html_path.parent,
+        )
+    with trace_span("insert links", "finish", report_name):
+        html_content = _insert_js_and_css_links(
+            html_content,
+            external_links,
+            link_resolver=link_resolver,
+            use_jquery=use_jquery,
+            deferred_scripts=deferred_scripts,
+        )
+    with trace_span("insert highlight script", "finish", report_name):
+        html_content = _insert_inline_highlight_script(
+            html_content, use_jquery=use_jquery, deferred_scripts=deferred_scripts
+        )
 
     with open(html_path, "w") as f:
         f.write(html_content)
 
+    if self_contained:
+        with trace_span("inline local assets", "finish", report_name):
+            _inline_local_assets(html_path)
+
 
 parameter_specifications = [
     IntegerParameter(
@@ -373,6 +774,16 @@ parameter_specifications = [
         default="no",
         help="Number the code blocks.",
     ),
+    ChoiceParameter(
+        "--code-highlighting",
+        choices=["browser", "build"],
+        default="browser",
+        help=(
+            "Where to highlight the syntax of code. Either in the browser "
+            "by highlight.js, or during the report generation by Pygments, "
+            "which must be installed. Highlighted codes are cached on disk."
+        ),
+    ),
     ChoiceParameter(
         "--align-tables",
         choices=["left", "center", "right"],
@@ -446,6 +857,14 @@ parameter_specifications = [
             "separate them either with commas or spaces."
         ),
     ),
+    ChoiceParameter(
+        "--lazy-tables",
+        choices=["yes", "no"],
+        default="no",
+        help=(
+            "Whether to initialize tables only when they are scrolled near the view."
+        ),
+    ),
     ChoiceParameter(
         "--align-figures",
         choices=["left", "center", "right"],
@@ -479,6 +898,100 @@ parameter_specifications = [
             "Only for svg format."
         ),
     ),
+    ChoiceParameter(
+        "--lazy-figures",
+        choices=["yes", "no"],
+        default="no",
+        help=(
+            "Whether to render interactive figures (Vega-Altair, Plotly, Bokeh) "
+            "only when they are scrolled near the view."
+        ),
+    ),
+    ChoiceParameter(
+        "--plotly-data-encoding",
+        choices=["json", "binary"],
+        default="json",
+        help=(
+            "How to encode the data of Plotly figures. "
+            "Either as JSON numbers, or as base64-encoded binary arrays, "
+            "which requires plotly.js 2.28 or newer."
+        ),
+    ),
+    ChoiceParameter(
+        "--altair-data-mode",
+        choices=["inline", "external"],
+        default="inline",
+        help=(
+            "Whether to inline the data of Vega-Altair charts into HTML, "
+            "or to write them into separate files in the directory of the report. "
+            "External data files are written only once "
+            "even when they are shared by multiple charts."
+        ),
+    ),
+    StringParameter(
+        "--asset-cache-path",
+        default="",
+        help=(
+            "Path to a directory with local copies of JavaScript and CSS files "
+            "from external links, named as the last part of their URLs. "
+            "When set, the files used by a report are copied "
+            f"to '{ASSETS_DIRECTORY_NAME}' directory next to the HTML file "
+            "and linked relatively, so the report can be viewed without network. "
+            "Links whose files are not found keep their remote URLs."
+        ),
+    ),
+    StringParameter(
+        "--assets-path",
+        default="",
+        help=(
+            "Path to the directory, where files from asset-cache-path are copied. "
+            f"If not set, '{ASSETS_DIRECTORY_NAME}' directory next to the HTML file "
+            "is used. Setting the same directory, e.g. in the root of an output "
+            "tree, for many reports makes them share a single copy of each file."
+        ),
+    ),
+    ChoiceParameter(
+        "--javascript-runtime",
+        choices=["jquery", "vanilla"],
+        default="jquery",
+        help=(
+            "Whether the inline scripts of the report use jQuery, or only plain "
+            "JavaScript. With the vanilla runtime, jQuery is linked only for "
+            "DataTables, which depends on it."
+        ),
+    ),
+    ChoiceParameter(
+        "--script-loading",
+        choices=["blocking", "deferred"],
+        default="blocking",
+        help=(
+            "How to load the scripts from external links. Either as blocking "
+            "scripts, or as deferred (and asynchronous where safe) scripts, "
+            "so that the page can be rendered before they are downloaded. "
+            "Ignored for self-contained reports."
+        ),
+    ),
+    ChoiceParameter(
+        "--self-contained",
+        choices=["yes", "no"],
+        default="no",
+        help=(
+            "Whether to create a single HTML file with all images, data files, "
+            "and JavaScript and CSS files from asset-cache-path embedded. "
+            "The directory with images and data files is removed afterwards."
+        ),
+    ),
+    ChoiceParameter(
+        "--build-profile",
+        choices=["no", "json", "section", "both"],
+        default="no",
+        help=(
+            "Whether to record the time and the size of each printed element. "
+            "The profile is written into '<stem>_profile.json' file next to "
+            "the HTML file (json), into a section at the end of the report "
+            "(section), or both."
+        ),
+    ),
 ]
 
 
@@ -646,6 +1159,57 @@ def parse_arguments(args: List[str]) -> Dict[str, Optional[Union[str, int]]]:
         ),
         action=PathAction,
     )
+    parser.add_argument(
+        "--watch",
+        help=(
+            "Watch the input script, local modules imported by it and the config "
+            "directory, and rebuild the report whenever any of them changes. "
+            "Press Ctrl+C to stop watching."
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--fan-out",
+        help=(
+            "Path to a CSV or JSON file with sets of script arguments. "
+            "One report is rendered for each set, in parallel processes. "
+            "In a CSV file, each row is one set and the columns are the names "
+            "of the arguments. A JSON file contains either a list of objects "
+            "with the arguments, or an object with lists of values of the arguments, "
+            "in which case all their combinations are used. "
+            "Each argument is passed to the script as '--name value', "
+            "after the arguments that follow '--'."
+        ),
+        action=PathAction,
+    )
+    parser.add_argument(
+        "--max-workers",
+        help=(
+            "Maximum number of reports rendered at the same time with --fan-out. "
+            "Defaults to the number of processors."
+        ),
+        type=int,
+    )
+    parser.add_argument(
+        "--profile",
+        help=(
+            "Run the script under cProfile (cpu) or tracemalloc (memory) "
+            "and write the functions that took most time, or the lines that "
+            "allocated most memory, into '<stem>_<mode>_profile.html' report "
+            "next to the HTML file."
+        ),
+        choices=PROFILE_MODES,
+    )
+    parser.add_argument(
+        "--trace",
+        help=(
+            "Path to a JSON file, into which the timeline of the build is written "
+            "in Chrome trace event format, e.g. for Perfetto UI. It contains "
+            "the loading of the config, the run of the script, each printed "
+            "element and each pass of finishing the HTML file."
+        ),
+        action=PathAction,
+    )
     parser.add_argument(
         "input-path",
         help=(
@@ -676,6 +1240,12 @@ def parse_arguments(args: List[str]) -> Dict[str, Optional[Union[str, int]]]:
         parser.error(
             "It is not possible to set both input-path argument and -m option."
         )
+    if variables["watch"] and variables["fan_out"] is not None:
+        parser.error("It is not possible to use both --watch and --fan-out options.")
+    if variables["fan_out"] is not None and variables["profile"] is not None:
+        parser.error("It is not possible to use both --profile and --fan-out options.")
+    if variables["max_workers"] is not None and variables["max_workers"] < 1:
+        parser.error("--max-workers must be a positive integer.")
     del variables["input-path"]
     return variables
 
@@ -700,18 +1270,820 @@ def _get_path_to_html_template() -> Path:
         )
 
 
+def _get_report_configuration(
+    cli_parameters: ParametersType, config_path: Optional[Path] = None
+) -> Tuple[ParametersType, Dict[str, Any]]:
+    """Get parameters and parsed config files for a new report.
+
+    Args:
+        cli_parameters: Checked parameters that take precedence
+            over the parameters from the config file.
+        config_path: Optional path to the config directory.
+
+    Returns:
+        A tuple of (parameters, compiled_config), where parameters contain
+        values of all parameters and compiled_config is the output
+        of `get_compiled_config` with Bokeh version filled in external links.
+    """
+    config_directory = _get_config_directory(config_path)
+    compiled_config = get_compiled_config(
+        config_directory=config_directory,
+        html_template_path=_get_path_to_html_template(),
+        parameter_specifications=parameter_specifications,
+    )
+    _fill_bokeh_version_in_external_links(
+        external_links=compiled_config["external_links"]
+    )
+    parameters = merge_parameter_dictionaries(
+        primary_parameters=cli_parameters,
+        secondary_parameters=compiled_config["parameters"],
+        parameter_specifications=parameter_specifications,
+    )
+    return parameters, compiled_config
+
+
+def _start_report_file(
+    html_path: Path,
+    parameters: ParametersType,
+    compiled_config: Dict[str, Any],
+    title: str,
+) -> str:
+    """Write the beginning of the HTML file and clean up the report directory.
+
+    Args:
+        html_path: Path to the HTML file.
+        parameters: Parameters of the report.
+        compiled_config: Output of `_get_report_configuration`.
+        title: Title of the page.
+
+    Returns:
+        The end of the HTML file that must be appended after the contents.
+    """
+    # remove the directory with images if it exists:
+    carefully_remove_directory_if_exists(directory=html_path.with_suffix(""))
+    # remove records of references from the previous run
+    references_path = get_references_path(html_path)
+    if references_path.is_file():
+        os.remove(references_path)
+    build_profile_path = get_build_profile_path(html_path)
+    if build_profile_path.is_file():
+        os.remove(build_profile_path)
+
+    css_definitions = render_css(
+        css_template=compiled_config["css_template"],
+        page_width=cast(int, parameters["page_width"]),
+    )
+    html_begin, html_end = render_html(
+        html_template=compiled_config["html_template"],
+        title=title,
+        css_definitions=css_definitions,
+    )
+    with open(html_path, "w") as f:
+        f.write(html_begin)
+    return html_end
+
+
+def _read_build_profile(html_path: Path) -> List[Dict[str, Any]]:
+    """Read and remove the records of the elements printed into the report.
+
+    Args:
+        html_path: Path to the HTML file.
+
+    Returns:
+        Records of the elements in the order of printing,
+        with the index of each element among the elements of the same type.
+    """
+    build_profile_path = get_build_profile_path(html_path)
+    if not build_profile_path.is_file():
+        return []
+    records = []
+    counts: Dict[str, int] = {}
+    with open(build_profile_path) as f:
+        for line in f:
+            record = json.loads(line)
+            counts[record["element"]] = counts.get(record["element"], 0) + 1
+            records.append(
+                {
+                    "element": record["element"],
+                    "index": counts[record["element"]],
+                    "label": record["label"],
+                    "location": record["location"],
+                    "seconds": round(record["seconds"], 6),
+                    "bytes": record["bytes"],
+                }
+            )
+    os.remove(build_profile_path)
+    return records
+
+
+def _prepare_sortable_table_html(
+    table_id: str,
+    header: List[str],
+    rows: List[List[str]],
+    sort_column: int,
+    right_aligned_columns: List[int],
+) -> str:
+    """Prepare a table initialized by DataTables, sorted in descending order.
+
+    Args:
+        table_id: ID of the element with the table.
+        header: Names of the columns.
+        rows: Rows of the table with cells already escaped.
+        sort_column: Index of the column, by which the table is sorted initially.
+        right_aligned_columns: Indices of the columns aligned to the right,
+            the other columns are aligned to the left.
+    """
+    from pyreball.html import _gather_datatables_setup, _prepare_initializer_element
+
+    table_html = (
+        '<table class="display"><thead><tr>'
+        + "".join(f"<th>{name}</th>" for name in header)
+        + "</tr></thead><tbody>\n"
+        + "\n".join(
+            "<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>"
+            for row in rows
+        )
+        + "\n</tbody></table>"
+    )
+    left_aligned_columns = [
+        i for i in range(len(header)) if i not in right_aligned_columns
+    ]
+    datatables_setup = _gather_datatables_setup(
+        sortable=True,
+        sorting_definition=[(sort_column, "desc")],
+        col_align_def=[
+            {"targets": left_aligned_columns, "className": "dt-left"},
+            {"targets": right_aligned_columns, "className": "dt-right"},
+        ],
+    )
+    return (
+        '<div class="pyreball-table-wrapper">\n'
+        '<div class="pyreball-block-fit-content pyreball-centered">'
+        f'<div id="{table_id}" class="pyreball-block-fit-content pyreball-centered">'
+        f"{table_html}\n</div></div>\n</div>\n"
+        + _prepare_initializer_element(
+            kind="datatables",
+            target_id=table_id,
+            config_json=json.dumps(datatables_setup),
+        )
+        + "\n"
+    )
+
+
+def _prepare_build_profile_html(records: List[Dict[str, Any]]) -> str:
+    """Prepare a section with a table of the printed elements, sortable by cost."""
+    total_seconds = sum(record["seconds"] for record in records)
+    total_bytes = sum(record["bytes"] for record in records)
+    rows = []
+    # the most expensive elements are shown first
+    for record in sorted(records, key=lambda record: record["seconds"], reverse=True):
+        share = 100 * record["seconds"] / total_seconds if total_seconds else 0.0
+        rows.append(
+            [
+                html.escape(record["element"]),
+                str(record["index"]),
+                html.escape(record["label"] or ""),
+                html.escape(record["location"] or ""),
+                f"{record['seconds']:.4f}",
+                f"{share:.1f}",
+                str(record["bytes"]),
+            ]
+        )
+    return (
+        '<h1 id="ch_build_profile">Build profile'
+        '<a class="pyreball-anchor-link" href="#ch_build_profile">¶</a></h1>\n'
+        f"<div>{len(records)} elements printed in {total_seconds:.3f} s, "
+        f"{total_bytes} bytes written.</div>\n"
+        + _prepare_sortable_table_html(
+            table_id="pyreball-build-profile-table",
+            header=[
+                "Element",
+                "Index",
+                "Label",
+                "Location",
+                "Time [s]",
+                "Time [%]",
+                "Size [B]",
+            ],
+            rows=rows,
+            sort_column=4,
+            right_aligned_columns=[1, 4, 5, 6],
+        )
+    )
+
+
+def _write_build_profile(html_path: Path, build_profile: str) -> None:
+    """Write the profile of the elements printed into the report.
+
+    This must be called before the end of the HTML file is written.
+
+    Args:
+        html_path: Path to the HTML file.
+        build_profile: Value of `build-profile` parameter. With `json` or `both`,
+            the profile is written into `<stem>_profile.json` file next to
+            the HTML file. With `section` or `both`, a section with a table
+            of the elements is appended to the report.
+    """
+    records = _read_build_profile(html_path)
+    if build_profile in ["json", "both"]:
+        with open(html_path.with_name(f"{html_path.stem}_profile.json"), "w") as f:
+            json.dump(
+                {
+                    "report": html_path.name,
+                    "seconds": round(sum(record["seconds"] for record in records), 6),
+                    "bytes": sum(record["bytes"] for record in records),
+                    "elements": records,
+                },
+                f,
+                indent=2,
+            )
+    if build_profile in ["section", "both"]:
+        with open(html_path, "a") as f:
+            f.write(_prepare_build_profile_html(records))
+
+
+def _complete_report_file(
+    html_path: Path,
+    parameters: ParametersType,
+    external_links: Dict[str, List[str]],
+) -> None:
+    """Finish the complete HTML file according to the parameters of the report.
+
+    Args:
+        html_path: Path to the HTML file.
+        parameters: Parameters of the report.
+        external_links: Dictionary with external links.
+    """
+    _finish_html_file(
+        html_path=html_path,
+        include_toc=parameters["toc"] == "yes",
+        external_links=external_links,
+        asset_cache_path=(
+            Path(cast(str, parameters["asset_cache_path"])).expanduser().resolve()
+            if parameters["asset_cache_path"]
+            else None
+        ),
+        assets_dir_path=(
+            Path(cast(str, parameters["assets_path"])).expanduser().resolve()
+            if parameters["assets_path"]
+            else None
+        ),
+        self_contained=parameters["self_contained"] == "yes",
+        use_jquery=parameters["javascript_runtime"] == "jquery",
+        # inlined scripts cannot be deferred, so keep the order of all scripts
+        deferred_scripts=(
+            parameters["script_loading"] == "deferred"
+            and parameters["self_contained"] != "yes"
+        ),
+    )
+    if parameters["self_contained"] == "yes":
+        # everything from the directory is embedded in the HTML file now
+        carefully_remove_directory_if_exists(directory=html_path.with_suffix(""))
+
+
+def _build_report(
+    run_script: Callable[[], Any],
+    html_path: Path,
+    cli_parameters: ParametersType,
+    config_path: Optional[Path],
+) -> None:
+    """Run the script and create the complete HTML file of the report.
+
+    Args:
+        run_script: Function that runs the script, which prints into the report.
+        html_path: Path to the output HTML file.
+        cli_parameters: Checked parameters from CLI arguments.
+        config_path: Optional path to the config directory.
+    """
+    # Directory, where HTML's images would be stored;
+    # It basically contains both the output directory and HTML filename stem
+    # in one value.
+    html_dir_path_str = str(html_path.with_suffix(""))
+    report_name = html_path.name
+
+    with trace_span("build report", "cli", report_name):
+        with trace_span("load configuration", "cli", report_name):
+            parameters, compiled_config = _get_report_configuration(
+                cli_parameters=cli_parameters, config_path=config_path
+            )
+
+        os.environ["_TMP_PYREBALL_GENERATOR_PARAMETERS"] = json.dumps(
+            {**parameters, "html_dir_path": html_dir_path_str}
+        )
+
+        with trace_span("start report file", "cli", report_name):
+            html_end = _start_report_file(
+                html_path=html_path,
+                parameters=parameters,
+                compiled_config=compiled_config,
+                title=html_path.stem,
+            )
+        try:
+            with trace_span("run script", "cli", report_name):
+                mark_script_start()
+                run_script()
+        finally:
+            with trace_span("write build profile", "cli", report_name):
+                _write_build_profile(html_path, cast(str, parameters["build_profile"]))
+            with open(html_path, "a") as f:
+                f.write(html_end)
+
+        with trace_span("finish report", "cli", report_name):
+            _complete_report_file(
+                html_path=html_path,
+                parameters=parameters,
+                external_links=compiled_config["external_links"],
+            )
+
+
+def _resolve_local_module(directory: Path, module_name: str) -> List[Path]:
+    """Get the files of a module and its parent packages that are in the directory."""
+    paths = []
+    module_path = directory
+    for part in module_name.split("."):
+        module_path = module_path / part
+        if (module_path / "__init__.py").is_file():
+            paths.append(module_path / "__init__.py")
+        elif module_path.with_suffix(".py").is_file():
+            paths.append(module_path.with_suffix(".py"))
+            break
+        else:
+            break
+    return paths
+
+
+def _find_local_imports(script_path: Path, search_directory: Path) -> List[Path]:
+    """
+    Find local modules imported by the script, recursively.
+
+    The imports are found statically, so modules imported dynamically,
+    e.g. by `importlib`, are not found.
+
+    Args:
+        script_path: Path to the script.
+        search_directory: Directory, from which absolute imports are resolved,
+            i.e. the first entry of `sys.path` of the script.
+
+    Returns:
+        Sorted paths to the files of the imported modules and packages
+        that are in the search directory.
+    """
+    found_paths: Set[Path] = set()
+    pending_paths = [script_path]
+    while pending_paths:
+        path = pending_paths.pop()
+        try:
+            tree = ast.parse(path.read_text(), filename=str(path))
+        except (OSError, SyntaxError, ValueError):
+            continue
+        imported_paths: List[Path] = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    imported_paths += _resolve_local_module(
+                        search_directory, alias.name
+                    )
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    directory = path.parents[node.level - 1]
+                else:
+                    directory = search_directory
+                module_name = node.module or ""
+                for alias in node.names:
+                    # the imported name can be a module too
+                    full_name = ".".join(filter(None, [module_name, alias.name]))
+                    imported_paths += _resolve_local_module(directory, full_name)
+        for imported_path in imported_paths:
+            imported_path = imported_path.resolve()
+            if imported_path != script_path and imported_path not in found_paths:
+                found_paths.add(imported_path)
+                pending_paths.append(imported_path)
+    return sorted(found_paths)
+
+
+def _take_snapshot(
+    paths: Sequence[Path], previous_snapshot: Dict[Path, Tuple[int, int, str]]
+) -> Dict[Path, Tuple[int, int, str]]:
+    """Get modification times, sizes and hashes of the files.
+
+    Files that do not exist are left out. The hash is computed only
+    when the modification time or the size changed since the previous snapshot.
+    """
+    snapshot = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        previous_record = previous_snapshot.get(path)
+        if previous_record is not None and previous_record[:2] == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            snapshot[path] = previous_record
+        else:
+            with open(path, "rb") as f:
+                file_hash = hashlib.sha256(f.read()).hexdigest()
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size, file_hash)
+    return snapshot
+
+
+def _get_changed_paths(
+    previous_snapshot: Dict[Path, Tuple[int, int, str]],
+    snapshot: Dict[Path, Tuple[int, int, str]],
+) -> List[Path]:
+    """Get files that were created, removed or whose contents changed."""
+    return sorted(
+        path
+        for path in previous_snapshot.keys() | snapshot.keys()
+        if previous_snapshot.get(path, (0, 0, None))[2]
+        != snapshot.get(path, (0, 0, None))[2]
+    )
+
+
+def _get_file_hash(path: Path) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _watch(
+    build: Callable[[], None],
+    get_watched_paths: Callable[[], List[Path]],
+    html_path: Path,
+    poll_interval: float = _WATCH_POLL_INTERVAL,
+    max_builds: Optional[int] = None,
+) -> None:
+    """
+    Build the report and rebuild it whenever any of the watched files changes.
+
+    Files whose modification time changed but contents did not are ignored.
+    The compiled config and the caches of highlighted code and results
+    of `pyreball.cached` functions are reused by all builds.
+
+    Args:
+        build: Function that builds the report.
+        get_watched_paths: Function that returns the files to be watched.
+            It is called after each build, because imports of the script may change.
+        html_path: Path to the output HTML file.
+        poll_interval: How often the files are checked, in seconds.
+        max_builds: Maximum number of builds. If `None`, the files are watched
+            until the process is interrupted.
+    """
+    snapshot = _take_snapshot(get_watched_paths(), {})
+    changed_paths: List[Path] = []
+    builds = 0
+    while True:
+        previous_html_hash = _get_file_hash(html_path)
+        start_time = time.perf_counter()
+        try:
+            build()
+        except Exception as e:
+            print(f"Build failed: {e}")
+        else:
+            elapsed_time = time.perf_counter() - start_time
+            html_status = (
+                "unchanged"
+                if _get_file_hash(html_path) == previous_html_hash
+                else "updated"
+            )
+            print(f"Report {html_path} {html_status}, built in {elapsed_time:.2f} s.")
+        builds += 1
+        if max_builds is not None and builds >= max_builds:
+            return
+        print("Watching for changes...")
+
+        while True:
+            time.sleep(poll_interval)
+            new_snapshot = _take_snapshot(get_watched_paths(), snapshot)
+            changed_paths = _get_changed_paths(snapshot, new_snapshot)
+            snapshot = new_snapshot
+            if changed_paths:
+                break
+        print("Changed: " + ", ".join(str(path) for path in changed_paths) + ".")
+
+
+def _build_report_in_process(
+    input_path: Path,
+    module: Optional[str],
+    script_args: List[str],
+    html_path: Path,
+    cli_parameters: ParametersType,
+    config_path: Optional[Path],
+) -> None:
+    """Build a report by running the script in the current process.
+
+    This is the target of the processes started by `_fan_out`. The exit code
+    of the process is the exit code of the script.
+    """
+    exit_codes: List[Any] = []
+
+    def run_script() -> None:
+        sys.argv = [str(input_path), *script_args]
+        # the settings of the parent process must not be used
+        _parameter_cache.clear()
+        if module is None:
+            sys.path.insert(0, str(input_path.parent))
+        else:
+            sys.path.insert(0, os.getcwd())
+        try:
+            if module is None:
+                runpy.run_path(str(input_path), run_name="__main__")
+            else:
+                runpy.run_module(module, run_name="__main__", alter_sys=True)
+        except SystemExit as e:
+            exit_codes.append(e.code)
+        except Exception:
+            # the report is finished even if the script fails, as with os.system
+            traceback.print_exc()
+            exit_codes.append(1)
+
+    _build_report(
+        run_script,
+        html_path=html_path,
+        cli_parameters=cli_parameters,
+        config_path=config_path,
+    )
+    if exit_codes:
+        sys.exit(exit_codes[0])
+
+
+def _import_script_dependencies(script_path: Path, search_directory: Path) -> None:
+    """Import the modules imported by the script that are not local.
+
+    Processes started by fork inherit the imported modules, so they do not
+    have to import them again. Local modules are not imported, because
+    they are usually part of the report. Modules that fail to import are skipped.
+    """
+    try:
+        tree = ast.parse(script_path.read_text(), filename=str(script_path))
+    except (OSError, SyntaxError, ValueError):
+        return
+    module_names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            module_names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+            module_names.append(node.module)
+    for module_name in module_names:
+        if _resolve_local_module(search_directory, module_name):
+            continue
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            logger.debug(f"Module {module_name} could not be imported in advance.")
+
+
+def _write_fan_out_index(
+    index_path: Path, results: List[Dict[str, Any]], total_time: float
+) -> None:
+    """Write a JSON file and an HTML report with the rendered reports and timings."""
+    with open(index_path.with_suffix(".json"), "w") as f:
+        json.dump({"reports": results, "seconds": round(total_time, 3)}, f, indent=2)
+
+    from pyreball.html import Report
+    from pyreball.text import code, link, ulist
+
+    with Report(
+        index_path.with_suffix(".html"), title=index_path.stem, keep_stdout=False
+    ) as report:
+        report.print_h1("Reports")
+        report.print_div(
+            f"{len(results)} reports rendered in {total_time:.2f} s, "
+            f"{sum(result['exit_code'] != 0 for result in results)} failed."
+        )
+        items = []
+        for result in results:
+            arguments = " ".join(format_script_args(result["arguments"]))
+            item = (
+                f"{link(result['output'], result['output'])}: "
+                f"{code(html.escape(arguments), syntax_highlight=None)}, "
+                f"{result['seconds']:.2f} s"
+            )
+            if result["exit_code"] != 0:
+                item += f", exit code {result['exit_code']}"
+            items.append(item)
+        report.print_div(ulist(*items))
+
+
+def _write_script_profile_report(html_path: Path, mode: str) -> None:
+    """Write a report with the results of profiling of the script next to the report.
+
+    The report is named `<stem>_<mode>_profile.html`.
+
+    Args:
+        html_path: Path to the HTML file of the profiled report.
+        mode: `cpu` or `memory`, see `run_profiled_script`.
+    """
+    results_path = get_profile_results_path(html_path)
+    if not results_path.is_file():
+        logger.warning(f"Results of profiling of the script not found: {results_path}")
+        return
+    with open(results_path) as f:
+        results = json.load(f)
+    os.remove(results_path)
+
+    from pyreball.html import Report
+    from pyreball.text import code, link
+
+    report_link = link(html_path.name, html_path.name)
+    profile_path = html_path.with_name(f"{html_path.stem}_{mode}_profile.html")
+    with Report(
+        profile_path, title=f"{html_path.stem} {mode} profile", keep_stdout=False
+    ) as report:
+        if mode == "cpu":
+            report.print_h1("CPU profile")
+            report.print_div(
+                f"The script of report {report_link} ran {results['seconds']:.3f} s "
+                f"with {results['calls']} function calls."
+            )
+            for title, key, sort_column in [
+                ("Functions by own time", "by_own_time", 3),
+                ("Functions by cumulative time", "by_cumulative_time", 4),
+            ]:
+                report.print_h2(title)
+                rows = [
+                    [
+                        html.escape(record["function"]),
+                        html.escape(record["location"] or ""),
+                        str(record["calls"]),
+                        f"{record['own_seconds']:.4f}",
+                        f"{record['cumulative_seconds']:.4f}",
+                    ]
+                    for record in results[key]
+                ]
+                report.print(
+                    _prepare_sortable_table_html(
+                        table_id=f"pyreball-profile-{key.replace('_', '-')}",
+                        header=[
+                            "Function",
+                            "Location",
+                            "Calls",
+                            "Own time [s]",
+                            "Cumulative time [s]",
+                        ],
+                        rows=rows,
+                        sort_column=sort_column,
+                        right_aligned_columns=[2, 3, 4],
+                    )
+                )
+        else:
+            report.print_h1("Memory profile")
+            report.print_div(
+                f"Peak memory traced in the script of report {report_link} "
+                f"was {results['peak_bytes'] / 2**20:.2f} MiB, "
+                f"{results['current_bytes'] / 2**20:.2f} MiB was still allocated "
+                f"at its end."
+            )
+            report.print_h2("Allocation sites")
+            report.print_div(
+                "Memory allocated by each line and not released "
+                "until the end of the script."
+            )
+            rows = [
+                [
+                    html.escape(record["location"]),
+                    code(html.escape(record["code"]), syntax_highlight=None),
+                    f"{record['bytes'] / 2**10:.1f}",
+                    str(record["blocks"]),
+                ]
+                for record in results["sites"]
+            ]
+            report.print(
+                _prepare_sortable_table_html(
+                    table_id="pyreball-profile-allocation-sites",
+                    header=["Location", "Code", "Size [KiB]", "Blocks"],
+                    rows=rows,
+                    sort_column=2,
+                    right_aligned_columns=[2, 3],
+                )
+            )
+
+
+def _fan_out(
+    argument_sets: List[ArgumentSet],
+    input_path: Path,
+    module: Optional[str],
+    script_args: List[str],
+    html_path: Path,
+    cli_parameters: ParametersType,
+    config_path: Optional[Path],
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Render one report for each argument set in parallel processes.
+
+    The reports are named by the output path with the zero-padded index
+    of the argument set, e.g. `report_001.html`. Where the platform supports it,
+    the processes are started by fork after the modules imported by the script
+    are imported in this process, so the reports do not pay for the imports again.
+    When all reports are rendered, a summary index with the arguments, outputs
+    and timings is written into `<stem>_index.json` and `<stem>_index.html`.
+
+    Args:
+        argument_sets: Sets of arguments of the script, see `format_script_args`.
+        input_path: Path to the script.
+        module: Name of the module if the script is run as a module.
+        script_args: Arguments passed to the script before the argument set.
+        html_path: Path to the HTML file, from which the paths of the reports
+            are derived.
+        cli_parameters: Checked parameters from CLI arguments.
+        config_path: Optional path to the config directory.
+        max_workers: Maximum number of reports rendered at the same time.
+            Defaults to the number of processors.
+
+    Returns:
+        The results that are written into the JSON index.
+    """
+    use_fork = "fork" in multiprocessing.get_all_start_methods()
+    mp_context = multiprocessing.get_context("fork" if use_fork else None)
+    if use_fork:
+        _import_script_dependencies(
+            input_path,
+            search_directory=input_path.parent if module is None else Path.cwd(),
+        )
+    max_workers = max_workers or os.cpu_count() or 1
+    width = len(str(len(argument_sets)))
+
+    start_time = time.perf_counter()
+    results: List[Dict[str, Any]] = [{} for _ in argument_sets]
+    pending = list(enumerate(argument_sets))
+    pending.reverse()
+    running: Dict[Any, Tuple[int, Any, float]] = {}
+    finished_count = 0
+    while pending or running:
+        while pending and len(running) < max_workers:
+            index, argument_set = pending.pop()
+            report_path = html_path.with_name(
+                f"{html_path.stem}_{index + 1:0{width}d}.html"
+            )
+            results[index] = {
+                "arguments": argument_set,
+                "output": report_path.name,
+            }
+            process = mp_context.Process(
+                target=_build_report_in_process,
+                kwargs={
+                    "input_path": input_path,
+                    "module": module,
+                    "script_args": [*script_args, *format_script_args(argument_set)],
+                    "html_path": report_path,
+                    "cli_parameters": cli_parameters,
+                    "config_path": config_path,
+                },
+            )
+            process.start()
+            running[process.sentinel] = (index, process, time.perf_counter())
+        for sentinel in multiprocessing.connection.wait(list(running)):
+            index, process, process_start_time = running.pop(sentinel)
+            process.join()
+            results[index]["exit_code"] = process.exitcode
+            results[index]["seconds"] = round(
+                time.perf_counter() - process_start_time, 3
+            )
+            finished_count += 1
+            print(
+                f"[{finished_count}/{len(argument_sets)}] "
+                f"{results[index]['output']} rendered "
+                f"in {results[index]['seconds']:.2f} s"
+                + (
+                    f" (exit code {process.exitcode})."
+                    if process.exitcode != 0
+                    else "."
+                )
+            )
+
+    total_time = time.perf_counter() - start_time
+    _write_fan_out_index(
+        html_path.with_name(f"{html_path.stem}_index"), results, total_time=total_time
+    )
+    print(f"{len(argument_sets)} reports rendered in {total_time:.2f} s.")
+    return results
+
+
 def main() -> None:
     args_dict = parse_arguments(sys.argv[1:])
-    script_args_string = " ".join(cast(List[str], args_dict.pop("script_args")))
+    script_args = cast(List[str], args_dict.pop("script_args"))
+    watch = bool(args_dict.pop("watch"))
+    fan_out_path = cast(Optional[Path], args_dict.pop("fan_out"))
+    max_workers = cast(Optional[int], args_dict.pop("max_workers"))
+    trace_path = cast(Optional[Path], args_dict.pop("trace"))
+    profile = cast(Optional[str], args_dict.pop("profile"))
+    input_module = None
     if args_dict["input_path"]:
         input_path = cast(Path, args_dict.pop("input_path"))
         input_path = input_path.expanduser().resolve()
         path_arg = str(input_path)
+        # the directory of the script is the first entry of its sys.path
+        search_directory = input_path.parent
     elif args_dict["mod"]:
         input_module = cast(str, args_dict.pop("mod"))
         input_path = _convert_module_to_path(input_module)
         input_path = input_path.expanduser().resolve()
         path_arg = f"-m {input_module}"
+        search_directory = Path.cwd()
     else:
         raise RuntimeError("input-path nor module is specified.")
     output_path = cast(Optional[Path], args_dict.pop("output_path"))
@@ -720,10 +2092,6 @@ def main() -> None:
     output_dir_path, filename_stem = _get_output_dir_and_file_stem(
         input_path, output_path
     )
-    # Directory, where HTML's images would be stored;
-    # It basically contains both the output directory and HTML filename stem
-    # in one value.
-    html_dir_path_str = str(output_dir_path / filename_stem)
     html_path = output_dir_path / f"{filename_stem}.html"
 
     cli_parameters = check_and_fix_parameters(
@@ -732,58 +2100,107 @@ def main() -> None:
         none_allowed=True,
     )
 
-    config_directory = _get_config_directory(config_path)
-    file_config_parameters = get_file_config(
-        filename=CONFIG_INI_FILENAME,
-        directory=config_directory,
-        parameter_specifications=parameter_specifications,
-    )
-    external_links = get_external_links_from_config(
-        filename=LINKS_INI_FILENAME,
-        directory=config_directory,
-    )
-    _fill_bokeh_version_in_external_links(external_links=external_links)
-
-    parameters = merge_parameter_dictionaries(
-        primary_parameters=cli_parameters,
-        secondary_parameters=file_config_parameters,
-        parameter_specifications=parameter_specifications,
-    )
+    if trace_path is not None:
+        # the spans of all builds are written when pyreball finishes
+        start_tracing(trace_path)
+    try:
+        _run_builds(
+            input_path=input_path,
+            input_module=input_module,
+            path_arg=path_arg,
+            search_directory=search_directory,
+            script_args=script_args,
+            html_path=html_path,
+            cli_parameters=cli_parameters,
+            config_path=config_path,
+            watch=watch,
+            fan_out_path=fan_out_path,
+            max_workers=max_workers,
+            profile=profile,
+        )
+    finally:
+        if trace_path is not None:
+            write_trace(trace_path)
+
+
+def _run_builds(
+    input_path: Path,
+    input_module: Optional[str],
+    path_arg: str,
+    search_directory: Path,
+    script_args: List[str],
+    html_path: Path,
+    cli_parameters: ParametersType,
+    config_path: Optional[Path],
+    watch: bool,
+    fan_out_path: Optional[Path],
+    max_workers: Optional[int],
+    profile: Optional[str] = None,
+) -> None:
+    """Build the report once, repeatedly on changes, or for each argument set."""
+    if fan_out_path is not None:
+        _fan_out(
+            argument_sets=load_argument_sets(fan_out_path),
+            input_path=input_path,
+            module=input_module,
+            script_args=script_args,
+            html_path=html_path,
+            cli_parameters=cli_parameters,
+            config_path=config_path,
+            max_workers=max_workers,
+        )
+        return
 
-    os.environ["_TMP_PYREBALL_GENERATOR_PARAMETERS"] = json.dumps(
-        {**parameters, "html_dir_path": html_dir_path_str}
+    script_args_string = " ".join(script_args)
+    # Use {sys.executable} instead of just "python" command as it may not work
+    # correctly as a PyCharm external tool
+    run_script: Callable[[], Any] = functools.partial(
+        os.system, f"{sys.executable} {path_arg} {script_args_string}"
     )
-
-    # remove the directory with images if it exists:
-    carefully_remove_directory_if_exists(directory=Path(html_dir_path_str))
-
-    css_definitions = get_css(
-        filename=STYLES_TEMPLATE_FILENAME,
-        directory=config_directory,
-        page_width=cast(int, parameters["page_width"]),
+    if profile is not None:
+        # The script is run by a wrapper, which profiles it. The arguments are
+        # passed without a shell, so that paths with spaces are kept intact.
+        run_script = functools.partial(
+            subprocess.run,
+            [
+                sys.executable,
+                "-m",
+                "pyreball.utils.profiling",
+                profile,
+                str(get_profile_results_path(html_path)),
+                *(["-m", input_module] if input_module else [str(input_path)]),
+                *script_args,
+            ],
+        )
+    build_report = functools.partial(
+        _build_report,
+        run_script,
+        html_path=html_path,
+        cli_parameters=cli_parameters,
+        config_path=config_path,
     )
 
-    html_begin, html_end = get_html(
-        template_path=_get_path_to_html_template(),
-        title=filename_stem,
-        css_definitions=css_definitions,
-    )
+    def build() -> None:
+        build_report()
+        if profile is not None:
+            _write_script_profile_report(html_path, mode=profile)
+
+    if not watch:
+        build()
+        return
+
+    def get_watched_paths() -> List[Path]:
+        config_directory = _get_config_directory(config_path)
+        return [
+            input_path,
+            *_find_local_imports(input_path, search_directory=search_directory),
+            *sorted(path for path in config_directory.iterdir() if path.is_file()),
+        ]
 
-    with open(html_path, "w") as f:
-        f.write(html_begin)
     try:
-        # Use {sys.executable} instead of just "python" command as it may not work
-        # correctly as a PyCharm external tool
-        os.system(f"{sys.executable} {path_arg} {script_args_string}")
-    finally:
-        with open(html_path, "a") as f:
-            f.write(html_end)
-
-    _finish_html_file(
-        html_path=html_path,
-        include_toc=parameters["toc"] == "yes",
-        external_links=external_links,
-    )
+        _watch(build, get_watched_paths=get_watched_paths, html_path=html_path)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import os
 import typing
 from pathlib import Path
 from typing import Dict, List, Optional, Union
@@ -20,3 +21,54 @@ def get_default_path_to_config() -> Path:
         import pkg_resources
 
         return Path(pkg_resources.resource_filename("pyreball", "cfg"))
+
+
+def get_cache_directory(name: str) -> Path:
+    """Get Path to the cache directory for the given kind of cached data.
+
+    The cache is stored in the directory set by `PYREBALL_CACHE_DIR` environment
+    variable, or in `pyreball` subdirectory of the user cache directory
+    (`$XDG_CACHE_HOME` or `~/.cache`). The directory is not created here.
+
+    Args:
+        name: Name of the kind of cached data, e.g. `highlight`.
+
+    Returns:
+        Path to the cache directory.
+    """
+    cache_root = os.environ.get("PYREBALL_CACHE_DIR")
+    if cache_root:
+        return Path(cache_root).expanduser() / name
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    user_cache_path = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+    return user_cache_path / "pyreball" / name
+
+
+def get_references_path(html_path: Path) -> Path:
+    """Get Path to the file with records of references used in an HTML file.
+
+    The records are written while the report is printed and consumed
+    when the HTML file is finished.
+
+    Args:
+        html_path: Path to the HTML file.
+
+    Returns:
+        Path to a hidden file next to the HTML file.
+    """
+    return html_path.with_name(f".{html_path.name}.references")
+
+
+def get_build_profile_path(html_path: Path) -> Path:
+    """Get Path to the file with records of the build profile of an HTML file.
+
+    The records are written while the report is printed and consumed
+    when the HTML file is finished.
+
+    Args:
+        html_path: Path to the HTML file.
+
+    Returns:
+        Path to a hidden file next to the HTML file.
+    """
+    return html_path.with_name(f".{html_path.name}.profile")
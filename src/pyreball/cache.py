@@ -0,0 +1,218 @@
+"""Caching of results of expensive computations done by report scripts."""
+
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sys
+import threading
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    cast,
+    overload,
+)
+
+from pyreball._common import get_cache_directory
+
+logger = logging.getLogger(__name__)
+
+# Increase when the structure of the cached results changes.
+_CACHE_FORMAT_VERSION = 1
+# Protocol 4 is available in all supported versions of Python.
+_PICKLE_PROTOCOL = 4
+
+DEFAULT_MAX_CACHE_SIZE = 1024**3
+
+FunctionType = TypeVar("FunctionType", bound=Callable[..., Any])
+
+
+def _get_function_source(function: Callable[..., Any]) -> str:
+    try:
+        return inspect.getsource(function)
+    except (OSError, TypeError):
+        # e.g. functions defined in an interactive session
+        code = function.__code__
+        return repr((code.co_code, code.co_consts))
+
+
+def _get_data_file_record(path: Union[str, Path]) -> List[Any]:
+    path_str = str(Path(path).expanduser().resolve())
+    try:
+        stat = os.stat(path_str)
+    except OSError:
+        # the result changes when the file is created
+        return [path_str, None, None]
+    return [path_str, stat.st_mtime_ns, stat.st_size]
+
+
+def _get_key(
+    function: Callable[..., Any],
+    args: Sequence[Any],
+    kwargs: Any,
+    data_files: Sequence[Union[str, Path]],
+) -> Optional[str]:
+    """Get the key of a function call, or `None` if the arguments cannot be pickled."""
+    try:
+        arguments = pickle.dumps(
+            (tuple(args), sorted(kwargs.items())), protocol=_PICKLE_PROTOCOL
+        )
+    except Exception:
+        return None
+    description = repr(
+        [
+            _CACHE_FORMAT_VERSION,
+            sys.version_info[:2],
+            function.__module__,
+            function.__qualname__,
+            _get_function_source(function),
+            [_get_data_file_record(path) for path in data_files],
+        ]
+    ).encode("utf-8")
+    return hashlib.sha256(description + b"\0" + arguments).hexdigest()
+
+
+def _read_cached_result(cache_path: Path) -> Any:
+    with open(cache_path, "rb") as f:
+        result = pickle.load(f)
+    # the modification time is used as the time of the last use for the eviction
+    os.utime(cache_path)
+    return result
+
+
+def _write_cached_result(cache_path: Path, result: Any, max_size: int) -> None:
+    try:
+        result_bytes = pickle.dumps(result, protocol=_PICKLE_PROTOCOL)
+    except Exception:
+        logger.warning(
+            f"Result of type {type(result).__name__} cannot be pickled, "
+            f"so it is not cached."
+        )
+        return
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # write through a temporary file so that no reader can see a partial file
+        tmp_path = (
+            cache_path.parent
+            / f".{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_path, "wb") as f:
+            f.write(result_bytes)
+        os.replace(tmp_path, cache_path)
+        _evict_cached_results(cache_path.parent, max_size=max_size)
+    except OSError:
+        # the cache is only an optimization
+        logger.debug(f"Failed to write result into cache {cache_path}.")
+
+
+def _evict_cached_results(cache_directory: Path, max_size: int) -> None:
+    """Remove the least recently used results until the cache fits into the size."""
+    entries = []
+    for entry in os.scandir(cache_directory):
+        if entry.name.endswith(".pickle"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                # removed by another process in the meantime
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_size -= size
+
+
+@overload
+def cached(function: FunctionType) -> FunctionType: ...
+
+
+@overload
+def cached(
+    *,
+    data_files: Sequence[Union[str, Path]] = (),
+    max_size: int = DEFAULT_MAX_CACHE_SIZE,
+) -> Callable[[FunctionType], FunctionType]: ...
+
+
+def cached(
+    function: Optional[FunctionType] = None,
+    *,
+    data_files: Sequence[Union[str, Path]] = (),
+    max_size: int = DEFAULT_MAX_CACHE_SIZE,
+) -> Union[FunctionType, Callable[[FunctionType], FunctionType]]:
+    """
+    Cache the results of a function on disk, so that they are reused by later runs.
+
+    The results are cached in `results` subdirectory of the Pyreball cache directory,
+    i.e. the directory set by `PYREBALL_CACHE_DIR` environment variable,
+    or `~/.cache/pyreball`. A result is reused when the function is called
+    with the same arguments, its source code is the same and the data files
+    were not modified. Note that the changes in other functions called
+    by the function are not detected.
+
+    The arguments and the results must be picklable. Arguments are compared
+    by their pickled form. Calls with arguments that cannot be pickled
+    are not cached.
+
+    Example:
+        ```python
+        @pb.cached(data_files=["sales.csv"])
+        def compute_sales_summary(region):
+            df = pd.read_csv("sales.csv")
+            return df[df["region"] == region].groupby("product").sum()
+
+        pb.print_table(compute_sales_summary("Europe"))
+        ```
+
+    Args:
+        function: The function to be cached. It is passed automatically
+            when the decorator is used without parentheses.
+        data_files: Paths to files that the function reads.
+            The result is computed again when any of them is modified.
+        max_size: Maximum size of all cached results in bytes.
+            When it is exceeded, the least recently used results are removed.
+
+    Returns:
+        The decorated function, or the decorator if `function` is not provided.
+    """
+
+    def decorator(function: FunctionType) -> FunctionType:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = _get_key(function, args, kwargs, data_files)
+            if key is None:
+                logger.debug(
+                    f"Arguments of {function.__qualname__} cannot be pickled, "
+                    f"so the result is not cached."
+                )
+                return function(*args, **kwargs)
+            cache_path = get_cache_directory("results") / f"{key}.pickle"
+            try:
+                return _read_cached_result(cache_path)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                # e.g. a result of a class that no longer exists
+                logger.debug(f"Failed to read cached result {cache_path}.")
+            result = function(*args, **kwargs)
+            _write_cached_result(cache_path, result, max_size=max_size)
+            return result
+
+        return cast(FunctionType, wrapper)
+
+    if function is not None:
+        return decorator(function)
+    return decorator
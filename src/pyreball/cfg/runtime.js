@@ -0,0 +1,115 @@
+(function () {
+    var pyreball = window.pyreball = window.pyreball || {};
+
+    // Functions that create the final element from its JSON configuration.
+    pyreball.initializers = {
+        altair: function (target, config) {
+            var spec = config.spec;
+            if (config.datasets.length > 0) {
+                spec.datasets = spec.datasets || {};
+                for (var i = 0; i < config.datasets.length; i++) {
+                    var name = config.datasets[i];
+                    spec.datasets[name] = window.pyreballAltairData[name];
+                }
+            }
+            vegaEmbed(target, spec, config.opt);
+        },
+        bokeh: function (target, config) {
+            Bokeh.embed.embed_item(config, target.id);
+        },
+        datatables: function (target, config) {
+            new DataTable(target.querySelector("table"), config);
+        },
+        plotly: function (target, config) {
+            Plotly.newPlot(target, config.data, config.layout, config.config);
+        }
+    };
+
+    // Global names defined by the libraries that the initializers use.
+    pyreball.libraries = {
+        altair: "vegaEmbed",
+        bokeh: "Bokeh",
+        datatables: "DataTable",
+        plotly: "Plotly"
+    };
+
+    // Asynchronously loaded libraries may not be ready when the document
+    // is parsed, so their initializers wait until the library is loaded.
+    var waitingCallbacks = [];
+
+    function whenLibraryReady(kind, callback) {
+        var globalName = pyreball.libraries[kind];
+        if (globalName === undefined || globalName in window) {
+            callback();
+        } else {
+            waitingCallbacks.push({globalName: globalName, callback: callback});
+        }
+    }
+
+    function runReadyCallbacks() {
+        var stillWaiting = [];
+        for (var i = 0; i < waitingCallbacks.length; i++) {
+            if (waitingCallbacks[i].globalName in window) {
+                waitingCallbacks[i].callback();
+            } else {
+                stillWaiting.push(waitingCallbacks[i]);
+            }
+        }
+        waitingCallbacks = stillWaiting;
+    }
+
+    // load events do not bubble, but they can be captured on the document
+    document.addEventListener("load", function (event) {
+        if (waitingCallbacks.length > 0 && event.target.tagName === "SCRIPT") {
+            runReadyCallbacks();
+        }
+    }, true);
+
+    // Lazy elements are initialized only when they are about to be scrolled
+    // into the view, so that pages with many elements do not freeze on load.
+    var observer = null;
+
+    function initializeWhenVisible(target, callback) {
+        if (!("IntersectionObserver" in window)) {
+            callback();
+            return;
+        }
+        if (observer === null) {
+            observer = new IntersectionObserver(function (entries) {
+                for (var i = 0; i < entries.length; i++) {
+                    if (entries[i].isIntersecting) {
+                        var visibleTarget = entries[i].target;
+                        observer.unobserve(visibleTarget);
+                        visibleTarget.pyreballInitialize();
+                    }
+                }
+            }, {rootMargin: "300px 0px"});
+        }
+        target.pyreballInitialize = callback;
+        observer.observe(target);
+    }
+
+    function initializeElement(element) {
+        var target = document.getElementById(element.getAttribute("data-target"));
+        var kind = element.getAttribute("data-kind");
+        var callback = function () {
+            whenLibraryReady(kind, function () {
+                pyreball.initializers[kind](target, JSON.parse(element.textContent));
+            });
+        };
+        if (element.hasAttribute("data-lazy")) {
+            initializeWhenVisible(target, callback);
+        } else {
+            callback();
+        }
+    }
+
+    pyreball.initialize = function () {
+        var elements = document.querySelectorAll("script.pyreball-init");
+        for (var i = 0; i < elements.length; i++) {
+            initializeElement(elements[i]);
+        }
+    };
+
+    document.addEventListener("DOMContentLoaded", pyreball.initialize);
+})();
@@ -2,6 +2,8 @@ CONFIG_INI_FILENAME = "config.ini"
 LINKS_INI_FILENAME = "external_links.ini"
 STYLES_TEMPLATE_FILENAME = "css.template"
 HTML_TEMPLATE_FILENAME = "html.template"
+RUNTIME_SCRIPT_FILENAME = "runtime.js"
+ASSETS_DIRECTORY_NAME = "_assets"
 
 PILCROW_SIGN = "¶"
 NON_BREAKABLE_SPACE = "\u00a0"
@@ -1,27 +1,60 @@
 """Main functions that serve as building blocks of the final html file."""
 
+import asyncio
+import base64
 import builtins
+import functools
+import inspect
 import io
+import itertools
 import json
 import os
-import random
 import re
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from types import FrameType, TracebackType
 from typing import (
     TYPE_CHECKING,
     Any,
+    Callable,
     Dict,
+    Iterator,
     List,
+    NamedTuple,
     Optional,
+    Sequence,
     Set,
+    TextIO,
     Tuple,
+    Type,
+    TypeVar,
     Union,
     cast,
 )
 
-from pyreball._common import AttrsParameter, ClParameter
+from pyreball._common import (
+    AttrsParameter,
+    ClParameter,
+    get_build_profile_path,
+    get_references_path,
+)
 from pyreball.constants import NON_BREAKABLE_SPACE, PILCROW_SIGN
 from pyreball.text import code_block, div
-from pyreball.utils.param import get_parameter_value, make_sure_dir_exists, merge_values
+from pyreball.utils.param import (
+    ParametersType,
+    Settings,
+    _active_settings,
+    get_settings,
+    make_sure_dir_exists,
+    merge_values,
+)
+from pyreball.utils.trace import is_tracing_enabled, trace_script_startup, trace_span
 
 if TYPE_CHECKING:
     # needed for mypy
@@ -74,6 +107,40 @@ _code_block_memory: Dict[str, Any] = {}
 _table_memory: Dict[str, Any] = {}
 _graph_memory: Dict[str, Any] = {}
 
+# report that is being printed into, if it is not the default one
+_current_report: ContextVar[Optional["Report"]] = ContextVar(
+    "pyreball_current_report", default=None
+)
+# section that is being printed into instead of the report
+_current_section: ContextVar[Optional["Section"]] = ContextVar(
+    "pyreball_current_section", default=None
+)
+# record of the element that is being printed, when the build profile is recorded
+_current_profile_record: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "pyreball_current_profile_record", default=None
+)
+_references_lock = threading.Lock()
+_altair_datasets_lock = threading.Lock()
+_section_ids = itertools.count(1)
+# IDs of references created outside sections, shared by all reports of the process
+_reference_ids = itertools.count(1)
+# keeps the reference IDs created in worker processes of `build_sections` unique
+_reference_id_prefix = ""
+
+# calls from the files in this directory are not locations of printed elements
+_PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+FunctionType = TypeVar("FunctionType", bound=Callable[..., Any])
+
+# links to references are found by this prefix when they are written into the file
+_REFERENCE_LINK_PREFIX = '<a href="#ref-'
+
+# Elements printed into a section get placeholders instead of their numbers,
+# which are replaced when the section is merged into the report.
+_INDEX_PLACEHOLDER_PATTERN = re.compile(
+    r"__pyreball_(code|table|figure)_(\d+)_(\d+)_([0-9a-z]*)__"
+)
+
 ALIGN_CLASS_MAP = {
     "center": "pyreball-centered",
     "left": "pyreball-left-aligned",
@@ -96,8 +163,15 @@ class Reference:
                 If not provided, Pyreball automatically inserts a text.
                 For tables, images and code blocks, their number is used.
                 For headings, their text is used.
+
+        The ID of the reference is given by the order of its creation
+        in the process (or in the section that is being printed into),
+        so the same script always produces the same HTML file.
         """
-        self.id = f"id{random.getrandbits(64)}"
+        section = _current_section.get()
+        self.id = (
+            _next_reference_id() if section is None else section._next_reference_id()
+        )
         self.text = default_text
 
     def __str__(self) -> str:
@@ -126,6 +200,57 @@ class Reference:
         return f'<a href="#ref-{self.id}">{text}</a>'
 
 
+def _next_reference_id() -> str:
+    return f"id{_reference_id_prefix}{next(_reference_ids)}"
+
+
+def _get_report() -> "Report":
+    report = _current_report.get()
+    return _default_report if report is None else report
+
+
+def _get_element_owner() -> Union["Report", "Section"]:
+    """Get the object that numbers tables, figures and code blocks."""
+    section = _current_section.get()
+    return _get_report() if section is None else section
+
+
+class _IndexPlaceholder(int):
+    """Index of an element printed into a section.
+
+    When formatted, it produces a placeholder, which is replaced
+    by the final index of the element when the section is merged.
+    """
+
+    kind: str
+    section_id: int
+
+    def __new__(cls, value: int, kind: str, section_id: int) -> "_IndexPlaceholder":
+        placeholder = super().__new__(cls, value)
+        placeholder.kind = kind
+        placeholder.section_id = section_id
+        return placeholder
+
+    def __format__(self, format_spec: str) -> str:
+        return f"__pyreball_{self.kind}_{self.section_id}_{int(self)}_{format_spec}__"
+
+    def __str__(self) -> str:
+        return self.__format__("")
+
+    __repr__ = __str__
+
+
+def _get_element_index(index: int, kind: str) -> int:
+    section = _current_section.get()
+    return index if section is None else _IndexPlaceholder(index, kind, section.id)
+
+
+class _PendingHeading(NamedTuple):
+    string: str
+    level: int
+    reference: Optional[Reference]
+
+
 def _check_and_mark_reference(reference: Reference) -> None:
     """Check and save a reference.
 
@@ -133,13 +258,125 @@ def _check_and_mark_reference(reference: Reference) -> None:
     If a table or a figure is about to get a reference that was already used
     for another object, an error is raised.
     """
-    if reference.id in _references:
-        raise ValueError(
-            "Reference is used for the second time. "
-            "You have to create another reference for this object."
-        )
+    _check_and_mark_reference_id(reference.id)
+
+
+def _check_and_mark_reference_id(reference_id: str) -> None:
+    references = _get_report()._references
+    with _references_lock:
+        if reference_id in references:
+            raise ValueError(
+                "Reference is used for the second time. "
+                "You have to create another reference for this object."
+            )
+        else:
+            references.add(reference_id)
+    section = _current_section.get()
+    if section is not None:
+        # released when the section is discarded, so that the reference can be reused
+        section._marked_reference_ids.append(reference_id)
+
+
+def _add_reference_target(reference_id: str, anchor: str, text: str) -> None:
+    """Remember the anchor and the default link text of a referenced element.
+
+    The links to the reference are filled in when the HTML file is finished.
+    """
+    section = _current_section.get()
+    if section is not None:
+        section._reference_targets.append((reference_id, anchor, text))
     else:
-        _references.add(reference.id)
+        _write_reference_records([["target", reference_id, anchor, text]])
+
+
+def _write_reference_records(records: List[List[Any]]) -> None:
+    html_file_path = get_settings().html_file_path
+    if html_file_path and records:
+        with open(get_references_path(Path(html_file_path)), "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+
+def _get_caller_location() -> Optional[str]:
+    """Get the file and the line, from which a Pyreball function was called."""
+    frame: Optional[FrameType] = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename.startswith(_PACKAGE_DIRECTORY):
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return f"{frame.f_code.co_filename}:{frame.f_lineno}"
+
+
+def _count_written_bytes(size: int) -> None:
+    """Add the size of written HTML or data file to the element being printed."""
+    record = _current_profile_record.get()
+    if record is not None:
+        record["bytes"] += size
+
+
+def _write_build_profile_record(record: Dict[str, Any]) -> None:
+    html_file_path = get_settings().html_file_path
+    if html_file_path:
+        with open(get_build_profile_path(Path(html_file_path)), "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def _profiled(
+    element: str, label_parameter: Optional[str] = None
+) -> Callable[[FunctionType], FunctionType]:
+    """Record the time and the size of the elements printed by the function.
+
+    The records are written only when `build-profile` parameter is set.
+    When tracing is enabled by `--trace` option, the calls are recorded
+    as spans of the trace too. When the function calls other printing
+    functions, e.g. `print_div` calls `print`, only the outermost call
+    is recorded.
+
+    Args:
+        element: Type of the printed element, e.g. `table`.
+        label_parameter: Name of the parameter with a text that helps
+            to identify the element, e.g. its caption.
+    """
+
+    def decorator(function: FunctionType) -> FunctionType:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            settings = get_settings()
+            if (
+                not settings.html_file_path
+                or _current_profile_record.get() is not None
+                or not (settings.build_profile or is_tracing_enabled())
+            ):
+                return function(*args, **kwargs)
+            report_name = os.path.basename(settings.html_file_path)
+            trace_script_startup(report_name)
+            label = (
+                signature.bind(*args, **kwargs).arguments.get(label_parameter)
+                if label_parameter is not None
+                else None
+            )
+            record: Dict[str, Any] = {
+                "element": element,
+                "label": None if label is None else str(label),
+                "location": _get_caller_location(),
+                "bytes": 0,
+            }
+            token = _current_profile_record.set(record)
+            start_time = time.perf_counter()
+            try:
+                with trace_span(function.__name__, "print", report_name, record):
+                    return function(*args, **kwargs)
+            finally:
+                record["seconds"] = time.perf_counter() - start_time
+                _current_profile_record.reset(token)
+                if settings.build_profile:
+                    _write_build_profile_record(record)
+
+        return cast(FunctionType, wrapper)
+
+    return decorator
 
 
 def set_title(title: str) -> None:
@@ -153,12 +390,13 @@ def set_title(title: str) -> None:
     Args:
         title: Title string.
     """
-    if not get_parameter_value("html_file_path") or get_parameter_value("keep_stdout"):
+    settings = get_settings()
+    if not settings.html_file_path or settings.keep_stdout:
         builtins.print(title)
-    if get_parameter_value("html_file_path"):
+    if settings.html_file_path:
         # it is assumed that the heading is already written into the file,
         # so find the line with title element and replace its contents
-        with open(get_parameter_value("html_file_path")) as f:
+        with open(settings.html_file_path) as f:
             lines = f.readlines()
 
         # replace the title and also add "custom_pyreball_title" class,
@@ -171,17 +409,70 @@ def set_title(title: str) -> None:
             )
             for line in lines
         ]
-        with open(get_parameter_value("html_file_path"), "w") as f:
+        original_size = os.path.getsize(settings.html_file_path)
+        with open(settings.html_file_path, "w") as f:
             f.writelines(lines)
+        # the positions of the links that are already written have moved
+        size_difference = os.path.getsize(settings.html_file_path) - original_size
+        if size_difference and os.path.exists(
+            get_references_path(Path(settings.html_file_path))
+        ):
+            _write_reference_records([["shift", size_difference]])
 
 
 def _write_to_html(string: str, end: str = "\n") -> None:
-    if get_parameter_value("html_file_path"):
-        with open(get_parameter_value("html_file_path"), "a") as f:
-            f.write(string)
+    settings = get_settings()
+    section = _current_section.get()
+    if settings.html_file_path and _current_profile_record.get() is not None:
+        _count_written_bytes(len((string + end).encode("utf-8")))
+    if section is not None:
+        if settings.html_file_path:
+            section._chunks.append(string + end)
+    elif settings.html_file_path:
+        with open(settings.html_file_path, "a") as f:
+            if _REFERENCE_LINK_PREFIX in string:
+                _write_with_reference_links(f, string)
+            else:
+                f.write(string)
             f.write(end)
 
 
+def _write_with_reference_links(f: TextIO, string: str) -> None:
+    """Write a string and record the positions of the links to references in it.
+
+    The links are written with the ID of the reference instead of the anchor
+    of the referenced element, which may not be printed yet. Their positions
+    in the file are recorded, so that the anchors and the default link texts
+    can be filled in when the HTML file is finished.
+    """
+    records = []
+    position = 0
+    while True:
+        link_start = string.find(_REFERENCE_LINK_PREFIX, position)
+        if link_start < 0:
+            break
+        # points to "ref-{id}" in the href attribute
+        href_start = link_start + len(_REFERENCE_LINK_PREFIX) - len("ref-")
+        href_end = string.find('"', href_start)
+        if href_end < 0:
+            break
+        reference_id = string[href_start + len("ref-") : href_end]
+        f.write(string[position:href_start])
+        records.append(["link", f.tell(), reference_id])
+        position = href_start
+        if string.startswith(f'">{reference_id}</a>', href_end):
+            # the link has the default text, i.e. the ID of the reference
+            text_start = href_end + len('">')
+            f.write(string[position:text_start])
+            records.append(["text", f.tell(), reference_id])
+            position = text_start
+        else:
+            f.write(string[position:href_end])
+            position = href_end
+    f.write(string[position:])
+    _write_reference_records(records)
+
+
 def _tidy_title(title: str) -> str:
     """
     Transforms title into lowercase alphanumerical sequence separated by underscores.
@@ -218,33 +509,36 @@ def _get_heading_number(level: int, l_heading_counting: List[int]) -> str:
     return ".".join(map(str, l_heading_counting[:level]))
 
 
-def _print_heading(
-    string: str, level: int = 1, reference: Optional[Reference] = None
-) -> None:
-    if level > 6:
-        raise ValueError("Heading level cannot be greater than 6.")
-    if level < 1:
-        raise ValueError("Heading level cannot be less than 1.")
+def _prepare_heading(
+    string: str, level: int, reference: Optional[Reference], numbered: bool
+) -> Tuple[str, str, str]:
+    """Number the heading and prepare its id.
 
-    if "heading_index" not in _heading_memory:
-        _heading_memory["heading_index"] = 1
+    Returns:
+        A tuple of (string, tidy_string, header_contents), where string
+        is the heading text with its number, tidy_string is the id of the heading
+        and header_contents is the content of the heading element.
+    """
+    heading_memory = _get_report()._heading_memory
+    if "heading_index" not in heading_memory:
+        heading_memory["heading_index"] = 1
 
-    heading_index = _heading_memory["heading_index"]
+    heading_index = heading_memory["heading_index"]
 
-    if get_parameter_value("numbered_headings"):
-        if "heading_counting" not in _heading_memory:
+    if numbered:
+        if "heading_counting" not in heading_memory:
             # what is the index of current h1, h2, h3, h4, h5, h6?
-            _heading_memory["heading_counting"] = [0, 0, 0, 0, 0, 0]
+            heading_memory["heading_counting"] = [0, 0, 0, 0, 0, 0]
 
         # increase the number in the level
-        _heading_memory["heading_counting"][level - 1] = (
-            _heading_memory["heading_counting"][level - 1] + 1
+        heading_memory["heading_counting"][level - 1] = (
+            heading_memory["heading_counting"][level - 1] + 1
         )
         # reset all sub-levels
-        _heading_memory["heading_counting"][level:] = [0] * (6 - level)
+        heading_memory["heading_counting"][level:] = [0] * (6 - level)
         # get the string of the numbered section and append non-breakable space
         heading_number_str = (
-            _get_heading_number(level, _heading_memory["heading_counting"])
+            _get_heading_number(level, heading_memory["heading_counting"])
             + NON_BREAKABLE_SPACE
             + NON_BREAKABLE_SPACE
         )
@@ -254,27 +548,60 @@ def _print_heading(
     string = heading_number_str + _reduce_whitespaces(string)
     # use heading_index in the id of the heading,
     # so there are no collisions in the case of same texts
+    tidy_string = f"ch_{_tidy_title(string)}_{heading_index}"
+    if reference:
+        _add_reference_target(reference.id, anchor=tidy_string, text=string)
+
+    header_contents = (
+        f"{string}"
+        f'<a class="pyreball-anchor-link" href="#{tidy_string}">{PILCROW_SIGN}</a>'
+    )
+    return string, tidy_string, header_contents
+
+
+def _write_heading(tidy_string: str, header_contents: str, level: int) -> None:
+    # For correct functioning of references,
+    # it is expected that single line contains at most one heading,
+    # and the heading is whole there with all links.
+    _write_to_html(f'<h{level} id="{tidy_string}">{header_contents}</h{level}>')
+    _get_report()._heading_memory["heading_index"] += 1
+
+
+def _print_heading(
+    string: str, level: int = 1, reference: Optional[Reference] = None
+) -> None:
+    settings = get_settings()
+    if level > 6:
+        raise ValueError("Heading level cannot be greater than 6.")
+    if level < 1:
+        raise ValueError("Heading level cannot be less than 1.")
     if reference:
         _check_and_mark_reference(reference)
-        tidy_string = f"ch_{reference.id}_{_tidy_title(string)}_{heading_index}"
-    else:
-        tidy_string = f"ch_{_tidy_title(string)}_{heading_index}"
 
-    if not get_parameter_value("html_file_path") or get_parameter_value("keep_stdout"):
+    section = _current_section.get()
+    if section is not None:
+        # the number of the heading is known only when the section is merged
+        if not settings.html_file_path or settings.keep_stdout:
+            builtins.print(_reduce_whitespaces(string))
+        if settings.html_file_path:
+            section._chunks.append(_PendingHeading(string, level, reference))
+        return
+
+    string, tidy_string, header_contents = _prepare_heading(
+        string,
+        level=level,
+        reference=reference,
+        numbered=bool(settings.numbered_headings),
+    )
+
+    if not settings.html_file_path or settings.keep_stdout:
         builtins.print(string.replace(NON_BREAKABLE_SPACE * 2, " "))
 
-    if get_parameter_value("html_file_path"):
-        header_contents = (
-            f"{string}"
-            f'<a class="pyreball-anchor-link" href="#{tidy_string}">{PILCROW_SIGN}</a>'
-        )
-        # For correct functioning of references,
-        # it is expected that single line contains at most one heading,
-        # and the heading is whole there with all links.
-        _write_to_html(f'<h{level} id="{tidy_string}">{header_contents}</h{level}>')
-        _heading_memory["heading_index"] += 1
+    if settings.html_file_path:
+        _write_heading(tidy_string, header_contents, level)
 
 
+@_profiled("h1", label_parameter="string")
 def print_h1(string: str, reference: Optional[Reference] = None) -> None:
     """
     Print h1 heading.
@@ -286,6 +613,7 @@ def print_h1(string: str, reference: Optional[Reference] = None) -> None:
     _print_heading(string, level=1, reference=reference)
 
 
+@_profiled("h2", label_parameter="string")
 def print_h2(string: str, reference: Optional[Reference] = None) -> None:
     """
     Print h2 heading.
@@ -297,6 +625,7 @@ def print_h2(string: str, reference: Optional[Reference] = None) -> None:
     _print_heading(string, level=2, reference=reference)
 
 
+@_profiled("h3", label_parameter="string")
 def print_h3(string: str, reference: Optional[Reference] = None) -> None:
     """
     Print h3 heading.
@@ -308,6 +637,7 @@ def print_h3(string: str, reference: Optional[Reference] = None) -> None:
     _print_heading(string, level=3, reference=reference)
 
 
+@_profiled("h4", label_parameter="string")
 def print_h4(string: str, reference: Optional[Reference] = None) -> None:
     """
     Print h4 heading.
@@ -319,6 +649,7 @@ def print_h4(string: str, reference: Optional[Reference] = None) -> None:
     _print_heading(string, level=4, reference=reference)
 
 
+@_profiled("h5", label_parameter="string")
 def print_h5(string: str, reference: Optional[Reference] = None) -> None:
     """
     Print h5 heading.
@@ -330,6 +661,7 @@ def print_h5(string: str, reference: Optional[Reference] = None) -> None:
     _print_heading(string, level=5, reference=reference)
 
 
+@_profiled("h6", label_parameter="string")
 def print_h6(string: str, reference: Optional[Reference] = None) -> None:
     """
     Print h6 heading.
@@ -341,6 +673,7 @@ def print_h6(string: str, reference: Optional[Reference] = None) -> None:
     _print_heading(string, level=6, reference=reference)
 
 
+@_profiled("div")
 def print_div(
     *values: Any,
     cl: ClParameter = None,
@@ -382,11 +715,12 @@ def _wrap_code_block_html(
     numbered: bool = True,
     sep: str = "",
 ) -> str:
+    anchor_link = f"code-block-{code_block_index}"
     if reference:
         _check_and_mark_reference(reference)
-        anchor_link = f"code-block-{reference.id}-{code_block_index}"
-    else:
-        anchor_link = f"code-block-{code_block_index}"
+        _add_reference_target(
+            reference.id, anchor=anchor_link, text=str(code_block_index)
+        )
 
     caption_element = _prepare_caption_element(
         prefix="Source",
@@ -419,6 +753,7 @@ def _wrap_code_block_html(
     return code_block_html
 
 
+@_profiled("code_block", label_parameter="caption")
 def print_code_block(
     *values: Any,
     caption: Optional[str] = None,
@@ -476,6 +811,8 @@ def print_code_block(
             are added to the `<code>` element as classes.
 
     """
+    settings = get_settings()
+    code_block_memory = _get_element_owner()._code_block_memory
 
     source_code_str = code_block(
         *values,
@@ -486,31 +823,33 @@ def print_code_block(
         sep=sep,
         syntax_highlight=syntax_highlight,
     )
-    if not get_parameter_value("html_file_path") or get_parameter_value("keep_stdout"):
+    if not settings.html_file_path or settings.keep_stdout:
         builtins.print(source_code_str)
-    if get_parameter_value("html_file_path"):
-        if "code_block_index" not in _code_block_memory:
-            _code_block_memory["code_block_index"] = 1
-        code_block_index = _code_block_memory["code_block_index"]
+    if settings.html_file_path:
+        if "code_block_index" not in code_block_memory:
+            code_block_memory["code_block_index"] = 1
+        code_block_index = _get_element_index(
+            code_block_memory["code_block_index"], kind="code"
+        )
 
         align = cast(
             str,
             merge_values(
                 primary_value=align,
-                secondary_value=get_parameter_value("align_code_blocks"),
+                secondary_value=settings.align_code_blocks,
             ),
         )
         caption_position = cast(
             str,
             merge_values(
                 primary_value=caption_position,
-                secondary_value=get_parameter_value("code_block_captions_position"),
+                secondary_value=settings.code_block_captions_position,
             ),
         )
         numbered = bool(
             merge_values(
                 primary_value=numbered,
-                secondary_value=get_parameter_value("numbered_code_blocks"),
+                secondary_value=settings.numbered_code_blocks,
             )
         )
 
@@ -526,9 +865,10 @@ def print_code_block(
         )
         _write_to_html(code_block_html, end=end)
 
-        _code_block_memory["code_block_index"] += 1
+        code_block_memory["code_block_index"] += 1
 
 
+@_profiled("text")
 def print(*values: Any, sep: str = "", end: str = "\n") -> None:
     """Print values as strings to HTML file.
 
@@ -539,11 +879,12 @@ def print(*values: Any, sep: str = "", end: str = "\n") -> None:
             Defaults to an empty space.
         end: String appended after the values. Defaults to a newline.
     """
+    settings = get_settings()
     str_values = map(str, values)
     string = sep.join(str_values) + end
-    if not get_parameter_value("html_file_path") or get_parameter_value("keep_stdout"):
+    if not settings.html_file_path or settings.keep_stdout:
         builtins.print(string)
-    if get_parameter_value("html_file_path"):
+    if settings.html_file_path:
         _write_to_html(string, end="")
 
 
@@ -699,6 +1040,7 @@ def _prepare_table_html(
     datatables_definition: Optional[Dict[str, Any]] = None,
     **kwargs: Any,
 ) -> str:
+    settings = get_settings()
     table_classes = []
     if isinstance(datatables_style, list):
         table_classes += datatables_style
@@ -728,11 +1070,10 @@ def _prepare_table_html(
 
     kwargs["sparsify"] = False
     df_html = df.to_html(classes=table_classes, **kwargs)
+    anchor_link = f"table-{tab_index}"
     if reference:
         _check_and_mark_reference(reference)
-        anchor_link = f"table-{reference.id}-{tab_index}"
-    else:
-        anchor_link = f"table-{tab_index}"
+        _add_reference_target(reference.id, anchor=anchor_link, text=str(tab_index))
 
     caption_element = _prepare_caption_element(
         prefix="Table",
@@ -763,19 +1104,19 @@ def _prepare_table_html(
     table_html = f'<div class="pyreball-table-wrapper">\n{table_html}\n</div>'
 
     if datatables_setup is not None:
-        table_init = json.dumps(datatables_setup)
-        js = f"new DataTable('#{table_wrapper_inner_id} > table', {table_init});"
-        table_html += f"\n<script>{js}</script>"
+        # Tables are not initialized right away, but all at once by the shared
+        # runtime, so that parsing of the page is not blocked by the tables.
+        table_html += "\n" + _prepare_initializer_element(
+            kind="datatables",
+            target_id=table_wrapper_inner_id,
+            config_json=json.dumps(datatables_setup),
+            lazy=bool(settings.lazy_tables),
+        )
 
     return table_html
 
 
-def _parse_tables_paging_sizes(sizes: str) -> List[Union[int, str]]:
-    return [
-        value if value.lower() == "all" else int(value) for value in sizes.split(",")
-    ]
-
-
+@_profiled("table", label_parameter="caption")
 def print_table(
     df: "pandas.DataFrame",
     caption: Optional[str] = None,
@@ -859,76 +1200,71 @@ def print_table(
             `sparsify` is explicitly set to `False` by Pyreball, because tables
             with multi-index would not be displayed correctly using DataTables library.
     """
-    if not get_parameter_value("html_file_path") or get_parameter_value("keep_stdout"):
+    settings = get_settings()
+    table_memory = _get_element_owner()._table_memory
+    if not settings.html_file_path or settings.keep_stdout:
         builtins.print(df)
-    if get_parameter_value("html_file_path"):
-        if "table_index" not in _table_memory:
-            _table_memory["table_index"] = 1
-        table_index = _table_memory["table_index"]
+    if settings.html_file_path:
+        if "table_index" not in table_memory:
+            table_memory["table_index"] = 1
+        table_index = _get_element_index(table_memory["table_index"], kind="table")
 
         align = cast(
             str,
-            merge_values(
-                primary_value=align, secondary_value=get_parameter_value("align_tables")
-            ),
+            merge_values(primary_value=align, secondary_value=settings.align_tables),
         )
         caption_position = cast(
             str,
             merge_values(
                 primary_value=caption_position,
-                secondary_value=get_parameter_value("table_captions_position"),
+                secondary_value=settings.table_captions_position,
             ),
         )
         numbered = bool(
             merge_values(
                 primary_value=numbered,
-                secondary_value=get_parameter_value("numbered_tables"),
+                secondary_value=settings.numbered_tables,
             )
         )
         display_option = str(
             merge_values(
                 primary_value=display_option,
-                secondary_value=get_parameter_value("tables_display_option"),
+                secondary_value=settings.tables_display_option,
             )
         )
         scroll_y_height = str(
             merge_values(
                 primary_value=scroll_y_height,
-                secondary_value=get_parameter_value("tables_scroll_y_height"),
+                secondary_value=settings.tables_scroll_y_height,
             )
         )
         scroll_x = bool(
             merge_values(
                 primary_value=scroll_x,
-                secondary_value=get_parameter_value("tables_scroll_x"),
+                secondary_value=settings.tables_scroll_x,
             )
         )
         sortable = bool(
             merge_values(
                 primary_value=sortable,
-                secondary_value=get_parameter_value("sortable_tables"),
+                secondary_value=settings.sortable_tables,
             )
         )
         paging_sizes = merge_values(
             primary_value=paging_sizes,
-            secondary_value=_parse_tables_paging_sizes(
-                get_parameter_value("tables_paging_sizes")
-            ),
+            secondary_value=settings.tables_paging_sizes,
         )
         search_box = bool(
             merge_values(
                 primary_value=search_box,
-                secondary_value=get_parameter_value("tables_search_box"),
+                secondary_value=settings.tables_search_box,
             )
         )
-        conf_datatables_style = get_parameter_value("tables_datatables_style")
-        if conf_datatables_style:
-            conf_datatables_style = re.split(r"[, ]", conf_datatables_style)
         datatables_style = cast(
             Union[str, List[str]],
             merge_values(
                 primary_value=datatables_style,
-                secondary_value=conf_datatables_style,
+                secondary_value=settings.tables_datatables_style,
             ),
         )
 
@@ -953,15 +1289,15 @@ def print_table(
             **kwargs,
         )
         _write_to_html(table_html)
-        _table_memory["table_index"] += 1
+        table_memory["table_index"] += 1
 
 
 def _construct_image_anchor_link(reference: Optional[Reference], fig_index: int) -> str:
+    anchor_link = f"img-{fig_index}"
     if reference:
         _check_and_mark_reference(reference)
-        return f"img-{reference.id}-{fig_index}"
-    else:
-        return f"img-{fig_index}"
+        _add_reference_target(reference.id, anchor=anchor_link, text=str(fig_index))
+    return anchor_link
 
 
 def _wrap_image_element_by_outer_divs(
@@ -982,16 +1318,17 @@ def _prepare_matplotlib_image_element(
     image_format: Optional[str] = None,
     embedded: Optional[bool] = None,
 ) -> str:
+    settings = get_settings()
     if image_format is not None and image_format not in ["svg", "png"]:
         raise ValueError('Matplotlib format can be only "svg" or "png".')
 
     image_format = merge_values(
         primary_value=image_format,
-        secondary_value=get_parameter_value("matplotlib_format"),
+        secondary_value=settings.matplotlib_format,
     )
     embedded = merge_values(
         primary_value=embedded,
-        secondary_value=get_parameter_value("matplotlib_embedded"),
+        secondary_value=settings.matplotlib_embedded,
     )
 
     if embedded:
@@ -1003,46 +1340,340 @@ def _prepare_matplotlib_image_element(
             raise ValueError(
                 "Only svg format can be used for embedded matplotlib figures."
             )
-    elif get_parameter_value("html_dir_path") and get_parameter_value("html_dir_name"):
-        make_sure_dir_exists(get_parameter_value("html_dir_path"))
+    elif settings.html_dir_path and settings.html_dir_name:
+        make_sure_dir_exists(settings.html_dir_path)
         img_file_name = f"img_{fig_index:03d}.{image_format}"
         fig.savefig(
-            os.path.join(get_parameter_value("html_dir_path"), img_file_name),
+            os.path.join(settings.html_dir_path, img_file_name),
             format=image_format,
             bbox_inches="tight",
         )
+        section = _current_section.get()
+        if section is not None:
+            # the name contains a placeholder of the index, see Sections.merge
+            section._file_names.append(img_file_name)
+        _count_written_bytes(
+            os.path.getsize(os.path.join(settings.html_dir_path, img_file_name))
+        )
         img_element = (
-            f'<img src="'
-            f'{os.path.join(get_parameter_value("html_dir_name"), img_file_name)}'
-            f'">'
+            f'<img src="' f"{os.path.join(settings.html_dir_name, img_file_name)}" f'">'
         )
     else:
         raise RuntimeError("Failed to create a matplotlib image.")
     return img_element
 
 
+def _get_altair_dataset_script_element(name: str) -> str:
+    html_dir_name = get_settings().html_dir_name
+    if not html_dir_name:
+        raise RuntimeError("Failed to externalize altair datasets.")
+    data_file_name = f"altair_{name}.js"
+    return f'<script src="{os.path.join(html_dir_name, data_file_name)}"></script>'
+
+
+def _write_new_altair_datasets(datasets: Dict[str, Any]) -> List[str]:
+    """Write the datasets that were not written into the report directory yet.
+
+    Args:
+        datasets: Mapping from dataset names to dataset values.
+
+    Returns:
+        Names of the newly written datasets.
+    """
+    if not datasets:
+        return []
+    html_dir_path = get_settings().html_dir_path
+    if not html_dir_path:
+        raise RuntimeError("Failed to externalize altair datasets.")
+    make_sure_dir_exists(html_dir_path)
+    new_names = []
+    with _altair_datasets_lock:
+        written_datasets = _get_report()._graph_memory.setdefault(
+            "altair_datasets", set()
+        )
+        for name, values in datasets.items():
+            if name in written_datasets:
+                continue
+            data_file_path = os.path.join(html_dir_path, f"altair_{name}.js")
+            data_file_content = (
+                "(window.pyreballAltairData = window.pyreballAltairData || {})"
+                f"[{json.dumps(name)}] = {json.dumps(values)};\n"
+            )
+            # write through a temporary file so that no reader can see a partial file
+            tmp_path = f"{data_file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data_file_content)
+            os.replace(tmp_path, data_file_path)
+            _count_written_bytes(len(data_file_content.encode("utf-8")))
+            written_datasets.add(name)
+            new_names.append(name)
+    return new_names
+
+
+def _write_altair_datasets_to_files(datasets: Dict[str, Any]) -> str:
+    """Write Altair datasets into separate JavaScript files.
+
+    Altair names the datasets by hashes of their contents, so each dataset
+    is written and linked only once per report, even when it is shared
+    by multiple charts. JavaScript files are used instead of JSON files,
+    because browsers do not allow fetching JSON files when the report is opened
+    via `file://`.
+
+    Datasets of charts printed into a section are only linked, and they are
+    written when the section is merged (see `_merge_altair_datasets`), so that
+    the first section in the order of the report links them.
+
+    Args:
+        datasets: Mapping from dataset names to dataset values.
+
+    Returns:
+        String with `<script>` elements that load the newly written datasets.
+    """
+    section = _current_section.get()
+    if section is None:
+        return "".join(
+            _get_altair_dataset_script_element(name)
+            for name in _write_new_altair_datasets(datasets)
+        )
+    pending_datasets = section._graph_memory.setdefault("altair_datasets", {})
+    script_elements = ""
+    for name, values in datasets.items():
+        if name not in pending_datasets:
+            script_elements += _get_altair_dataset_script_element(name)
+            pending_datasets[name] = values
+    return script_elements
+
+
+def _merge_altair_datasets(section: "Section") -> List[str]:
+    """Write the datasets linked by a section that is being merged.
+
+    Args:
+        section: Merged section.
+
+    Returns:
+        `<script>` elements of the section that load datasets,
+        which are already linked by the report, and which should be dropped.
+    """
+    datasets = section._graph_memory.pop("altair_datasets", {})
+    new_names = set(_write_new_altair_datasets(datasets))
+    return [
+        _get_altair_dataset_script_element(name)
+        for name in datasets
+        if name not in new_names
+    ]
+
+
+def _prepare_initializer_element(
+    kind: str, target_id: str, config_json: str, lazy: bool = False
+) -> str:
+    """Prepare an element with configuration of a JavaScript initializer.
+
+    The configuration is not executed by the browser directly. Instead, it is
+    picked up by the shared Pyreball runtime script, which initializes all
+    such elements at once when the page is loaded.
+
+    Args:
+        kind: Kind of the initializer, e.g. `'plotly'`.
+        target_id: ID of the HTML element that should be initialized.
+        config_json: Configuration of the initializer serialized to JSON.
+        lazy: Whether to postpone the initialization until the target element
+            is about to be scrolled into the view.
+
+    Returns:
+        HTML string with the configuration element.
+    """
+    # prevent the JSON from closing the script element prematurely
+    config_json = config_json.replace("</", "<\\/")
+    lazy_attr = " data-lazy" if lazy else ""
+    return (
+        f'<script type="application/json" class="pyreball-init" '
+        f'data-kind="{kind}" data-target="{target_id}"{lazy_attr}>'
+        f"{config_json}</script>"
+    )
+
+
+def _prepare_figure_target_element(
+    vis_id: str, height: Optional[int], lazy: bool, cl: Optional[str] = None
+) -> str:
+    """Prepare the element, into which an interactive figure is rendered.
+
+    When the figure is rendered lazily, the element serves as a placeholder
+    that reserves the expected height of the figure to avoid layout shifts.
+    """
+    class_attr = f' class="{cl}"' if cl else ""
+    style_attr = (
+        f' style="min-height: {height}px;"' if lazy and height is not None else ""
+    )
+    return f'<div id="{vis_id}"{class_attr}{style_attr}></div>'
+
+
+def _get_altair_chart_height(spec: Dict[str, Any]) -> Optional[int]:
+    height = spec.get("height")
+    if isinstance(height, (int, float)):
+        return int(height)
+    # composite charts do not have a single height
+    return None
+
+
 def _prepare_altair_image_element(fig: AltairFigType, fig_index: int) -> str:
+    settings = get_settings()
     vis_id = "altairvis" + str(fig_index)
-    img_element = (
-        f'<div id="{vis_id}">'
-        f'</div><script type="text/javascript">\nvar spec = {fig.to_json()};\n'
-    )
-    img_element += 'var opt = {"renderer": "canvas", "actions": false};\n'
+    lazy = bool(settings.lazy_figures)
+    spec = None
+    datasets: Dict[str, Any] = {}
+    img_element = ""
+    if settings.altair_data_mode == "external":
+        spec = fig.to_dict()
+        datasets = spec.pop("datasets", {})
+        img_element = _write_altair_datasets_to_files(datasets)
+    opt = {"renderer": "canvas", "actions": False}
+
+    # deferred libraries are not available to inline scripts,
+    # so the chart must be created by the shared runtime
+    if lazy or settings.script_loading == "deferred":
+        if spec is None:
+            spec = fig.to_dict()
+        img_element += _prepare_figure_target_element(
+            vis_id=vis_id, height=_get_altair_chart_height(spec), lazy=lazy
+        )
+        img_element += _prepare_initializer_element(
+            kind="altair",
+            target_id=vis_id,
+            config_json=json.dumps(
+                {"spec": spec, "datasets": list(datasets), "opt": opt}
+            ),
+            lazy=lazy,
+        )
+        return img_element
+
+    if spec is not None:
+        img_element += (
+            f'<div id="{vis_id}">'
+            f'</div><script type="text/javascript">\nvar spec = {json.dumps(spec)};\n'
+        )
+        if datasets:
+            img_element += "spec.datasets = {};\n"
+        for name in datasets:
+            img_element += (
+                f"spec.datasets[{json.dumps(name)}] = "
+                f"window.pyreballAltairData[{json.dumps(name)}];\n"
+            )
+    else:
+        img_element = (
+            f'<div id="{vis_id}">'
+            f'</div><script type="text/javascript">\nvar spec = {fig.to_json()};\n'
+        )
+    img_element += f"var opt = {json.dumps(opt)};\n"
     img_element += f'vegaEmbed("#{vis_id}", spec, opt);'
     img_element += "</script>"
     return img_element
 
 
-def _prepare_plotly_image_element(fig: "plotly.graph_objs.Figure") -> str:
-    return cast(str, fig.to_html(full_html=False, include_plotlyjs=False))
+_PLOTLY_TYPED_ARRAY_DTYPES = {
+    "int8": "i1",
+    "uint8": "u1",
+    "int16": "i2",
+    "uint16": "u2",
+    "int32": "i4",
+    "uint32": "u4",
+    "float32": "f4",
+    "float64": "f8",
+}
+
+
+def _encode_plotly_typed_arrays(value: Any) -> Any:
+    """Encode numeric numpy arrays in plotly figure data as base64 typed arrays.
+
+    Plotly.js (>= 2.28) decodes such objects directly into typed arrays, which is
+    much cheaper in terms of both page size and parsing time than decimal JSON
+    lists. Any other values are left untouched.
+
+    Args:
+        value: Figure dictionary or any of its nested values.
+
+    Returns:
+        The value with numeric arrays replaced by typed array specifications.
+    """
+    if isinstance(value, dict):
+        return {k: _encode_plotly_typed_arrays(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_encode_plotly_typed_arrays(v) for v in value]
+    elif type(value).__name__ == "ndarray" and value.dtype.kind in "iuf":
+        # 64-bit integers are not supported by plotly.js typed arrays
+        if value.dtype.name in ["int64", "uint64"]:
+            if value.size == 0 or (value.min() >= -(2**31) and value.max() < 2**31):
+                value = value.astype("int32")
+            else:
+                value = value.astype("float64")
+        elif value.dtype.name not in _PLOTLY_TYPED_ARRAY_DTYPES:
+            value = value.astype("float64")
+        typed_array = {
+            "dtype": _PLOTLY_TYPED_ARRAY_DTYPES[value.dtype.name],
+            "bdata": base64.b64encode(value.tobytes(order="C")).decode("ascii"),
+        }
+        if value.ndim > 1:
+            typed_array["shape"] = ", ".join(map(str, value.shape))
+        return typed_array
+    else:
+        return value
+
 
+def _prepare_plotly_image_element(
+    fig: "plotly.graph_objs.Figure", fig_index: int
+) -> str:
+    settings = get_settings()
+    binary = settings.plotly_data_encoding == "binary"
+    lazy = bool(settings.lazy_figures)
+    deferred = settings.script_loading == "deferred"
+    if not binary and not lazy and not deferred:
+        return cast(str, fig.to_html(full_html=False, include_plotlyjs=False))
 
-def _prepare_bokeh_image_element(fig: "bokeh.plotting._figure.figure") -> str:
     # noinspection PyPackageRequirements
-    from bokeh.embed import components  # type: ignore[unused-ignore]
+    from plotly.io.json import to_json_plotly  # type: ignore[unused-ignore]
+
+    vis_id = "plotlyvis" + str(fig_index)
+    fig_dict = fig.to_plotly_json()
+    if binary:
+        fig_dict = _encode_plotly_typed_arrays(fig_dict)
+    fig_dict["config"] = {"responsive": True}
+    height = fig.layout.height
+    return _prepare_figure_target_element(
+        vis_id=vis_id,
+        # 450 pixels is the default height of plotly.js figures
+        height=450 if height is None else int(height),
+        lazy=lazy,
+        cl="plotly-graph-div",
+    ) + _prepare_initializer_element(
+        kind="plotly",
+        target_id=vis_id,
+        config_json=to_json_plotly(fig_dict),
+        lazy=lazy,
+    )
 
-    script, div = components(fig)
-    return f"<div>{div}{script}</div>"
+
+def _prepare_bokeh_image_element(
+    fig: "bokeh.plotting._figure.figure", fig_index: int
+) -> str:
+    settings = get_settings()
+    # noinspection PyPackageRequirements
+    from bokeh.embed import json_item  # type: ignore[unused-ignore]
+
+    lazy = bool(settings.lazy_figures)
+    # Instead of a separate bootstrap script for each figure (as created by
+    # bokeh.embed.components), store only the figure JSON and let the shared
+    # runtime embed all figures at once.
+    vis_id = "bokehvis" + str(fig_index)
+    height = getattr(fig, "height", None)
+    return _prepare_figure_target_element(
+        vis_id=vis_id,
+        height=height if isinstance(height, int) else None,
+        lazy=lazy,
+    ) + _prepare_initializer_element(
+        kind="bokeh",
+        target_id=vis_id,
+        config_json=json.dumps(json_item(fig)),
+        lazy=lazy,
+    )
 
 
 def _is_seaborn_figure_level_type(fig: FigType) -> bool:
@@ -1088,14 +1719,15 @@ def _prepare_image_element(
         type(fig).__name__ == "Figure"
         and type(fig).__module__ == "plotly.graph_objs._figure"
     ):
-        img_element = _prepare_plotly_image_element(fig=fig)
+        img_element = _prepare_plotly_image_element(fig=fig, fig_index=fig_index)
         img_type = "plotly"
     elif type(fig).__name__.lower() == "figure" and type(fig).__module__ in [
         "bokeh.plotting.figure",
         "bokeh.plotting._figure",
     ]:
         img_element = _prepare_bokeh_image_element(
-            fig=fig  # type: ignore[arg-type,unused-ignore]
+            fig=fig,  # type: ignore[arg-type,unused-ignore]
+            fig_index=fig_index,
         )
         img_type = "bokeh"
     else:
@@ -1114,7 +1746,8 @@ def _print_figure(
     matplotlib_format: Optional[str] = None,
     embedded: Optional[bool] = None,
 ) -> None:
-    if not get_parameter_value("html_file_path"):
+    settings = get_settings()
+    if not settings.html_file_path:
         # only when we don't print to HTML
         if type(fig).__name__.lower() == "figure" and type(fig).__module__ in [
             "bokeh.plotting.figure",
@@ -1130,19 +1763,26 @@ def _print_figure(
         else:
             fig.show()
     else:
-        if "fig_index" not in _graph_memory:
-            _graph_memory["fig_index"] = 1
-        fig_index = _graph_memory["fig_index"]
+        graph_memory = _get_element_owner()._graph_memory
+        if "fig_index" not in graph_memory:
+            graph_memory["fig_index"] = 1
+        fig_index = _get_element_index(graph_memory["fig_index"], kind="figure")
 
         anchor_link = _construct_image_anchor_link(
             reference=reference, fig_index=fig_index
         )
-        img_element, img_type = _prepare_image_element(
-            fig=fig,
-            fig_index=fig_index,
-            matplotlib_format=matplotlib_format,
-            embedded=embedded,
-        )
+        with trace_span(
+            "save figure",
+            "figure",
+            report=os.path.basename(settings.html_file_path),
+            args={"type": type(fig).__name__},
+        ):
+            img_element, img_type = _prepare_image_element(
+                fig=fig,
+                fig_index=fig_index,
+                matplotlib_format=matplotlib_format,
+                embedded=embedded,
+            )
         caption_element = _prepare_caption_element(
             prefix="Figure",
             caption=caption,
@@ -1166,9 +1806,10 @@ def _print_figure(
         )
 
         _write_to_html(img_html)
-        _graph_memory["fig_index"] += 1
+        graph_memory["fig_index"] += 1
 
 
+@_profiled("figure", label_parameter="caption")
 def print_figure(
     fig: FigType,
     caption: Optional[str] = None,
@@ -1201,24 +1842,23 @@ def print_figure(
             Only applicable for matplotlib svg images.
             Defaults to settings from config or CLI arguments if `None`.
     """
+    settings = get_settings()
 
     align = cast(
         str,
-        merge_values(
-            primary_value=align, secondary_value=get_parameter_value("align_figures")
-        ),
+        merge_values(primary_value=align, secondary_value=settings.align_figures),
     )
     caption_position = cast(
         str,
         merge_values(
             primary_value=caption_position,
-            secondary_value=get_parameter_value("figure_captions_position"),
+            secondary_value=settings.figure_captions_position,
         ),
     )
     numbered = bool(
         merge_values(
             primary_value=numbered,
-            secondary_value=get_parameter_value("numbered_figures"),
+            secondary_value=settings.numbered_figures,
         )
     )
 
@@ -1232,3 +1872,1040 @@ def print_figure(
         matplotlib_format=matplotlib_format,
         embedded=embedded,
     )
+
+
+def _prepare_report_parameters(parameters: Dict[str, Any]) -> ParametersType:
+    """Convert and check parameters passed to a `Report` object."""
+    from pyreball.__main__ import parameter_specifications
+
+    specifications = {spec.param_key: spec for spec in parameter_specifications}
+    unknown_keys = [key for key in parameters if key not in specifications]
+    if unknown_keys:
+        raise TypeError(f"Unknown report parameters: {', '.join(unknown_keys)}.")
+
+    warning_messages: List[str] = []
+    error_messages: List[str] = []
+    checked_parameters: ParametersType = {}
+    for key, spec in specifications.items():
+        value = parameters.get(key)
+        # convert the values to the same form as when they come from the CLI
+        if isinstance(value, bool):
+            value = "yes" if value else "no"
+        elif isinstance(value, (list, tuple)):
+            value = ",".join(map(str, value))
+        checked_parameters[key] = spec.check_and_fix_value(
+            value,
+            none_allowed=True,
+            warning_messages=warning_messages,
+            error_messages=error_messages,
+        )
+    if error_messages:
+        raise ValueError(" ".join(error_messages))
+    return checked_parameters
+
+
+class Report:
+    """
+    Report written into a single HTML file.
+
+    The module-level functions like `print_table` print into the report
+    created by `pyreball` command, which passes the settings to the script
+    through an environment variable. A `Report` object owns its settings,
+    counters of headings, tables, figures and code blocks, and its output file
+    instead, so that multiple reports can be created in a single process,
+    e.g. in a web service, without `pyreball` command.
+
+    The report can be used as a context manager, which finishes the HTML file
+    on exit. While the context is active, the module-level functions
+    print into the report too, so that the same code can be used
+    with and without `pyreball` command. The context is not shared
+    with other threads.
+
+    Example:
+        ```python
+        with Report("results.html", toc=True) as report:
+            report.print_h1("Results")
+            report.print_table(df, caption="Data")
+        ```
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        title: Optional[str] = None,
+        config_path: Optional[Union[str, Path]] = None,
+        **parameters: Any,
+    ) -> None:
+        """
+        Create a new report and write the beginning of its HTML file.
+
+        Args:
+            path: Path to the output HTML file. Images and other files of the report
+                are stored in a directory with the same name without the suffix.
+            title: Title of the page. Defaults to the filename stem.
+            config_path: Directory with config files. If `None`, the same
+                config directory as for `pyreball` command is used.
+            **parameters: Values of the parameters from `config.ini`,
+                with underscores instead of dashes, e.g. `toc=True`
+                or `tables_display_option="paging"`. Boolean values and lists
+                can be used instead of `"yes"`/`"no"` and comma-separated strings.
+                Values that are not set are taken from `config.ini`.
+        """
+        # the CLI module is imported only when a report is created programmatically
+        from pyreball.__main__ import _get_report_configuration, _start_report_file
+
+        html_path = Path(path).expanduser().resolve()
+        if html_path.suffix != ".html":
+            raise ValueError(f"Path of the report must end with .html, not {path}.")
+        self._parameters, self._compiled_config = _get_report_configuration(
+            cli_parameters=_prepare_report_parameters(parameters),
+            config_path=Path(config_path) if config_path is not None else None,
+        )
+        self._html_path: Optional[Path] = html_path
+        self._settings: Optional[Settings] = Settings.from_parameters(
+            {**self._parameters, "html_dir_path": str(html_path.with_suffix(""))}
+        )
+        self._references: Set[str] = set()
+        self._heading_memory: Dict[str, Any] = {}
+        self._code_block_memory: Dict[str, Any] = {}
+        self._table_memory: Dict[str, Any] = {}
+        self._graph_memory: Dict[str, Any] = {}
+        self._context_tokens: List[Tuple[Any, Any, Any]] = []
+
+        html_path.parent.mkdir(parents=True, exist_ok=True)
+        self._html_end: Optional[str] = _start_report_file(
+            html_path=html_path,
+            parameters=self._parameters,
+            compiled_config=self._compiled_config,
+            title=html_path.stem if title is None else title,
+        )
+
+    @classmethod
+    def _create_detached(cls, settings: Optional[Settings] = None) -> "Report":
+        """Create a report that does not write into any file by itself.
+
+        Args:
+            settings: Settings of the report. If `None`, the settings
+                passed by `pyreball` command are used.
+        """
+        report = cls.__new__(cls)
+        report._html_path = None
+        report._settings = settings
+        report._references = set()
+        report._heading_memory = {}
+        report._code_block_memory = {}
+        report._table_memory = {}
+        report._graph_memory = {}
+        report._context_tokens = []
+        report._html_end = None
+        return report
+
+    @classmethod
+    def _create_default(cls) -> "Report":
+        """Create the report that the module-level functions print into by default.
+
+        Its settings come from `pyreball` command and its counters are
+        the module-level variables.
+        """
+        report = cls._create_detached()
+        report._references = _references
+        report._heading_memory = _heading_memory
+        report._code_block_memory = _code_block_memory
+        report._table_memory = _table_memory
+        report._graph_memory = _graph_memory
+        return report
+
+    @property
+    def path(self) -> Optional[Path]:
+        """Path to the output HTML file, or `None` for the default report."""
+        return self._html_path
+
+    @property
+    def settings(self) -> Settings:
+        """Settings of the report."""
+        return get_settings() if self._settings is None else self._settings
+
+    @property
+    def closed(self) -> bool:
+        """Whether the HTML file of the report was already finished."""
+        return self._html_path is not None and self._html_end is None
+
+    def _set_context(self) -> Tuple[Any, Any, Any]:
+        if self.closed:
+            raise RuntimeError("Cannot print into a report that is already closed.")
+        section = _current_section.get()
+        return (
+            _current_report.set(self),
+            _active_settings.set(self._settings),
+            # sections of other reports must not capture the output of this one
+            _current_section.set(
+                section if section is not None and section._report is self else None
+            ),
+        )
+
+    @staticmethod
+    def _reset_context(tokens: Tuple[Any, Any, Any]) -> None:
+        report_token, settings_token, section_token = tokens
+        _current_section.reset(section_token)
+        _active_settings.reset(settings_token)
+        _current_report.reset(report_token)
+
+    @contextmanager
+    def _activate(self) -> Iterator[None]:
+        tokens = self._set_context()
+        try:
+            yield
+        finally:
+            self._reset_context(tokens)
+
+    def sections(self) -> "Sections":
+        """
+        Create a group of sections that can be printed into concurrently.
+
+        See `Sections` class.
+
+        Returns:
+            New group of sections of this report.
+        """
+        return Sections(report=self)
+
+    def build_sections(
+        self,
+        functions: Sequence[Callable[[], Any]],
+        max_workers: Optional[int] = None,
+        mp_context: Optional[BaseContext] = None,
+    ) -> None:
+        """
+        Build sections of the report in parallel processes.
+
+        See `build_sections` function.
+
+        Args:
+            functions: Functions that print the sections.
+            max_workers: Maximum number of processes.
+            mp_context: Multiprocessing context used to start the processes.
+        """
+        build_sections(
+            functions, max_workers=max_workers, mp_context=mp_context, report=self
+        )
+
+    def close(self) -> None:
+        """
+        Finish the HTML file of the report.
+
+        This inserts the table of contents, links to JavaScript and CSS files etc.
+        Nothing can be printed into the report afterwards.
+        Closing a closed report has no effect.
+        """
+        if self._html_path is None or self._html_end is None:
+            return
+        from pyreball.__main__ import _complete_report_file, _write_build_profile
+
+        _write_build_profile(
+            self._html_path, cast(str, self._parameters["build_profile"])
+        )
+        with open(self._html_path, "a") as f:
+            f.write(self._html_end)
+        self._html_end = None
+        _complete_report_file(
+            html_path=self._html_path,
+            parameters=self._parameters,
+            external_links=self._compiled_config["external_links"],
+        )
+
+    def __enter__(self) -> "Report":
+        self._context_tokens.append(self._set_context())
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self._reset_context(self._context_tokens.pop())
+        self.close()
+
+    def set_title(self, title: str) -> None:
+        """
+        Set page title. See `set_title` function.
+
+        Args:
+            title: Title string.
+        """
+        with self._activate():
+            set_title(title)
+
+    def print(self, *values: Any, sep: str = "", end: str = "\n") -> None:
+        """
+        Print values as strings to HTML file. See `print` function.
+
+        Args:
+            *values: Zero or more values to be printed.
+            sep: Separator string to concatenate the values with.
+            end: String appended after the values.
+        """
+        with self._activate():
+            print(*values, sep=sep, end=end)
+
+    def print_div(
+        self,
+        *values: Any,
+        cl: ClParameter = None,
+        attrs: AttrsParameter = None,
+        sep: str = "",
+        end: str = "\n",
+    ) -> None:
+        """
+        Print values into a div element. See `print_div` function.
+
+        Args:
+            *values: Zero or more values to be printed into the div.
+            cl: One or more class names to be added to the `<div>` tag.
+            attrs: Additional attributes to be added to the `<div>` tag.
+            sep: String separator of the values inside the tag.
+            end: String appended after the tag.
+        """
+        with self._activate():
+            print_div(*values, cl=cl, attrs=attrs, sep=sep, end=end)
+
+    def print_h1(self, string: str, reference: Optional[Reference] = None) -> None:
+        """
+        Print h1 heading. See `print_h1` function.
+
+        Args:
+            string: Content of the heading.
+            reference: Reference object.
+        """
+        with self._activate():
+            print_h1(string, reference=reference)
+
+    def print_h2(self, string: str, reference: Optional[Reference] = None) -> None:
+        """
+        Print h2 heading. See `print_h2` function.
+
+        Args:
+            string: Content of the heading.
+            reference: Reference object.
+        """
+        with self._activate():
+            print_h2(string, reference=reference)
+
+    def print_h3(self, string: str, reference: Optional[Reference] = None) -> None:
+        """
+        Print h3 heading. See `print_h3` function.
+
+        Args:
+            string: Content of the heading.
+            reference: Reference object.
+        """
+        with self._activate():
+            print_h3(string, reference=reference)
+
+    def print_h4(self, string: str, reference: Optional[Reference] = None) -> None:
+        """
+        Print h4 heading. See `print_h4` function.
+
+        Args:
+            string: Content of the heading.
+            reference: Reference object.
+        """
+        with self._activate():
+            print_h4(string, reference=reference)
+
+    def print_h5(self, string: str, reference: Optional[Reference] = None) -> None:
+        """
+        Print h5 heading. See `print_h5` function.
+
+        Args:
+            string: Content of the heading.
+            reference: Reference object.
+        """
+        with self._activate():
+            print_h5(string, reference=reference)
+
+    def print_h6(self, string: str, reference: Optional[Reference] = None) -> None:
+        """
+        Print h6 heading. See `print_h6` function.
+
+        Args:
+            string: Content of the heading.
+            reference: Reference object.
+        """
+        with self._activate():
+            print_h6(string, reference=reference)
+
+    def print_code_block(
+        self,
+        *values: Any,
+        caption: Optional[str] = None,
+        reference: Optional[Reference] = None,
+        align: Optional[str] = None,
+        caption_position: Optional[str] = None,
+        numbered: Optional[bool] = None,
+        cl: ClParameter = None,
+        attrs: AttrsParameter = None,
+        pre_cl: ClParameter = None,
+        pre_attrs: AttrsParameter = None,
+        sep: str = "",
+        end: str = "\n",
+        syntax_highlight: Optional[str] = "python",
+    ) -> None:
+        """
+        Print values as a source code into a preformatted block.
+
+        See `print_code_block` function for the description of the parameters.
+        """
+        with self._activate():
+            print_code_block(
+                *values,
+                caption=caption,
+                reference=reference,
+                align=align,
+                caption_position=caption_position,
+                numbered=numbered,
+                cl=cl,
+                attrs=attrs,
+                pre_cl=pre_cl,
+                pre_attrs=pre_attrs,
+                sep=sep,
+                end=end,
+                syntax_highlight=syntax_highlight,
+            )
+
+    def print_table(
+        self,
+        df: "pandas.DataFrame",
+        caption: Optional[str] = None,
+        reference: Optional[Reference] = None,
+        align: Optional[str] = None,
+        caption_position: Optional[str] = None,
+        numbered: Optional[bool] = None,
+        col_align: Optional[Union[str, List[str]]] = None,
+        display_option: Optional[str] = None,
+        paging_sizes: Optional[List[Union[int, str]]] = None,
+        scroll_y_height: Optional[str] = None,
+        scroll_x: Optional[bool] = None,
+        sortable: Optional[bool] = None,
+        sorting_definition: Optional[List[Tuple[int, str]]] = None,
+        search_box: Optional[bool] = None,
+        datatables_style: Optional[Union[str, List[str]]] = None,
+        datatables_definition: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Print pandas DataFrame into HTML.
+
+        See `print_table` function for the description of the parameters.
+        """
+        with self._activate():
+            print_table(
+                df,
+                caption=caption,
+                reference=reference,
+                align=align,
+                caption_position=caption_position,
+                numbered=numbered,
+                col_align=col_align,
+                display_option=display_option,
+                paging_sizes=paging_sizes,
+                scroll_y_height=scroll_y_height,
+                scroll_x=scroll_x,
+                sortable=sortable,
+                sorting_definition=sorting_definition,
+                search_box=search_box,
+                datatables_style=datatables_style,
+                datatables_definition=datatables_definition,
+                **kwargs,
+            )
+
+    def print_figure(
+        self,
+        fig: FigType,
+        caption: Optional[str] = None,
+        reference: Optional[Reference] = None,
+        align: Optional[str] = None,
+        caption_position: Optional[str] = None,
+        numbered: Optional[bool] = None,
+        matplotlib_format: Optional[str] = None,
+        embedded: Optional[bool] = None,
+    ) -> None:
+        """
+        Print a figure.
+
+        See `print_figure` function for the description of the parameters.
+        """
+        with self._activate():
+            print_figure(
+                fig,
+                caption=caption,
+                reference=reference,
+                align=align,
+                caption_position=caption_position,
+                numbered=numbered,
+                matplotlib_format=matplotlib_format,
+                embedded=embedded,
+            )
+
+
+class Section:
+    """
+    Part of a report with its own output buffer.
+
+    Sections are created by `Sections.section` method in the order,
+    in which they should appear in the report. While a section is active,
+    i.e. inside its `with` block, all printing functions write into the buffer
+    of the section instead of the report. Headings, tables, figures and code blocks
+    are numbered only when the section is merged into the report, so that
+    their numbers do not depend on the order, in which the sections were printed.
+
+    Each section can be printed into from a different thread, but a single section
+    should not be printed into from multiple threads at the same time.
+    """
+
+    def __init__(self, report: "Report", section_id: Optional[int] = None) -> None:
+        self._report = report
+        self.id = next(_section_ids) if section_id is None else section_id
+        self._chunks: List[Union[str, _PendingHeading]] = []
+        self._reference_ids = itertools.count(1)
+        # tuples of (reference_id, anchor, text) with placeholders of indices
+        self._reference_targets: List[Tuple[str, str, str]] = []
+        self._marked_reference_ids: List[str] = []
+        self._code_block_memory: Dict[str, Any] = {}
+        self._table_memory: Dict[str, Any] = {}
+        self._graph_memory: Dict[str, Any] = {}
+        # names of the files written by the section into the report directory
+        self._file_names: List[str] = []
+        self._context_tokens: List[Tuple[Any, Any, Any]] = []
+        self.merged = False
+
+    def __enter__(self) -> "Section":
+        if self.merged:
+            raise RuntimeError("Cannot print into a section that is already merged.")
+        # the section can be entered in another thread,
+        # which does not share the context with the thread that created it
+        self._context_tokens.append(
+            (
+                _current_report.set(self._report),
+                _active_settings.set(self._report._settings),
+                _current_section.set(self),
+            )
+        )
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        Report._reset_context(self._context_tokens.pop())
+
+    def _next_reference_id(self) -> str:
+        # the IDs do not depend on the order, in which the sections are printed
+        return f"id{_reference_id_prefix}{self.id}_{next(self._reference_ids)}"
+
+    def _count_elements(self, memory: Dict[str, Any], key: str) -> int:
+        return cast(int, memory.get(key, 1)) - 1
+
+    def _discard(self) -> None:
+        """Remove everything printed into the section, e.g. when printing failed."""
+        html_dir_path = self._report.settings.html_dir_path
+        if html_dir_path:
+            for file_name in self._file_names:
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(html_dir_path, file_name))
+        with _references_lock:
+            self._report._references.difference_update(self._marked_reference_ids)
+        self._chunks = []
+        self._reference_targets = []
+        self._marked_reference_ids = []
+        self._code_block_memory = {}
+        self._table_memory = {}
+        self._graph_memory = {}
+        self._file_names = []
+
+
+def _replace_index_placeholders(text: str, offsets: Dict[Tuple[int, str], int]) -> str:
+    def replace(match: "re.Match[str]") -> str:
+        kind, section_id, index, format_spec = match.groups()
+        offset = offsets.get((int(section_id), kind))
+        if offset is None:
+            # the element belongs to a section that is not merged yet
+            return match.group(0)
+        return format(offset + int(index), format_spec)
+
+    return _INDEX_PLACEHOLDER_PATTERN.sub(replace, text)
+
+
+class Sections:
+    """
+    Group of report sections that can be printed into concurrently.
+
+    This is useful when the sections of a report are computed independently,
+    e.g. in threads. Each thread prints into its own section and the sections
+    are merged into the report in the order of their creation.
+    The numbers of headings, tables, figures and code blocks are the same as
+    if the sections were printed one after another.
+
+    Example:
+        ```python
+        with pb.Sections() as sections:
+            with ThreadPoolExecutor() as executor:
+                for region in regions:
+                    executor.submit(print_region, region, sections.section())
+
+        def print_region(region, section):
+            with section:
+                pb.print_h2(region)
+                pb.print_table(compute_table(region))
+        ```
+    """
+
+    def __init__(self, report: Optional[Report] = None) -> None:
+        """
+        Create a new group of sections.
+
+        Args:
+            report: Report, into which the sections are merged.
+                Defaults to the report that is currently printed into.
+        """
+        self._report = _get_report() if report is None else report
+        # sections that are not merged yet, in the order of their creation
+        self._sections: List[Section] = []
+        self._lock = threading.Lock()
+
+    def section(self) -> Section:
+        """
+        Create a new section at the end of the group.
+
+        Returns:
+            New section.
+        """
+        with self._lock:
+            section = Section(self._report)
+            self._sections.append(section)
+        return section
+
+    def merge(self, until: Optional[Section] = None) -> None:
+        """
+        Write the sections into the report in the order of their creation.
+
+        This must be called after all the merged sections are printed.
+        Sections that were already merged are skipped.
+
+        Args:
+            until: The last section to be merged. If `None`, all sections are merged.
+        """
+        with self._lock:
+            if until is None:
+                count = len(self._sections)
+            elif until.merged:
+                # the preceding sections were merged together with it
+                count = 0
+            else:
+                count = self._sections.index(until) + 1
+            sections = self._sections[:count]
+            del self._sections[:count]
+            for section in sections:
+                section.merged = True
+
+        with self._report._activate():
+            settings = get_settings()
+            report = self._report
+            memories = {
+                "code": (report._code_block_memory, "code_block_index"),
+                "table": (report._table_memory, "table_index"),
+                "figure": (report._graph_memory, "fig_index"),
+            }
+            section_memories = {
+                "code": "_code_block_memory",
+                "table": "_table_memory",
+                "figure": "_graph_memory",
+            }
+            # the elements of each section are numbered after the elements
+            # of the report and all preceding sections
+            offsets: Dict[Tuple[int, str], int] = {}
+            for kind, (memory, key) in memories.items():
+                offset = memory.get(key, 1) - 1
+                for section in sections:
+                    offsets[(section.id, kind)] = offset
+                    offset += section._count_elements(
+                        getattr(section, section_memories[kind]), key
+                    )
+                if offset > 0:
+                    memory[key] = offset + 1
+
+            for section in sections:
+                duplicate_elements = _merge_altair_datasets(section)
+                for chunk in section._chunks:
+                    if isinstance(chunk, _PendingHeading):
+                        _, tidy_string, header_contents = _prepare_heading(
+                            chunk.string,
+                            level=chunk.level,
+                            reference=chunk.reference,
+                            numbered=bool(settings.numbered_headings),
+                        )
+                        _write_heading(tidy_string, header_contents, chunk.level)
+                    else:
+                        for element in duplicate_elements:
+                            chunk = chunk.replace(element, "")
+                        _write_to_html(
+                            _replace_index_placeholders(chunk, offsets), end=""
+                        )
+                for reference_id, anchor, text in section._reference_targets:
+                    _add_reference_target(
+                        reference_id,
+                        anchor=_replace_index_placeholders(anchor, offsets),
+                        text=_replace_index_placeholders(text, offsets),
+                    )
+                # files of the sections, e.g. images, are named by the placeholders too
+                if settings.html_dir_path:
+                    for file_name in section._file_names:
+                        os.replace(
+                            os.path.join(settings.html_dir_path, file_name),
+                            os.path.join(
+                                settings.html_dir_path,
+                                _replace_index_placeholders(file_name, offsets),
+                            ),
+                        )
+                section._chunks = []
+                section._reference_targets = []
+                section._marked_reference_ids = []
+                section._file_names = []
+
+    def __enter__(self) -> "Sections":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.merge()
+
+
+def _build_section_in_process(
+    function: Callable[[], Any], settings: Settings, section_id: int
+) -> Tuple[
+    List[Union[str, _PendingHeading]],
+    List[Dict[str, Any]],
+    List[str],
+    List[Tuple[str, str, str]],
+    List[str],
+]:
+    global _reference_ids, _reference_id_prefix
+    # Counters of a forked process continue from the state of the parent,
+    # so the IDs of references created outside the section (or in nested sections)
+    # would collide with the IDs used by the parent and other workers.
+    _reference_ids = itertools.count(1)
+    _reference_id_prefix = f"w{section_id}_"
+    report = Report._create_detached(settings)
+    section = Section(report, section_id=section_id)
+    with section:
+        function()
+    memories = [
+        section._code_block_memory,
+        section._table_memory,
+        section._graph_memory,
+    ]
+    return (
+        section._chunks,
+        memories,
+        sorted(report._references),
+        section._reference_targets,
+        section._file_names,
+    )
+
+
+def build_sections(
+    functions: Sequence[Callable[[], Any]],
+    max_workers: Optional[int] = None,
+    mp_context: Optional[BaseContext] = None,
+    report: Optional[Report] = None,
+) -> None:
+    """
+    Build sections of a report in parallel processes.
+
+    Each function is called in a separate process with its own section active,
+    so it can use the module-level printing functions. When all functions finish,
+    the sections are merged into the report in the order of the functions
+    (see `Sections` class). The numbers of headings, tables, figures and code
+    blocks, as well as the references, are the same as if the functions were called
+    one after another. Unlike threads, processes are not limited by the GIL,
+    so this is useful for CPU-bound sections.
+
+    References created by a function get IDs prefixed by the ID of its section,
+    which is assigned in this process in the order of the functions.
+    Therefore, the IDs are unique across all processes and the same in every run,
+    regardless of which process builds which section.
+
+    The functions and their return values must be picklable, e.g. module-level
+    functions, possibly wrapped by `functools.partial` to pass arguments.
+    Values returned by the functions are ignored.
+
+    Args:
+        functions: Functions without arguments that print the sections.
+        max_workers: Maximum number of processes.
+            Defaults to the number of processors.
+        mp_context: Multiprocessing context used to start the processes.
+            Defaults to the default context of the platform.
+        report: Report, into which the sections are merged.
+            Defaults to the report that is currently printed into.
+    """
+    sections = Sections(report=report)
+    report = sections._report
+    declared_sections = [sections.section() for _ in functions]
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=mp_context
+    ) as executor:
+        futures = [
+            executor.submit(
+                _build_section_in_process, function, report.settings, section.id
+            )
+            for function, section in zip(functions, declared_sections)
+        ]
+        results = [future.result() for future in futures]
+
+    with report._activate():
+        for section, (
+            chunks,
+            memories,
+            reference_ids,
+            reference_targets,
+            file_names,
+        ) in zip(declared_sections, results):
+            # check that the references were not used by other sections too
+            for reference_id in reference_ids:
+                _check_and_mark_reference_id(reference_id)
+            section._chunks = chunks
+            section._reference_targets = reference_targets
+            section._file_names = file_names
+            (
+                section._code_block_memory,
+                section._table_memory,
+                section._graph_memory,
+            ) = memories
+    sections.merge()
+
+
+class AsyncReport:
+    """
+    Report with awaitable printing methods for use in asyncio applications.
+
+    Each printing method returns an awaitable, which is finished when the element
+    is written into the report. The elements are prepared in an executor,
+    so that serialization of tables and figures, as well as disk I/O, do not
+    block the event loop. Elements printed concurrently, e.g. by `asyncio.gather`,
+    are prepared in parallel, but they are written into the report in the order,
+    in which the methods were called, and numbered accordingly.
+
+    Tables and figures must not be modified until they are printed.
+
+    Example:
+        ```python
+        async with AsyncReport("results.html", toc=True) as report:
+            await report.print_h1("Results")
+            await asyncio.gather(
+                report.print_table(df),
+                report.print_figure(fig),
+            )
+        ```
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        title: Optional[str] = None,
+        config_path: Optional[Union[str, Path]] = None,
+        executor: Optional[Executor] = None,
+        **parameters: Any,
+    ) -> None:
+        """
+        Prepare a new report. The HTML file is created by `open` method.
+
+        Args:
+            path: Path to the output HTML file.
+            title: Title of the page. Defaults to the filename stem.
+            config_path: Directory with config files.
+            executor: Executor for preparing and writing the elements.
+                Defaults to the default executor of the event loop.
+            **parameters: Values of the parameters from `config.ini`.
+                See `Report` class.
+        """
+        self._report_arguments: Dict[str, Any] = {
+            "path": path,
+            "title": title,
+            "config_path": config_path,
+            **parameters,
+        }
+        self._executor = executor
+        self._report: Optional[Report] = None
+        self._sections: Optional[Sections] = None
+        self._last_operation: Optional["asyncio.Future[None]"] = None
+
+    @property
+    def report(self) -> Report:
+        """The underlying synchronous report."""
+        if self._report is None:
+            raise RuntimeError("The report is not opened yet.")
+        return self._report
+
+    async def open(self) -> "AsyncReport":
+        """
+        Create the HTML file of the report.
+
+        Returns:
+            The report itself.
+        """
+        if self._report is None:
+            loop = asyncio.get_running_loop()
+            self._report = await loop.run_in_executor(
+                self._executor,
+                functools.partial(Report, **self._report_arguments),
+            )
+            self._sections = self._report.sections()
+        return self
+
+    async def close(self) -> None:
+        """Wait for all printed elements and finish the HTML file of the report."""
+        if self._last_operation is not None:
+            await asyncio.wait([self._last_operation])
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.report.close)
+
+    async def __aenter__(self) -> "AsyncReport":
+        return await self.open()
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    async def _run_in_order(
+        self,
+        previous_operation: Optional["asyncio.Future[None]"],
+        prepare: Optional[Callable[[], None]],
+        write: Callable[[], None],
+        discard: Optional[Callable[[], None]] = None,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        prepared: Optional["asyncio.Future[None]"] = None
+        try:
+            if prepare is not None:
+                prepared = loop.run_in_executor(self._executor, prepare)
+                # cancellation does not stop the executor, so it is shielded
+                # to be able to wait until the element stops being prepared
+                await asyncio.shield(prepared)
+        except asyncio.CancelledError:
+            if prepared is not None:
+                await asyncio.wait([prepared])
+            if discard is not None:
+                await loop.run_in_executor(self._executor, discard)
+            raise
+        finally:
+            # the elements are written in the order of the calls,
+            # even if some of the previous ones failed
+            if previous_operation is not None:
+                await asyncio.wait([previous_operation])
+            await loop.run_in_executor(self._executor, write)
+
+    def _schedule(
+        self,
+        prepare: Optional[Callable[[], None]],
+        write: Callable[[], None],
+        discard: Optional[Callable[[], None]] = None,
+    ) -> "asyncio.Future[None]":
+        operation = asyncio.ensure_future(
+            self._run_in_order(self._last_operation, prepare, write, discard)
+        )
+        self._last_operation = operation
+        return operation
+
+    def _print(
+        self, function: Callable[..., None], *args: Any, **kwargs: Any
+    ) -> "asyncio.Future[None]":
+        sections = self._sections
+        if sections is None:
+            raise RuntimeError("The report is not opened yet.")
+        # the section is created right away to reserve the position of the element
+        section = sections.section()
+
+        def prepare() -> None:
+            try:
+                with section:
+                    function(*args, **kwargs)
+            except BaseException:
+                # only the position of the failed element is merged
+                section._discard()
+                raise
+
+        return self._schedule(
+            prepare,
+            functools.partial(sections.merge, until=section),
+            # a cancelled element is not written, only its position is merged
+            discard=section._discard,
+        )
+
+    def set_title(self, title: str) -> "asyncio.Future[None]":
+        """
+        Set page title. See `set_title` function.
+
+        Args:
+            title: Title string.
+        """
+        return self._schedule(None, functools.partial(self.report.set_title, title))
+
+    def print(self, *values: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print`."""
+        return self._print(print, *values, **kwargs)
+
+    def print_div(self, *values: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_div`."""
+        return self._print(print_div, *values, **kwargs)
+
+    def print_h1(self, *args: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_h1`."""
+        return self._print(print_h1, *args, **kwargs)
+
+    def print_h2(self, *args: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_h2`."""
+        return self._print(print_h2, *args, **kwargs)
+
+    def print_h3(self, *args: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_h3`."""
+        return self._print(print_h3, *args, **kwargs)
+
+    def print_h4(self, *args: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_h4`."""
+        return self._print(print_h4, *args, **kwargs)
+
+    def print_h5(self, *args: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_h5`."""
+        return self._print(print_h5, *args, **kwargs)
+
+    def print_h6(self, *args: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_h6`."""
+        return self._print(print_h6, *args, **kwargs)
+
+    def print_code_block(self, *values: Any, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_code_block`."""
+        return self._print(print_code_block, *values, **kwargs)
+
+    def print_table(
+        self, df: "pandas.DataFrame", **kwargs: Any
+    ) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_table`."""
+        return self._print(print_table, df, **kwargs)
+
+    def print_figure(self, fig: FigType, **kwargs: Any) -> "asyncio.Future[None]":
+        """Awaitable variant of `Report.print_figure`."""
+        return self._print(print_figure, fig, **kwargs)
+
+
+_default_report = Report._create_default()
@@ -1,8 +1,10 @@
 """Text utils for creating strings with HTML elements."""
 
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 
 from pyreball._common import AttrsParameter, ClParameter
+from pyreball.utils.highlight import HIGHLIGHT_CLASS, highlight_code
+from pyreball.utils.param import get_settings
 
 
 def _construct_attrs_str(attrs: AttrsParameter) -> Optional[str]:
@@ -91,6 +93,20 @@ def _collect_classes_for_code_strings(
     return cl
 
 
+def _highlight_code_values(
+    values: Tuple[Any, ...], sep: str, syntax_highlight: Optional[str]
+) -> Optional[str]:
+    """Highlight the code at build time if it is turned on in the settings.
+
+    Returns:
+        HTML string with highlighted code or `None` if the code should be
+        highlighted in the browser.
+    """
+    if syntax_highlight is None or get_settings().code_highlighting != "build":
+        return None
+    return highlight_code(sep.join(str(v) for v in values), syntax_highlight)
+
+
 def code(
     *values: Any,
     cl: ClParameter = None,
@@ -125,10 +141,17 @@ def code(
             - see column "Aliases". If `None`, no highlighting is applied.
             When highlight is turned on, language name and `'inline-highlight'`
             are added to the element as classes.
+            If the code is highlighted at build time (see `code-highlighting`
+            option), `'pyreball-highlight'` class is added instead of
+            `'inline-highlight'`.
 
     Returns:
         HTML string representing the tag with given values.
     """
+    highlighted_code = _highlight_code_values(values, sep, syntax_highlight)
+    if highlighted_code is not None:
+        cl = _collect_classes_for_code_strings([HIGHLIGHT_CLASS], cl, syntax_highlight)
+        return tag(highlighted_code, name="code", cl=cl, attrs=attrs, sep=sep)
     cl = _collect_classes_for_code_strings(["inline-highlight"], cl, syntax_highlight)
     return tag(*values, name="code", cl=cl, attrs=attrs, sep=sep)
 
@@ -172,10 +195,18 @@ def code_block(
             - see column "Aliases". If `None`, no highlighting is applied.
             When highlight is turned on, language name and `'block-highlight'`
             are added to the element as classes.
+            If the code is highlighted at build time (see `code-highlighting`
+            option), `'pyreball-highlight'` class is added instead of
+            `'block-highlight'`.
 
     Returns:
         HTML string representing the tag with given values.
     """
+    highlighted_code = _highlight_code_values(values, sep, syntax_highlight)
+    if highlighted_code is not None:
+        cl = _collect_classes_for_code_strings([HIGHLIGHT_CLASS], cl, syntax_highlight)
+        code_text = tag(highlighted_code, name="code", cl=cl, attrs=attrs, sep=sep)
+        return tag(code_text, name="pre", cl=pre_cl, attrs=pre_attrs)
     cl = _collect_classes_for_code_strings(["block-highlight"], cl, syntax_highlight)
     code_text = tag(*values, name="code", cl=cl, attrs=attrs, sep=sep)
     return tag(code_text, name="pre", cl=pre_cl, attrs=pre_attrs)
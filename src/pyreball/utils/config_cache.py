@@ -0,0 +1,199 @@
+"""Cache of parsed config files shared by all runs of Pyreball."""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pyreball._common import get_cache_directory
+from pyreball.constants import (
+    CONFIG_INI_FILENAME,
+    LINKS_INI_FILENAME,
+    STYLES_TEMPLATE_FILENAME,
+)
+from pyreball.utils.param import (
+    Parameter,
+    check_and_fix_parameters,
+    get_external_links_from_config,
+    get_raw_file_config,
+)
+from pyreball.utils.template import read_css_template
+
+logger = logging.getLogger(__name__)
+
+# Increase when the structure of the cached config changes.
+_CACHE_FORMAT_VERSION = 2
+
+_compiled_config_memory: Dict[str, Dict[str, Any]] = {}
+
+
+def _get_file_hash(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _get_source_record(path: Path) -> List[Any]:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size, _get_file_hash(path)]
+
+
+def _sources_are_unchanged(sources: Dict[str, List[Any]]) -> bool:
+    """Check that the files used for the compiled config have not changed.
+
+    Files with the same modification time and size are considered unchanged.
+    Only when they differ, e.g. after the file is touched, the hash of the
+    contents is compared. The records of such files are updated in place.
+    """
+    for path_str, record in sources.items():
+        try:
+            stat = os.stat(path_str)
+        except OSError:
+            return False
+        if [stat.st_mtime_ns, stat.st_size] == record[:2]:
+            continue
+        if stat.st_size != record[1] or _get_file_hash(Path(path_str)) != record[2]:
+            return False
+        record[0] = stat.st_mtime_ns
+    return True
+
+
+def _get_specifications_fingerprint(
+    parameter_specifications: List[Parameter],
+) -> List[Any]:
+    return [
+        [
+            type(spec).__name__,
+            spec.param_key,
+            getattr(spec, "default", None),
+            getattr(spec, "choices", None),
+            list(getattr(spec, "boundaries", [])) or None,
+        ]
+        for spec in parameter_specifications
+    ]
+
+
+def _read_cached_config(cache_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)  # type: ignore[no-any-return]
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cached_config(cache_path: Path, compiled_config: Dict[str, Any]) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # write through a temporary file so that no reader can see a partial file
+        tmp_path = cache_path.parent / f".{cache_path.name}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(compiled_config, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # the cache is only an optimization
+        logger.debug(f"Failed to write compiled config into cache {cache_path}.")
+
+
+def _compile_config(
+    config_directory: Path,
+    html_template_path: Path,
+    parameter_specifications: List[Parameter],
+) -> Dict[str, Any]:
+    source_paths = [
+        config_directory / CONFIG_INI_FILENAME,
+        config_directory / LINKS_INI_FILENAME,
+        config_directory / STYLES_TEMPLATE_FILENAME,
+        html_template_path,
+    ]
+    # record the sources before reading them, so that any change
+    # made in the meantime invalidates the cache
+    sources = {
+        str(path): _get_source_record(path) for path in source_paths if path.is_file()
+    }
+    with open(html_template_path) as f:
+        html_template = f.read()
+    return {
+        "format_version": _CACHE_FORMAT_VERSION,
+        "specifications": _get_specifications_fingerprint(parameter_specifications),
+        "sources": sources,
+        # the parameters are checked on every run, so that the warnings are not lost
+        "raw_parameters": get_raw_file_config(
+            filename=CONFIG_INI_FILENAME,
+            directory=config_directory,
+            parameter_specifications=parameter_specifications,
+        ),
+        "external_links": get_external_links_from_config(
+            filename=LINKS_INI_FILENAME, directory=config_directory
+        ),
+        "css_template": read_css_template(
+            filename=STYLES_TEMPLATE_FILENAME, directory=config_directory
+        ),
+        "html_template": html_template,
+    }
+
+
+def _is_valid(
+    compiled_config: Dict[str, Any], specifications_fingerprint: List[Any]
+) -> bool:
+    return (
+        compiled_config.get("format_version") == _CACHE_FORMAT_VERSION
+        and compiled_config.get("specifications") == specifications_fingerprint
+        and _sources_are_unchanged(compiled_config["sources"])
+    )
+
+
+def get_compiled_config(
+    config_directory: Path,
+    html_template_path: Path,
+    parameter_specifications: List[Parameter],
+) -> Dict[str, Any]:
+    """Get parsed config files, reusing the results of previous runs if possible.
+
+    The parsed config is cached in memory and on disk (see `get_cache_directory`),
+    so that it can be reused by subsequent runs and parallel processes.
+    It is invalidated automatically when any of the config files changes
+    or when the parameter specifications change.
+
+    Args:
+        config_directory: Directory with the config files.
+        html_template_path: Path to the HTML template.
+        parameter_specifications: Specifications of the parameters in `config.ini`.
+
+    Returns:
+        Dictionary with keys `parameters` (checked parameters from `config.ini`),
+        `external_links` (links from `external_links.ini`), `css_template`
+        and `html_template` (texts of the templates).
+    """
+    key = hashlib.sha256(
+        f"{config_directory.resolve()}\0{html_template_path.resolve()}".encode()
+    ).hexdigest()[:32]
+    specifications_fingerprint = json.loads(
+        json.dumps(_get_specifications_fingerprint(parameter_specifications))
+    )
+
+    compiled_config = _compiled_config_memory.get(key)
+    if compiled_config is None or not _is_valid(
+        compiled_config, specifications_fingerprint
+    ):
+        cache_path = get_cache_directory("config") / f"{key}.json"
+        compiled_config = _read_cached_config(cache_path)
+        if compiled_config is None or not _is_valid(
+            compiled_config, specifications_fingerprint
+        ):
+            compiled_config = _compile_config(
+                config_directory=config_directory,
+                html_template_path=html_template_path,
+                parameter_specifications=parameter_specifications,
+            )
+            _write_cached_config(cache_path, compiled_config)
+        _compiled_config_memory[key] = compiled_config
+    # the callers may modify the returned structure
+    result = copy.deepcopy(compiled_config)
+    result["parameters"] = check_and_fix_parameters(
+        parameters=result.pop("raw_parameters"),
+        parameter_specifications=parameter_specifications,
+        none_allowed=False,
+    )
+    return result
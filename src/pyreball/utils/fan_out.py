@@ -0,0 +1,80 @@
+"""Loading of argument sets for rendering one script into many reports."""
+
+import csv
+import itertools
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+ArgumentSet = Dict[str, Any]
+
+
+def load_argument_sets(path: Path) -> List[ArgumentSet]:
+    """
+    Load sets of script arguments from a CSV or JSON file.
+
+    In a CSV file, each row is one argument set and the columns are the names
+    of the arguments. Empty values are left out.
+    A JSON file contains either a list of objects, each of them being
+    one argument set, or an object that maps the names of the arguments
+    to lists of their values, in which case all combinations of the values
+    are used (i.e. a parameter grid).
+
+    Args:
+        path: Path to a file with `.csv` or `.json` suffix.
+
+    Returns:
+        List of argument sets, i.e. dictionaries that map argument names
+        to their values.
+    """
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="") as f:
+            return [
+                {key: value for key, value in row.items() if value}
+                for row in csv.DictReader(f)
+            ]
+    elif path.suffix.lower() == ".json":
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+            return data
+        elif isinstance(data, dict):
+            names = list(data.keys())
+            values = [
+                value if isinstance(value, list) else [value] for value in data.values()
+            ]
+            return [
+                dict(zip(names, combination))
+                for combination in itertools.product(*values)
+            ]
+        raise ValueError(
+            f"File {path} must contain a list of objects or an object with lists."
+        )
+    raise ValueError(f"File with argument sets must be a CSV or JSON file, not {path}.")
+
+
+def format_script_args(argument_set: ArgumentSet) -> List[str]:
+    """
+    Convert an argument set to command-line arguments of the script.
+
+    Each name is converted to an option `--name` (names starting with `-`
+    are used as they are). The option is followed by the value, or by
+    all the values in the case of lists. Options with value `True` are
+    used without any value and options with `False` or `None` are left out.
+
+    Args:
+        argument_set: Dictionary that maps argument names to their values.
+
+    Returns:
+        List of arguments.
+    """
+    script_args = []
+    for name, value in argument_set.items():
+        if value is None or value is False:
+            continue
+        script_args.append(name if name.startswith("-") else f"--{name}")
+        if value is True:
+            continue
+        values = value if isinstance(value, list) else [value]
+        script_args.extend(str(item) for item in values)
+    return script_args
@@ -0,0 +1,102 @@
+import hashlib
+import html
+import logging
+import os
+import re
+import threading
+from typing import Optional, cast
+
+from pyreball._common import get_cache_directory
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_CLASS = "pyreball-highlight"
+
+
+def _read_cached_highlight(key: str) -> Optional[str]:
+    try:
+        with open(
+            get_cache_directory("highlight") / f"{key}.html", encoding="utf-8"
+        ) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cached_highlight(key: str, highlighted_code: str) -> None:
+    cache_path = get_cache_directory("highlight")
+    try:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        # write through a temporary file so that no reader can see a partial file
+        tmp_path = cache_path / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(highlighted_code)
+        os.replace(tmp_path, cache_path / f"{key}.html")
+    except OSError:
+        # the cache is only an optimization
+        logger.debug(f"Failed to write highlighted code into cache {cache_path}.")
+
+
+def highlight_code(code_html: str, language: str) -> Optional[str]:
+    """Highlight the code syntax with Pygments.
+
+    As in the case of highlight.js, only the text content of the code is
+    highlighted, i.e. any HTML tags are dropped and HTML entities are unescaped.
+    Highlighted codes are cached on disk, keyed by Pygments version,
+    language and the code itself.
+
+    Args:
+        code_html: HTML string with the code.
+        language: Name or alias of the language, e.g. `python`.
+
+    Returns:
+        HTML string with the code tokens wrapped in span elements with
+        Pygments classes, or `None` if Pygments is not installed
+        or does not know the language.
+    """
+    try:
+        import pygments
+        from pygments.formatters import HtmlFormatter
+        from pygments.lexers import get_lexer_by_name
+        from pygments.util import ClassNotFound
+    except ImportError:
+        logger.warning(
+            "Pygments is not installed, code will be highlighted in the browser."
+        )
+        return None
+
+    code_text = html.unescape(re.sub(r"<[^>]*>", "", code_html))
+    key = hashlib.sha256(
+        "\0".join([pygments.__version__, language, code_text]).encode("utf-8")
+    ).hexdigest()
+    highlighted_code = _read_cached_highlight(key)
+    if highlighted_code is not None:
+        return highlighted_code
+
+    try:
+        lexer = get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+    highlighted_code = cast(
+        str, pygments.highlight(code_text, lexer, HtmlFormatter(nowrap=True))
+    )
+    if not code_text.endswith("\n"):
+        # the formatter terminates the last line even if the code does not
+        highlighted_code = highlighted_code[:-1]
+    _write_cached_highlight(key, highlighted_code)
+    return highlighted_code
+
+
+def get_highlight_style_definitions() -> str:
+    """Get CSS definitions for code highlighted by `highlight_code`."""
+    from pygments.formatters import HtmlFormatter
+
+    style_definitions = HtmlFormatter(style="default").get_style_defs(
+        f".{HIGHLIGHT_CLASS}"
+    )
+    # skip the global definitions for pre elements and line numbers
+    return "\n".join(
+        line
+        for line in style_definitions.splitlines()
+        if line.startswith(f".{HIGHLIGHT_CLASS}")
+    )
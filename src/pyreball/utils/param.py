@@ -7,8 +7,10 @@ import re
 import shutil
 import sys
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union, cast
 
 ParametersType = Dict[str, Optional[Union[str, int]]]
 
@@ -291,7 +293,7 @@ def read_file_config(filename: str, directory: Path) -> configparser.ConfigParse
         sys.exit(1)
 
 
-def get_file_config(
+def get_raw_file_config(
     filename: str, directory: Path, parameter_specifications: List[Parameter]
 ) -> ParametersType:
     config = read_file_config(filename, directory)
@@ -308,8 +310,18 @@ def get_file_config(
         param_spec.param_key: config[section_name].get(param_spec.config_param_key)
         for param_spec in parameter_specifications
     }
+    return config_params
+
+
+def get_file_config(
+    filename: str, directory: Path, parameter_specifications: List[Parameter]
+) -> ParametersType:
     return check_and_fix_parameters(
-        parameters=config_params,
+        parameters=get_raw_file_config(
+            filename=filename,
+            directory=directory,
+            parameter_specifications=parameter_specifications,
+        ),
         parameter_specifications=parameter_specifications,
         none_allowed=False,
     )
@@ -374,7 +386,146 @@ def _map_env_value(value: str) -> Any:
     return {"None": None, "yes": True, "no": False}.get(value, value)
 
 
-def get_parameter_value(key: str) -> Any:
+def _parse_tables_paging_sizes(sizes: str) -> List[Union[int, str]]:
+    return [
+        value if value.lower() == "all" else int(value) for value in sizes.split(",")
+    ]
+
+
+def _parse_tables_datatables_style(style: str) -> List[str]:
+    return re.split(r"[, ]", style)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Immutable settings of a single Pyreball session.
+
+    All values are already parsed into their final types, so that the functions
+    printing into the HTML file need only an attribute access to read them.
+    Values of parameters that were not set are `None`.
+    """
+
+    __slots__ = (
+        "html_dir_path",
+        "html_dir_name",
+        "html_file_path",
+        "page_width",
+        "keep_stdout",
+        "toc",
+        "numbered_headings",
+        "align_code_blocks",
+        "code_block_captions_position",
+        "numbered_code_blocks",
+        "code_highlighting",
+        "align_tables",
+        "table_captions_position",
+        "numbered_tables",
+        "tables_display_option",
+        "tables_paging_sizes",
+        "tables_scroll_y_height",
+        "tables_scroll_x",
+        "sortable_tables",
+        "tables_search_box",
+        "tables_datatables_style",
+        "lazy_tables",
+        "align_figures",
+        "figure_captions_position",
+        "numbered_figures",
+        "matplotlib_format",
+        "matplotlib_embedded",
+        "lazy_figures",
+        "plotly_data_encoding",
+        "altair_data_mode",
+        "asset_cache_path",
+        "assets_path",
+        "javascript_runtime",
+        "script_loading",
+        "self_contained",
+        "build_profile",
+    )
+
+    html_dir_path: Optional[str]
+    html_dir_name: Optional[str]
+    html_file_path: Optional[str]
+    page_width: Optional[int]
+    keep_stdout: Optional[bool]
+    toc: Optional[bool]
+    numbered_headings: Optional[bool]
+    align_code_blocks: Optional[str]
+    code_block_captions_position: Optional[str]
+    numbered_code_blocks: Optional[bool]
+    code_highlighting: Optional[str]
+    align_tables: Optional[str]
+    table_captions_position: Optional[str]
+    numbered_tables: Optional[bool]
+    tables_display_option: Optional[str]
+    tables_paging_sizes: Optional[List[Union[int, str]]]
+    tables_scroll_y_height: Optional[str]
+    tables_scroll_x: Optional[bool]
+    sortable_tables: Optional[bool]
+    tables_search_box: Optional[bool]
+    tables_datatables_style: Optional[List[str]]
+    lazy_tables: Optional[bool]
+    align_figures: Optional[str]
+    figure_captions_position: Optional[str]
+    numbered_figures: Optional[bool]
+    matplotlib_format: Optional[str]
+    matplotlib_embedded: Optional[bool]
+    lazy_figures: Optional[bool]
+    plotly_data_encoding: Optional[str]
+    altair_data_mode: Optional[str]
+    asset_cache_path: Optional[str]
+    assets_path: Optional[str]
+    javascript_runtime: Optional[str]
+    script_loading: Optional[str]
+    self_contained: Optional[bool]
+    build_profile: Optional[Union[bool, str]]
+
+    @classmethod
+    def from_parameters(cls, parameters: Mapping[str, Any]) -> "Settings":
+        """Create settings from parameters passed to the script.
+
+        Args:
+            parameters: Mapping from parameter keys (with underscores) to values,
+                either as strings from the CLI and config files,
+                or already parsed. Unknown keys are ignored.
+
+        Returns:
+            Settings with parsed values.
+        """
+        values = {}
+        for field in fields(cls):
+            value = parameters.get(field.name)
+            values[field.name] = (
+                _map_env_value(value) if isinstance(value, str) else value
+            )
+        html_dir_path = values["html_dir_path"]
+        if html_dir_path:
+            if "html_dir_name" not in parameters:
+                values["html_dir_name"] = os.path.basename(html_dir_path)
+            if "html_file_path" not in parameters:
+                values["html_file_path"] = html_dir_path + ".html"
+        if isinstance(values["tables_paging_sizes"], str):
+            values["tables_paging_sizes"] = _parse_tables_paging_sizes(
+                values["tables_paging_sizes"]
+            )
+        if isinstance(values["tables_datatables_style"], str):
+            values["tables_datatables_style"] = (
+                _parse_tables_datatables_style(values["tables_datatables_style"])
+                or None
+            )
+        return cls(**values)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # the instance is frozen, so the attributes must be set directly
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+def _get_parameters() -> Dict[str, Any]:
     if "params" not in _parameter_cache:
         _parameter_cache["params"] = {
             k: _map_env_value(v)
@@ -389,12 +540,37 @@ def get_parameter_value(key: str) -> Any:
             _parameter_cache["params"]["html_file_path"] = (
                 _parameter_cache["params"]["html_dir_path"] + ".html"
             )
-    return _parameter_cache["params"].get(key)
+    return cast(Dict[str, Any], _parameter_cache["params"])
+
+
+# settings of the report that is being printed into, if it is not the default one
+_active_settings: ContextVar[Optional[Settings]] = ContextVar(
+    "pyreball_active_settings", default=None
+)
+
+
+def get_settings() -> Settings:
+    """Get settings of the current session.
+
+    The settings are built only once from the parameters passed to the script.
+    When a `Report` object is being printed into, its settings are returned instead.
+    """
+    active_settings = _active_settings.get()
+    if active_settings is not None:
+        return active_settings
+    if "settings" not in _parameter_cache:
+        _parameter_cache["settings"] = Settings.from_parameters(_get_parameters())
+    return cast(Settings, _parameter_cache["settings"])
+
+
+def get_parameter_value(key: str) -> Any:
+    return _get_parameters().get(key)
 
 
 def make_sure_dir_exists(directory: Optional[str]) -> None:
-    if directory and not os.path.exists(directory):
-        os.makedirs(directory)
+    if directory:
+        # the directory may be created by another thread in the meantime
+        os.makedirs(directory, exist_ok=True)
 
 
 def carefully_remove_directory_if_exists(directory: Path) -> None:
@@ -403,13 +579,13 @@ def carefully_remove_directory_if_exists(directory: Path) -> None:
     :param directory: path to a directory.
     """
     if directory.exists():
-        # check that the folder contains only png and jpg files.
-        # Otherwise, raise an error.
+        # check that the folder contains only files generated by pyreball,
+        # i.e. images and js files with data. Otherwise, raise an error.
         for filename in directory.iterdir():
-            if not re.search(r".(png|jpg|svg)$", filename.name):
+            if not re.search(r".(png|jpg|svg|js)$", filename.name):
                 raise ValueError(
                     f"Cannot delete the original html directory {directory}. "
-                    f"It contains file {filename} and only png, jpg and svg "
+                    f"It contains file {filename} and only png, jpg, svg and js "
                     f"files are allowed."
                 )
         try:
@@ -0,0 +1,209 @@
+"""Running of report scripts under cProfile or tracemalloc.
+
+This module is run by `pyreball` command instead of the script when
+`--profile` option is used:
+
+    python -m pyreball.utils.profiling <mode> <results-path> <script> [args...]
+    python -m pyreball.utils.profiling <mode> <results-path> -m <module> [args...]
+
+The script is run in this process, so that it is profiled without the overhead
+of `pyreball` itself, and the results are written into a JSON file.
+"""
+
+import argparse
+import json
+import linecache
+import os
+import runpy
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_MODES = ["cpu", "memory"]
+
+# number of functions or allocation sites kept in the results
+TOP_COUNT = 50
+
+
+def get_profile_results_path(html_path: Path) -> Path:
+    """Get Path to the file with profiling results of the script of a report.
+
+    Args:
+        html_path: Path to the HTML file.
+
+    Returns:
+        Path to a hidden file next to the HTML file.
+    """
+    return html_path.with_name(f".{html_path.name}.profile-results")
+
+
+def _get_function_records(stats: Any, sort_index: int) -> List[Dict[str, Any]]:
+    """Get records of the top functions from `pstats.Stats` sorted by a time."""
+    items = sorted(
+        stats.stats.items(), key=lambda item: item[1][sort_index], reverse=True
+    )
+    records = []
+    for (file_name, line_number, function_name), values in items[:TOP_COUNT]:
+        primitive_calls, calls, own_time, cumulative_time, _ = values
+        records.append(
+            {
+                "function": function_name,
+                # built-in functions have no file
+                "location": None if file_name == "~" else f"{file_name}:{line_number}",
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "own_seconds": round(own_time, 6),
+                "cumulative_seconds": round(cumulative_time, 6),
+            }
+        )
+    return records
+
+
+def _profile_cpu(run: Callable[[], Any], results: Dict[str, Any]) -> None:
+    """Run the function under cProfile and store the results, even if it fails."""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    start_time = time.perf_counter()
+    profiler.enable()
+    try:
+        run()
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - start_time
+        stats = pstats.Stats(profiler)
+        results.update(
+            {
+                "mode": "cpu",
+                "seconds": round(seconds, 6),
+                "calls": stats.total_calls,  # type: ignore[attr-defined]
+                # the indices of own and cumulative times in the values of the stats
+                "by_own_time": _get_function_records(stats, sort_index=2),
+                "by_cumulative_time": _get_function_records(stats, sort_index=3),
+            }
+        )
+
+
+def _profile_memory(run: Callable[[], Any], results: Dict[str, Any]) -> None:
+    """Run the function under tracemalloc and store the results, even if it fails."""
+    import tracemalloc
+
+    namespace = None
+    tracemalloc.start()
+    try:
+        # the variables of the script are kept until the snapshot is taken
+        namespace = run()
+    finally:
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ]
+        )
+        tracemalloc.stop()
+        del namespace
+        sites = []
+        for statistic in snapshot.statistics("lineno")[:TOP_COUNT]:
+            frame = statistic.traceback[0]
+            sites.append(
+                {
+                    "location": f"{frame.filename}:{frame.lineno}",
+                    "code": linecache.getline(frame.filename, frame.lineno).strip(),
+                    "bytes": statistic.size,
+                    "blocks": statistic.count,
+                }
+            )
+        results.update(
+            {
+                "mode": "memory",
+                "peak_bytes": peak_bytes,
+                "current_bytes": current_bytes,
+                "sites": sites,
+            }
+        )
+
+
+def run_profiled_script(
+    mode: str,
+    results_path: Path,
+    script_path: Optional[Path] = None,
+    module: Optional[str] = None,
+    script_args: Optional[List[str]] = None,
+) -> None:
+    """
+    Run a script or a module as `__main__` and profile it.
+
+    The results are written even if the script fails.
+
+    Args:
+        mode: `cpu` to measure the time spent in functions by `cProfile`,
+            `memory` to find the lines that allocated most memory by `tracemalloc`.
+        results_path: Path to the output JSON file with the results.
+        script_path: Path to the script. Either this or `module` must be set.
+        module: Name of the module.
+        script_args: Arguments of the script.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Profile mode must be one of {PROFILE_MODES}, not {mode}.")
+
+    def run() -> Dict[str, Any]:
+        if script_path is not None:
+            sys.argv = [str(script_path), *(script_args or [])]
+            # the same as when the script is run by python directly
+            sys.path[0] = str(script_path.parent)
+            return runpy.run_path(str(script_path), run_name="__main__")
+        elif module is not None:
+            sys.argv = [module, *(script_args or [])]
+            sys.path[0] = os.getcwd()
+            return runpy.run_module(module, run_name="__main__", alter_sys=True)
+        raise ValueError("Either script_path or module must be set.")
+
+    results: Dict[str, Any] = {}
+    try:
+        if mode == "cpu":
+            _profile_cpu(run, results)
+        else:
+            _profile_memory(run, results)
+    finally:
+        with open(results_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def main(args: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreball.utils.profiling",
+        usage=(
+            "%(prog)s {cpu,memory} results_path "
+            "(script | -m module) [script arguments ...]"
+        ),
+        description="Run a script or a module and profile it.",
+    )
+    parser.add_argument("mode", choices=PROFILE_MODES)
+    parser.add_argument("results_path", type=Path)
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    parsed_args = parser.parse_args(args)
+    script_args = parsed_args.script_args
+    if not script_args or script_args == ["-m"]:
+        parser.error("a script or a module (-m module) must be provided")
+    if script_args[0] == "-m":
+        run_profiled_script(
+            parsed_args.mode,
+            parsed_args.results_path,
+            module=script_args[1],
+            script_args=script_args[2:],
+        )
+    else:
+        run_profiled_script(
+            parsed_args.mode,
+            parsed_args.results_path,
+            script_path=Path(script_args[0]).resolve(),
+            script_args=script_args[1:],
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
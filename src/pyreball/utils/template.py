@@ -7,26 +7,40 @@ from typing import Tuple
 logger = logging.getLogger(__name__)
 
 
+def render_html(
+    html_template: str, title: str, css_definitions: str
+) -> Tuple[str, str]:
+    html_start, html_end = html_template.split("<!--PYREBALL_REPORT_CONTENTS-->")
+    html_start = re.sub("<!--PYREBALL_PAGE_TITLE-->", title, html_start)
+    html_start = re.sub(r"<!--PYREBALL_CSS_DEFINITIONS-->", css_definitions, html_start)
+    return html_start, html_end
+
+
 def get_html(template_path: Path, title: str, css_definitions: str) -> Tuple[str, str]:
     with open(template_path) as f:
-        html_text = f.read()
-        html_start, html_end = html_text.split("<!--PYREBALL_REPORT_CONTENTS-->")
-        html_start = re.sub("<!--PYREBALL_PAGE_TITLE-->", title, html_start)
-        html_start = re.sub(
-            r"<!--PYREBALL_CSS_DEFINITIONS-->", css_definitions, html_start
+        return render_html(
+            html_template=f.read(), title=title, css_definitions=css_definitions
         )
-        return html_start, html_end
 
 
-def get_css(filename: str, directory: Path, page_width: int = 60) -> str:
+def read_css_template(filename: str, directory: Path) -> str:
     try:
         with open(directory / filename) as f:
-            css_string = f.read()
+            return f.read()
     except OSError:
         logger.error(
             f"There was a problem reading file {filename} in {directory}. "
             f"Try re-installing pyreball."
         )
         sys.exit(1)
-    css_string = re.sub(r"{{page_width}}", str(int(page_width)), css_string)
-    return css_string
+
+
+def render_css(css_template: str, page_width: int = 60) -> str:
+    return re.sub(r"{{page_width}}", str(int(page_width)), css_template)
+
+
+def get_css(filename: str, directory: Path, page_width: int = 60) -> str:
+    return render_css(
+        css_template=read_css_template(filename=filename, directory=directory),
+        page_width=page_width,
+    )
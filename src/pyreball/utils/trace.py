@@ -0,0 +1,203 @@
+"""Recording of the timeline of report builds in Chrome trace event format."""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# the path to the file with recorded events is passed to the script process
+# through this environment variable, so the spans of both processes are recorded
+TRACE_EVENTS_ENV_VARIABLE = "_TMP_PYREBALL_TRACE_EVENTS"
+# time, when the script was started, in nanoseconds since the epoch
+SCRIPT_START_ENV_VARIABLE = "_TMP_PYREBALL_SCRIPT_START"
+
+_script_startup_traced = False
+
+
+def get_trace_events_path(trace_path: Path) -> Path:
+    """Get Path to the file with events recorded for the given trace file.
+
+    Args:
+        trace_path: Path to the output trace file.
+
+    Returns:
+        Path to a hidden file next to the trace file.
+    """
+    return trace_path.with_name(f".{trace_path.name}.events")
+
+
+def is_tracing_enabled() -> bool:
+    return TRACE_EVENTS_ENV_VARIABLE in os.environ
+
+
+def _write_events(events: List[Dict[str, Any]]) -> None:
+    events_path = os.environ.get(TRACE_EVENTS_ENV_VARIABLE)
+    if events_path:
+        # a single write of a line is not interleaved with other processes
+        with open(events_path, "a") as f:
+            f.write("".join(json.dumps(event) + "\n" for event in events))
+
+
+def _create_complete_event(
+    name: str,
+    category: str,
+    start_time: int,
+    end_time: int,
+    report: Optional[str],
+    args: Dict[str, Any],
+) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        # trace viewers expect microseconds
+        "ts": start_time / 1000,
+        "dur": (end_time - start_time) / 1000,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+        "args": {"report": report, **args},
+    }
+
+
+@contextmanager
+def trace_span(
+    name: str,
+    category: str,
+    report: Optional[str] = None,
+    args: Optional[Dict[str, Any]] = None,
+) -> Iterator[None]:
+    """
+    Record the duration of the code in the `with` block as a span of the trace.
+
+    Nothing is recorded when tracing is not enabled by `--trace` option.
+    Times are taken from the wall clock, so that the spans recorded
+    by different processes can be shown on a single timeline.
+
+    Args:
+        name: Name of the span, e.g. `print_table`.
+        category: Category of the span, e.g. `print`.
+        report: Name of the HTML file of the report, which correlates
+            the spans of the CLI process and the script process.
+        args: Additional values shown with the span. The dictionary
+            is read when the span ends, so it can be updated in the block.
+    """
+    if not is_tracing_enabled():
+        yield
+        return
+    start_time = time.time_ns()
+    try:
+        yield
+    finally:
+        end_time = time.time_ns()
+        _write_events(
+            [
+                _create_complete_event(
+                    name,
+                    category=category,
+                    start_time=start_time,
+                    end_time=end_time,
+                    report=report,
+                    args=args or {},
+                )
+            ]
+        )
+
+
+def mark_script_start() -> None:
+    """Remember the time, when the script is started, for `trace_script_startup`."""
+    if is_tracing_enabled():
+        os.environ[SCRIPT_START_ENV_VARIABLE] = str(time.time_ns())
+
+
+def trace_script_startup(report: Optional[str]) -> None:
+    """Record the span from the start of the script to the first printed element.
+
+    The span is recorded only once per process. It contains the start of
+    the interpreter, imports and all computations before the first element.
+
+    Args:
+        report: Name of the HTML file of the report.
+    """
+    global _script_startup_traced
+    script_start = os.environ.get(SCRIPT_START_ENV_VARIABLE)
+    if _script_startup_traced or not script_start or not is_tracing_enabled():
+        return
+    _script_startup_traced = True
+    _write_events(
+        [
+            _create_complete_event(
+                "script startup",
+                category="script",
+                start_time=int(script_start),
+                end_time=time.time_ns(),
+                report=report,
+                args={},
+            )
+        ]
+    )
+
+
+def start_tracing(trace_path: Path) -> None:
+    """Enable recording of the spans in this process and the processes it starts.
+
+    Args:
+        trace_path: Path to the output trace file.
+    """
+    events_path = get_trace_events_path(trace_path)
+    events_path.parent.mkdir(parents=True, exist_ok=True)
+    # remove events from the previous run
+    events_path.write_text("")
+    os.environ[TRACE_EVENTS_ENV_VARIABLE] = str(events_path)
+
+
+def write_trace(trace_path: Path) -> None:
+    """
+    Write the recorded spans into a file in Chrome trace event format.
+
+    The file can be opened in a trace viewer, e.g. Perfetto UI or
+    `chrome://tracing`. The process, which started the tracing, is named
+    `pyreball`, and other processes are named by the reports they built.
+    Tracing is disabled afterwards.
+
+    Args:
+        trace_path: Path to the output trace file.
+    """
+    events_path = get_trace_events_path(trace_path)
+    os.environ.pop(TRACE_EVENTS_ENV_VARIABLE, None)
+    os.environ.pop(SCRIPT_START_ENV_VARIABLE, None)
+    with open(events_path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    os.remove(events_path)
+
+    reports_by_process: Dict[int, List[str]] = {}
+    for event in events:
+        reports = reports_by_process.setdefault(event["pid"], [])
+        report = event["args"].get("report")
+        if report is not None and report not in reports:
+            reports.append(report)
+    metadata_events = []
+    for pid, reports in reports_by_process.items():
+        if pid == os.getpid():
+            process_name = "pyreball"
+        else:
+            process_name = f"report {', '.join(reports)}".strip()
+        metadata_events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": process_name},
+            }
+        )
+    with open(trace_path, "w") as f:
+        json.dump(
+            {
+                "traceEvents": metadata_events
+                + sorted(events, key=lambda event: event["ts"]),
+                "displayTimeUnit": "ms",
+            },
+            f,
+        )
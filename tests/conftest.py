@@ -11,3 +11,9 @@ def pre_test_cleanup():
     global _parameter_cache
     _parameter_cache.clear()
     yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_directory(monkeypatch, tmp_path_factory):
+    # do not let the tests read or fill the cache of the user
+    monkeypatch.setenv("PYREBALL_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
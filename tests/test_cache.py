@@ -0,0 +1,141 @@
+import os
+import threading
+from unittest import mock
+
+import pytest
+
+from pyreball.cache import cached
+
+MODULE_PATH = "pyreball.cache"
+
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("PYREBALL_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache" / "results"
+
+
+def _list_cached_results(cache_directory):
+    return sorted(
+        name for name in os.listdir(cache_directory) if name.endswith(".pickle")
+    )
+
+
+def test_cached(cache_directory):
+    calls = []
+
+    @cached
+    def add(a, b=1):
+        calls.append((a, b))
+        return {"sum": a + b}
+
+    assert add(1, b=2) == {"sum": 3}
+    assert add(1, b=2) == {"sum": 3}
+    assert add(2) == {"sum": 3}
+    assert add(a=2) == {"sum": 3}
+    assert calls == [(1, 2), (2, 1), (2, 1)]
+    assert len(_list_cached_results(cache_directory)) == 3
+
+
+def test_cached__source_changed(cache_directory):
+    calls = []
+
+    @cached
+    def compute():
+        calls.append(None)
+        return 1
+
+    compute()
+    with mock.patch(
+        f"{MODULE_PATH}._get_function_source", return_value="changed source"
+    ):
+        compute()
+        compute()
+    compute()
+    assert len(calls) == 2
+
+
+def test_cached__data_files(cache_directory, tmp_path):
+    data_path = tmp_path / "data.csv"
+    calls = []
+
+    @cached(data_files=[data_path])
+    def read_data():
+        calls.append(None)
+        return data_path.read_text() if data_path.exists() else None
+
+    assert read_data() is None
+    data_path.write_text("a,b")
+    assert read_data() == "a,b"
+    assert read_data() == "a,b"
+    data_path.write_text("a,b,c")
+    stat = os.stat(data_path)
+    os.utime(data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert read_data() == "a,b,c"
+    assert len(calls) == 3
+
+
+def test_cached__eviction(cache_directory):
+    @cached(max_size=2500)
+    def create_bytes(index):
+        return bytes(1000)
+
+    for index in range(3):
+        create_bytes(index)
+        # make the order of the results deterministic for the eviction
+        for position, name in enumerate(_list_cached_results(cache_directory)):
+            os.utime(cache_directory / name, ns=(0, position))
+    assert len(_list_cached_results(cache_directory)) == 2
+
+    calls = []
+
+    @cached(max_size=2500)
+    def create_small_bytes(index):
+        calls.append(index)
+        return bytes(10)
+
+    create_small_bytes(0)
+    create_small_bytes(0)
+    assert calls == [0]
+
+
+def test_cached__unpicklable_values(cache_directory):
+    calls = []
+
+    @cached
+    def identity(value):
+        calls.append(value)
+        return value
+
+    lock = threading.Lock()
+    assert identity(lock) is lock
+    assert identity(lock) is lock
+    assert len(calls) == 2
+
+    @cached
+    def create_lock():
+        calls.append(None)
+        return threading.Lock()
+
+    create_lock()
+    create_lock()
+    assert len(calls) == 4
+    assert not os.path.exists(cache_directory) or not _list_cached_results(
+        cache_directory
+    )
+
+
+def test_cached__corrupted_result(cache_directory):
+    calls = []
+
+    @cached
+    def compute():
+        calls.append(None)
+        return [1, 2]
+
+    compute()
+    (name,) = _list_cached_results(cache_directory)
+    (cache_directory / name).write_bytes(b"corrupted")
+    assert compute() == [1, 2]
+    assert compute() == [1, 2]
+    assert len(calls) == 2
@@ -1,35 +1,53 @@
+import asyncio
+import base64
 import datetime
+import functools
+import itertools
+import json
+import multiprocessing
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
 from pathlib import Path
 from typing import Any, Dict
 from unittest import mock
 from xml.etree import ElementTree
 
 import altair as alt
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import pytest
 import seaborn as sns
 from bokeh.plotting import figure as bokeh_figure
 from matplotlib import pyplot as plt
 
+from pyreball.constants import NON_BREAKABLE_SPACE
 from pyreball.html import (
+    AsyncReport,
     Reference,
+    Report,
+    Sections,
     _check_and_mark_reference,
     _code_block_memory,
     _compute_length_menu_for_datatables,
     _construct_image_anchor_link,
+    _encode_plotly_typed_arrays,
     _gather_datatables_setup,
+    _get_altair_chart_height,
     _get_heading_number,
     _graph_memory,
-    _heading_memory,  # noqa: F401
-    _parse_tables_paging_sizes,
+    _heading_memory,
     _prepare_altair_image_element,
     _prepare_bokeh_image_element,
     _prepare_caption_element,
     _prepare_col_alignment_definition,
+    _prepare_figure_target_element,
     _prepare_image_element,
+    _prepare_initializer_element,
     _prepare_matplotlib_image_element,
     _prepare_plotly_image_element,
     _prepare_table_html,
@@ -42,6 +60,7 @@ from pyreball.html import (
     _wrap_code_block_html,
     _wrap_image_element_by_outer_divs,
     _write_to_html,
+    build_sections,
     print_code_block,
     print_div,
     print_figure,
@@ -57,10 +76,17 @@ from pyreball.html import (
 from pyreball.html import (
     print as print_html,
 )
+from pyreball.utils.param import Settings
 
 MODULE_PATH = "pyreball.html"
 
 
+def _fake_settings(get_value):
+    return Settings.from_parameters(
+        {field.name: get_value(field.name) for field in fields(Settings)}
+    )
+
+
 @pytest.fixture
 def simple_html_file(tmpdir):
     html_file = Path(tmpdir) / "report.html"
@@ -167,7 +193,9 @@ def test__check_and_mark_reference(pre_test_check_and_mark_reference_cleanup):
 
 
 def test_set_title__stdout(capsys):
-    with mock.patch(f"{MODULE_PATH}.get_parameter_value", return_value=False):
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings", return_value=_fake_settings(lambda key: False)
+    ):
         set_title("my title")
         captured = capsys.readouterr()
         assert captured.out.strip() == "my title"
@@ -187,7 +215,8 @@ def test_set_title__file_output(keep_stdout, capsys, simple_html_file):
         f.write("<title>old title</title>\n</html>")
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         set_title("new title with more words")
         with open(simple_html_file) as f:
@@ -209,7 +238,8 @@ def test__write_to_html(simple_html_file):
             return simple_html_file
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         _write_to_html("<div>")
         with open(simple_html_file) as f:
@@ -280,7 +310,8 @@ def test__print_heading__stdout(capsys, pre_test_print_heading_cleanup):
 
     # when keep_stdout is set on
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         _print_heading("simple heading", level=3)
         captured = capsys.readouterr()
@@ -288,8 +319,8 @@ def test__print_heading__stdout(capsys, pre_test_print_heading_cleanup):
 
     # when keep_stdout is set off, but we don't have html file either
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value",
-        side_effect=fake_get_parameter_value_different,
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value_different),
     ):
         _print_heading("another heading", level=5)
         captured = capsys.readouterr()
@@ -315,15 +346,14 @@ def test_print_h1_h6__file_output__no_numbers(
             return None
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         if use_reference:
             ref = Reference()
             ref.id = "id123"
-            exp_id = "id123_"
         else:
             ref = None
-            exp_id = ""
 
         print_h1("heading 1", reference=ref)
         print_h3("heading 3")
@@ -334,9 +364,9 @@ def test_print_h1_h6__file_output__no_numbers(
 
         expected_result = (
             "<html>\n"
-            f'<h1 id="ch_{exp_id}heading_1_1">heading 1'
-            f'<a class="pyreball-anchor-link" href="#ch_{exp_id}heading_1_1">\u00b6'
-            f"</a></h1>\n"
+            '<h1 id="ch_heading_1_1">heading 1'
+            '<a class="pyreball-anchor-link" href="#ch_heading_1_1">\u00b6'
+            "</a></h1>\n"
             '<h3 id="ch_heading_3_2">heading 3'
             '<a class="pyreball-anchor-link" href="#ch_heading_3_2">\u00b6</a></h3>\n'
             '<h6 id="ch_heading_6_3">heading 6'
@@ -381,15 +411,14 @@ def test_print_h1_h6__file_output__with_numbers(
             return key == "numbered_headings"
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         if use_reference:
             ref = Reference()
             ref.id = "id123"
-            exp_id = "id123_"
         else:
             ref = None
-            exp_id = ""
 
         print_h1("he 1", reference=ref)
         print_h2("he 2")
@@ -403,9 +432,9 @@ def test_print_h1_h6__file_output__with_numbers(
 
         expected_result = (
             "<html>\n"
-            f'<h1 id="ch_{exp_id}1_he_1_1">1\u00a0\u00a0he 1'
-            f'<a class="pyreball-anchor-link" href="#ch_{exp_id}1_he_1_1">\u00b6'
-            f"</a></h1>\n"
+            '<h1 id="ch_1_he_1_1">1\u00a0\u00a0he 1'
+            '<a class="pyreball-anchor-link" href="#ch_1_he_1_1">\u00b6'
+            "</a></h1>\n"
             '<h2 id="ch_1_1_he_2_2">1.1\u00a0\u00a0he 2'
             '<a class="pyreball-anchor-link" href="#ch_1_1_he_2_2">\u00b6'
             "</a></h2>\n"
@@ -453,7 +482,8 @@ def test_print_div__stdout(capsys):
 
     # when keep_stdout is set on
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         print_div("arbitrary paragraph\nsecond line")
         captured = capsys.readouterr()
@@ -461,8 +491,8 @@ def test_print_div__stdout(capsys):
 
     # when keep_stdout is set off, but we don't have html file either
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value",
-        side_effect=fake_get_parameter_value_different,
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value_different),
     ):
         print_div("another paragraph\nsecond line")
         captured = capsys.readouterr()
@@ -480,7 +510,8 @@ def test_print_div__file_output(keep_stdout, capsys, simple_html_file):
             return None
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         print_div("new\nparagraph")
         expected_div_element = "<div>new\nparagraph</div>"
@@ -508,7 +539,7 @@ def test_print_div__file_output(keep_stdout, capsys, simple_html_file):
             "bottom",
             True,
             "",
-            "code-block-123-3",
+            "code-block-3",
             (
                 '<div class="pyreball-code-wrapper">'
                 '<div class="pyreball-block-fit-content pyreball-left-aligned">'
@@ -599,7 +630,8 @@ def test_print_code_block__stdout(syntax_highlight, capsys):
 
     # when keep_stdout is set on
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         print_code_block("[1, 2, 3]", syntax_highlight=syntax_highlight)
         captured = capsys.readouterr()
@@ -613,8 +645,8 @@ def test_print_code_block__stdout(syntax_highlight, capsys):
 
     # when keep_stdout is set off, but we don't have html file either
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value",
-        side_effect=fake_get_parameter_value_different,
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value_different),
     ):
         print_code_block("{'a': 4}", syntax_highlight=syntax_highlight)
         captured = capsys.readouterr()
@@ -679,7 +711,8 @@ def test_print_code_block(
     sep = ""
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ), mock.patch(
         f"{MODULE_PATH}.code_block",
         side_effect=lambda x, **kwargs: f"<code>{x}</code>",
@@ -735,7 +768,8 @@ def test_print__stdout(capsys):
 
     # when keep_stdout is set on
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         print_html("<p><b>whatever</b></p>")
         captured = capsys.readouterr()
@@ -743,8 +777,8 @@ def test_print__stdout(capsys):
 
     # when keep_stdout is set off, but we don't have html file either
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value",
-        side_effect=fake_get_parameter_value_different,
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value_different),
     ):
         print_html("<h1>another string</h1>")
         captured = capsys.readouterr()
@@ -799,7 +833,8 @@ def test_print__file_output(
             return None
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         print_html(*values, sep=sep, end=end)
         with open(simple_html_file) as f:
@@ -1344,7 +1379,16 @@ def test__prepare_table_html(
         datatables_style=datatables_style,
     )
 
-    assert "<script>" in result
+    m = re.search(
+        r'<script type="application/json" class="pyreball-init" '
+        r'data-kind="datatables" data-target="pyreball-table-wrapper-inner-5">'
+        r"(.*)</script>$",
+        result,
+    )
+    assert m is not None
+    assert json.loads(m.group(1))["ordering" if not sortable else "order"] == (
+        False if not sortable else []
+    )
     # Remove the final row with script, because it cannot be parsed by ElementTree
     result = re.sub("<script.*", "", result)
     html_root = ElementTree.fromstring(result)
@@ -1375,8 +1419,7 @@ def test__prepare_table_html(
         f"./div[@class='pyreball-block-fit-content {align_class}']"
     )
 
-    anchor = "table-123-5" if use_reference else "table-5"
-    assert html_root.findall(f"./div/div/a[@id='{anchor}']")
+    assert html_root.findall("./div/div/a[@id='table-5']")
 
 
 @pytest.mark.parametrize(
@@ -1429,19 +1472,19 @@ def test__prepare_table_html__col_align(
         )
 
 
-@pytest.mark.parametrize(
-    "sizes,expected_result",
-    [
-        ("20", [20]),
-        ("20,30", [20, 30]),
-        ("20,30,100", [20, 30, 100]),
-        ("20,30,100,All", [20, 30, 100, "All"]),
-        ("20,all,100", [20, "all", 100]),
-        ("ALL", ["ALL"]),
-    ],
-)
-def test__parse_tables_paging_sizes(sizes, expected_result):
-    assert _parse_tables_paging_sizes(sizes) == expected_result
+@pytest.mark.parametrize("lazy", [False, True])
+def test__prepare_table_html__lazy(lazy, simple_dataframe):
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(lambda key: {"lazy_tables": lazy}.get(key)),
+    ):
+        result = _prepare_table_html(df=simple_dataframe, tab_index=2)
+    lazy_attr = " data-lazy" if lazy else ""
+    assert (
+        '<script type="application/json" class="pyreball-init" '
+        f'data-kind="datatables" data-target="pyreball-table-wrapper-inner-2"'
+        f"{lazy_attr}>"
+    ) in result
 
 
 def test_print_table__stdout(capsys, simple_dataframe):
@@ -1456,7 +1499,8 @@ def test_print_table__stdout(capsys, simple_dataframe):
 
     # when keep_stdout is set on
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         print_table(simple_dataframe)
         captured = capsys.readouterr()
@@ -1464,8 +1508,8 @@ def test_print_table__stdout(capsys, simple_dataframe):
 
     # when keep_stdout is set off, but we don't have html file either
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value",
-        side_effect=fake_get_parameter_value_different,
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value_different),
     ):
         print_table(simple_dataframe)
         captured = capsys.readouterr()
@@ -1540,13 +1584,14 @@ def test_print_table__file_output(
         elif key == param_name:
             return param_value
         elif key == "tables_paging_sizes":
-            # let's provide some values here, so _parse_tables_paging_sizes doesn't fail
+            # the paging sizes are parsed when the settings are built
             return "10,20,all"
         else:
             return None
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ), mock.patch(
         f"{MODULE_PATH}._prepare_table_html", return_value="<table>x</table>"
     ) as _prepare_table_html_mock:
@@ -1607,7 +1652,7 @@ def test_print_table__file_output(
 @pytest.mark.parametrize(
     "reference,fig_index,expected_result",
     [
-        (Reference("doesnotmatter"), 3, "img-id3553-3"),
+        (Reference("doesnotmatter"), 3, "img-3"),
         (None, 23, "img-23"),
     ],
 )
@@ -1661,7 +1706,9 @@ def test__prepare_matplotlib_image_element__wrong_format():
 
 
 def test__prepare_matplotlib_image_element__unsupported_param_values():
-    with mock.patch(f"{MODULE_PATH}.get_parameter_value", return_value=False):
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings", return_value=_fake_settings(lambda key: False)
+    ):
         with pytest.raises(RuntimeError) as excinfo:
             _prepare_matplotlib_image_element(mock.Mock(), 0, "png", False)
         assert "Failed to create a matplotlib image." in str(excinfo.value)
@@ -1717,7 +1764,8 @@ def test__prepare_matplotlib_image_element(
     fig.savefig.side_effect = fake_savefig
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ):
         if expected_used_embedded and expected_used_image_format != "svg":
             with pytest.raises(ValueError) as excinfo:
@@ -1759,18 +1807,283 @@ def test__prepare_altair_image_element():
     assert _prepare_altair_image_element(fig, 326) == expected_result
 
 
+def test__prepare_altair_image_element__deferred_scripts():
+    fig = mock.Mock()
+    fig.to_dict.return_value = {"mark": "bar", "height": 200}
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(
+            lambda key: "deferred" if key == "script_loading" else None
+        ),
+    ):
+        result = _prepare_altair_image_element(fig, 4)
+    assert result == (
+        '<div id="altairvis4"></div>'
+        '<script type="application/json" class="pyreball-init" '
+        'data-kind="altair" data-target="altairvis4">'
+        '{"spec": {"mark": "bar", "height": 200}, "datasets": [], '
+        '"opt": {"renderer": "canvas", "actions": false}}</script>'
+    )
+
+
+def test__prepare_altair_image_element__external_data(
+    simple_html_file, simple_dataframe, pre_test_print_figure_cleanup
+):
+    html_dir_path = simple_html_file.rsplit(".")[0]
+
+    def fake_get_parameter_value(key):
+        return {
+            "html_dir_path": html_dir_path,
+            "html_dir_name": "report",
+            "altair_data_mode": "external",
+        }.get(key)
+
+    chart = alt.Chart(simple_dataframe).mark_bar().encode(x="x2", y="x1")
+    layered_chart = chart + chart.mark_line()
+    dataset_name = next(iter(chart.to_dict()["datasets"]))
+
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
+    ):
+        first_result = _prepare_altair_image_element(chart, 1)
+        second_result = _prepare_altair_image_element(layered_chart, 2)
+
+    data_file_name = f"altair_{dataset_name}.js"
+    assert os.listdir(html_dir_path) == [data_file_name]
+    with open(os.path.join(html_dir_path, data_file_name)) as f:
+        data_file_contents = f.read()
+    assert data_file_contents.startswith(
+        "(window.pyreballAltairData = window.pyreballAltairData || {})"
+        f'["{dataset_name}"] = [{{"x1": 1, "x2": "a"}}'
+    )
+
+    # the dataset is loaded only by the first chart
+    script_element = f'<script src="report/{data_file_name}"></script>'
+    assert first_result.startswith(script_element + '<div id="altairvis1">')
+    assert script_element not in second_result
+    for result in [first_result, second_result]:
+        assert '"datasets"' not in result
+        assert (
+            f'spec.datasets["{dataset_name}"] = '
+            f'window.pyreballAltairData["{dataset_name}"];'
+        ) in result
+
+
 def test__prepare_plotly_image_element():
     fig = mock.Mock()
     fig.to_html.return_value = "fig_html"
-    result = _prepare_plotly_image_element(fig)
+    result = _prepare_plotly_image_element(fig, 3)
     assert result == "fig_html"
     fig.to_html.assert_called_with(full_html=False, include_plotlyjs=False)
 
 
+def test__prepare_plotly_image_element__deferred_scripts():
+    fig = go.Figure(go.Scatter(x=[1, 2], y=[3, 4]))
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(
+            lambda key: "deferred" if key == "script_loading" else None
+        ),
+    ):
+        result = _prepare_plotly_image_element(fig, 3)
+
+    m = re.match(
+        r'^<div id="plotlyvis3" class="plotly-graph-div"></div>'
+        r'<script type="application/json" class="pyreball-init" '
+        r'data-kind="plotly" data-target="plotlyvis3">(.*)</script>$',
+        result,
+    )
+    assert m is not None
+    assert json.loads(m.group(1))["data"][0]["y"] == [3, 4]
+
+
+def test__prepare_plotly_image_element__binary():
+    fig = go.Figure(go.Scatter(x=np.arange(3), y=np.array([0.5, 1.0, 2.0])))
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(
+            lambda key: "binary" if key == "plotly_data_encoding" else None
+        ),
+    ):
+        result = _prepare_plotly_image_element(fig, 3)
+
+    m = re.match(
+        r'^<div id="plotlyvis3" class="plotly-graph-div"></div>'
+        r'<script type="application/json" class="pyreball-init" '
+        r'data-kind="plotly" data-target="plotlyvis3">(.*)</script>$',
+        result,
+    )
+    assert m is not None
+    fig_dict = json.loads(m.group(1))
+    assert fig_dict["data"][0]["y"] == {
+        "dtype": "f8",
+        "bdata": base64.b64encode(np.array([0.5, 1.0, 2.0]).tobytes()).decode(),
+    }
+    assert fig_dict["config"] == {"responsive": True}
+
+
+def test__prepare_plotly_image_element__lazy():
+    fig = go.Figure(go.Scatter(x=[1, 2], y=[3, 4]), layout={"height": 300})
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(
+            lambda key: {
+                "plotly_data_encoding": "json",
+                "lazy_figures": True,
+            }.get(key)
+        ),
+    ):
+        result = _prepare_plotly_image_element(fig, 3)
+
+    m = re.match(
+        r'^<div id="plotlyvis3" class="plotly-graph-div" '
+        r'style="min-height: 300px;"></div>'
+        r'<script type="application/json" class="pyreball-init" '
+        r'data-kind="plotly" data-target="plotlyvis3" data-lazy>(.*)</script>$',
+        result,
+    )
+    assert m is not None
+    fig_dict = json.loads(m.group(1))
+    assert fig_dict["data"][0]["y"] == [3, 4]
+
+
+@pytest.mark.parametrize(
+    "value,expected_result",
+    [
+        ("text", "text"),
+        ([1, "a"], [1, "a"]),
+        (
+            {"x": np.array([1, 2], dtype="uint8")},
+            {"x": {"dtype": "u1", "bdata": "AQI="}},
+        ),
+        (
+            [np.array([1, 2], dtype="int64")],
+            [{"dtype": "i4", "bdata": "AQAAAAIAAAA="}],
+        ),
+        (
+            np.array([2**40], dtype="int64"),
+            {"dtype": "f8", "bdata": "AAAAAAAAcEI="},
+        ),
+        (
+            np.zeros((2, 3), dtype="float32"),
+            {
+                "dtype": "f4",
+                "bdata": "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA",
+                "shape": "2, 3",
+            },
+        ),
+        (np.array(["a", "b"]), np.array(["a", "b"])),
+    ],
+)
+def test__encode_plotly_typed_arrays(value, expected_result):
+    result = _encode_plotly_typed_arrays(value)
+    if isinstance(expected_result, np.ndarray):
+        assert (result == expected_result).all()
+    else:
+        assert result == expected_result
+
+
+def test__prepare_initializer_element():
+    result = _prepare_initializer_element(
+        kind="plotly", target_id="vis1", config_json='{"a": "</script>"}'
+    )
+    assert result == (
+        '<script type="application/json" class="pyreball-init" '
+        'data-kind="plotly" data-target="vis1">{"a": "<\\/script>"}</script>'
+    )
+    result = _prepare_initializer_element(
+        kind="bokeh", target_id="vis2", config_json="{}", lazy=True
+    )
+    assert result == (
+        '<script type="application/json" class="pyreball-init" '
+        'data-kind="bokeh" data-target="vis2" data-lazy>{}</script>'
+    )
+
+
+def test__prepare_altair_image_element__lazy(simple_dataframe):
+    chart = (
+        alt.Chart(simple_dataframe)
+        .mark_bar()
+        .encode(x="x2", y="x1")
+        .properties(height=200)
+    )
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(lambda key: {"lazy_figures": True}.get(key)),
+    ):
+        result = _prepare_altair_image_element(chart, 5)
+
+    m = re.match(
+        r'^<div id="altairvis5" style="min-height: 200px;"></div>'
+        r'<script type="application/json" class="pyreball-init" '
+        r'data-kind="altair" data-target="altairvis5" data-lazy>(.*)</script>$',
+        result,
+    )
+    assert m is not None
+    config = json.loads(m.group(1))
+    assert config["spec"] == chart.to_dict()
+    assert config["datasets"] == []
+    assert config["opt"] == {"renderer": "canvas", "actions": False}
+
+
+@pytest.mark.parametrize(
+    "spec,expected_result",
+    [
+        ({"height": 250}, 250),
+        ({"height": 250.5}, 250),
+        ({"height": "container"}, None),
+        ({"vconcat": []}, None),
+    ],
+)
+def test__get_altair_chart_height(spec, expected_result):
+    assert _get_altair_chart_height(spec) == expected_result
+
+
+@pytest.mark.parametrize(
+    "height,lazy,cl,expected_result",
+    [
+        (100, False, None, '<div id="vis1"></div>'),
+        (None, True, None, '<div id="vis1"></div>'),
+        (100, True, None, '<div id="vis1" style="min-height: 100px;"></div>'),
+        (
+            100,
+            True,
+            "my-class",
+            '<div id="vis1" class="my-class" style="min-height: 100px;"></div>',
+        ),
+    ],
+)
+def test__prepare_figure_target_element(height, lazy, cl, expected_result):
+    result = _prepare_figure_target_element(
+        vis_id="vis1", height=height, lazy=lazy, cl=cl
+    )
+    assert result == expected_result
+
+
+def test__prepare_bokeh_image_element__lazy():
+    fig = bokeh_figure(height=350)
+    with mock.patch(
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(lambda key: {"lazy_figures": True}.get(key)),
+    ), mock.patch("bokeh.embed.json_item", return_value={"doc": "fig_json"}):
+        result = _prepare_bokeh_image_element(fig, 4)
+    assert result == (
+        '<div id="bokehvis4" style="min-height: 350px;"></div>'
+        '<script type="application/json" class="pyreball-init" '
+        'data-kind="bokeh" data-target="bokehvis4" data-lazy>{"doc": "fig_json"}'
+        "</script>"
+    )
+
+
 def test__prepare_bokeh_image_element():
-    with mock.patch("bokeh.embed.components", side_effect=lambda x: x):
-        result = _prepare_bokeh_image_element(("a", "b"))
-        assert result == "<div>ba</div>"
+    with mock.patch("bokeh.embed.json_item", return_value={"doc": "fig_json"}):
+        result = _prepare_bokeh_image_element(mock.Mock(), 4)
+        assert result == (
+            '<div id="bokehvis4"></div>'
+            '<script type="application/json" class="pyreball-init" '
+            'data-kind="bokeh" data-target="bokehvis4">{"doc": "fig_json"}</script>'
+        )
 
 
 def test__prepare_image_element__unknown_figure_type():
@@ -1841,7 +2154,7 @@ def test__prepare_image_element__plotly(
     result = _prepare_image_element(
         fig=fig, fig_index=3, matplotlib_format="svg", embedded=True
     )
-    _prepare_plotly_image_element_mock.assert_called_with(fig=fig)
+    _prepare_plotly_image_element_mock.assert_called_with(fig=fig, fig_index=3)
     assert result == ("img_element", "plotly")
 
 
@@ -1853,7 +2166,7 @@ def test__prepare_image_element__bokeh(
     result = _prepare_image_element(
         fig=fig, fig_index=3, matplotlib_format="svg", embedded=True
     )
-    _prepare_bokeh_image_element_mock.assert_called_with(fig=fig)
+    _prepare_bokeh_image_element_mock.assert_called_with(fig=fig, fig_index=3)
     assert result == ("img_element", "bokeh")
 
 
@@ -1872,15 +2185,16 @@ def test__print_figure__stdout__bokeh(simple_dataframe):
     with mock.patch("bokeh.plotting.show") as show_mock:
         # when keep_stdout is set on
         with mock.patch(
-            f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+            f"{MODULE_PATH}.get_settings",
+            return_value=_fake_settings(fake_get_parameter_value),
         ):
             _print_figure(fig)
             show_mock.assert_called_once_with(fig)
 
         # when keep_stdout is set off, but we don't have html file either
         with mock.patch(
-            f"{MODULE_PATH}.get_parameter_value",
-            side_effect=fake_get_parameter_value_different,
+            f"{MODULE_PATH}.get_settings",
+            return_value=_fake_settings(fake_get_parameter_value_different),
         ):
             _print_figure(fig)
             assert show_mock.call_count == 2
@@ -1900,15 +2214,16 @@ def test__print_figure__stdout__not_bokeh(simple_dataframe):
         fig = alt.Chart(simple_dataframe)
         # when keep_stdout is set on
         with mock.patch(
-            f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+            f"{MODULE_PATH}.get_settings",
+            return_value=_fake_settings(fake_get_parameter_value),
         ):
             _print_figure(fig)
             show_mock.assert_called_once()
 
         # when keep_stdout is set off, but we don't have html file either
         with mock.patch(
-            f"{MODULE_PATH}.get_parameter_value",
-            side_effect=fake_get_parameter_value_different,
+            f"{MODULE_PATH}.get_settings",
+            return_value=_fake_settings(fake_get_parameter_value_different),
         ):
             _print_figure(fig)
             assert show_mock.call_count == 2
@@ -1930,7 +2245,8 @@ def test__print_figure__file_output(
             return None
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ), mock.patch(f"{MODULE_PATH}._write_to_html") as _write_to_html_mock:
         fig = alt.Chart(simple_dataframe).mark_bar().encode(x="x2", y="x1")
         ref = Reference()
@@ -2019,7 +2335,8 @@ def test_print_figure(
         }.get(key)
 
     with mock.patch(
-        f"{MODULE_PATH}.get_parameter_value", side_effect=fake_get_parameter_value
+        f"{MODULE_PATH}.get_settings",
+        return_value=_fake_settings(fake_get_parameter_value),
     ), mock.patch(f"{MODULE_PATH}._print_figure") as _print_figure_mock:
         ref = Reference()
         fig = alt.Chart(simple_dataframe).mark_bar().encode(x="x2", y="x1")
@@ -2044,3 +2361,609 @@ def test_print_figure(
             matplotlib_format="does_not_matter",
             embedded=True,
         )
+
+
+def test_report(tmp_path, simple_dataframe):
+    html_path = tmp_path / "out" / "report.html"
+    with Report(html_path, title="My report", toc=True) as report:
+        report.print_h1("First heading")
+        report.print_table(simple_dataframe, caption="Data")
+        # module-level functions print into the active report too
+        print_h2("Second heading")
+        fig, ax = plt.subplots()
+        report.print_figure(fig, matplotlib_format="png", embedded=False)
+        plt.close(fig)
+    assert report.closed
+    assert report.settings.toc is True
+
+    result = html_path.read_text()
+    assert "<title>My report</title>" in result
+    assert "First heading" in result and "Second heading" in result
+    assert 'data-target="pyreball-table-wrapper-inner-1"' in result
+    assert '<img src="report/img_001.png">' in result
+    assert (tmp_path / "out" / "report" / "img_001.png").is_file()
+    assert result.rstrip().endswith("</html>")
+
+
+def test_report__independent_counters(tmp_path, pre_test_print_heading_cleanup):
+    first_report = Report(tmp_path / "first.html", numbered_headings=True)
+    second_report = Report(tmp_path / "second.html", numbered_headings=True)
+    first_report.print_h1("a")
+    first_report.print_h1("b")
+    second_report.print_h1("c")
+    first_report.close()
+    second_report.close()
+
+    heading_sep = NON_BREAKABLE_SPACE * 2
+    assert f">2{heading_sep}b<" in (tmp_path / "first.html").read_text()
+    assert f">1{heading_sep}c<" in (tmp_path / "second.html").read_text()
+    # the default report is not affected
+    assert _heading_memory == {}
+
+
+def test_report__closed(tmp_path):
+    report = Report(tmp_path / "report.html")
+    report.close()
+    # closing again does nothing
+    report.close()
+    with pytest.raises(RuntimeError):
+        report.print("text")
+
+
+@pytest.mark.parametrize(
+    "parameters,expected_error",
+    [
+        ({"unknown_parameter": "yes"}, TypeError),
+        ({"toc": "maybe"}, ValueError),
+    ],
+)
+def test_report__invalid_parameters(parameters, expected_error, tmp_path):
+    with pytest.raises(expected_error):
+        Report(tmp_path / "report.html", **parameters)
+    with pytest.raises(ValueError):
+        Report(tmp_path / "report.txt")
+
+
+def test_report__list_parameters(tmp_path):
+    report = Report(
+        tmp_path / "report.html",
+        tables_paging_sizes=[5, "All"],
+        tables_datatables_style=["display", "compact"],
+    )
+    report.close()
+    assert report.settings.tables_paging_sizes == [5, "All"]
+    assert report.settings.tables_datatables_style == ["display", "compact"]
+
+
+def test_report__vanilla_runtime_with_table(tmp_path, simple_dataframe):
+    with Report(
+        tmp_path / "report.html", javascript_runtime="vanilla", keep_stdout=False
+    ) as report:
+        report.print_table(simple_dataframe)
+        report.print_code_block("x = 1")
+
+    with open(tmp_path / "report.html") as f:
+        result = f.read()
+    # DataTables is a jQuery plugin, so jQuery is linked even without jQuery runtime
+    assert result.index("code.jquery.com/jquery") < result.index("dataTables.min.js")
+    assert "$(document).ready" not in result
+
+
+def _print_report_with_references(html_path, df):
+    with Report(html_path, numbered_headings=True, keep_stdout=False) as report:
+        table_reference = Reference()
+        heading_reference = Reference()
+        print_html(f"See {table_reference} and {heading_reference('this')}.")
+        print_h1("Tables", reference=heading_reference)
+        # the title is changed after some links are written
+        report.set_title("Report with references")
+        with report.sections() as sections:
+            first_section = sections.section()
+            second_section = sections.section()
+            with second_section:
+                print_table(df)
+            with first_section:
+                section_reference = Reference()
+                print_table(df, reference=section_reference)
+                print_html(f"Section table: {section_reference}")
+        print_table(df, reference=table_reference)
+        print_html(f"Table {table_reference} again, heading {heading_reference}.")
+    return table_reference, heading_reference, section_reference
+
+
+def test_report__references(tmp_path, simple_dataframe, monkeypatch):
+    # the same state as at the start of a script
+    monkeypatch.setattr("pyreball.html._reference_ids", itertools.count(1))
+    references = _print_report_with_references(
+        tmp_path / "first" / "report.html", simple_dataframe
+    )
+    _print_report_with_references(tmp_path / "second" / "report.html", simple_dataframe)
+
+    table_reference, heading_reference, section_reference = references
+    assert table_reference.id == "id1"
+    assert heading_reference.id == "id2"
+    assert section_reference.id.endswith("_1")
+
+    with open(tmp_path / "first" / "report.html", "rb") as f:
+        content = f.read()
+    with open(tmp_path / "second" / "report.html", "rb") as f:
+        assert f.read() == content
+    assert os.listdir(tmp_path / "first") == ["report.html"]
+
+    result = content.decode()
+    assert '<title class="custom_pyreball_title">Report with references</title>' in (
+        result
+    )
+    assert 'See <a href="#table-3">3</a> and <a href="#ch_1_tables_1">this</a>.' in (
+        result
+    )
+    assert 'Section table: <a href="#table-1">1</a>' in result
+    assert (
+        'Table <a href="#table-3">3</a> again, '
+        'heading <a href="#ch_1_tables_1">1\u00a0\u00a0Tables</a>.'
+    ) in result
+    assert "ref-" not in result
+
+
+def test_report__build_profile(tmp_path, simple_dataframe):
+    html_path = tmp_path / "report.html"
+    with Report(html_path, build_profile="both", keep_stdout=False) as report:
+        report.print_h1("Data")
+        # print_div calls print, but only the div is recorded
+        print_div("Text")
+        report.print_table(simple_dataframe, caption="Table")
+        fig, ax = plt.subplots()
+        print_figure(fig, caption="Figure", matplotlib_format="png", embedded=False)
+        plt.close(fig)
+        with report.sections() as sections, sections.section():
+            print_h2("Section")
+    assert sorted(os.listdir(tmp_path)) == [
+        "report",
+        "report.html",
+        "report_profile.json",
+    ]
+
+    with open(tmp_path / "report_profile.json") as f:
+        profile = json.load(f)
+    elements = profile["elements"]
+    assert [(e["element"], e["index"], e["label"]) for e in elements] == [
+        ("h1", 1, "Data"),
+        ("div", 1, None),
+        ("table", 1, "Table"),
+        ("figure", 1, "Figure"),
+        ("h2", 1, "Section"),
+    ]
+    assert all(e["location"].startswith(f"{__file__}:") for e in elements)
+    assert elements[1]["bytes"] == len("<div>Text</div>\n")
+    image_size = os.path.getsize(tmp_path / "report" / "img_001.png")
+    assert elements[3]["bytes"] > image_size
+    assert profile["bytes"] == sum(e["bytes"] for e in elements)
+
+    result = html_path.read_text()
+    assert '<h1 id="ch_build_profile">Build profile' in result
+    assert "<td>table</td><td>1</td><td>Table</td>" in result
+    assert result.index("Build profile") < result.index("</body>")
+
+
+def test_report__build_profile__disabled(tmp_path):
+    with Report(tmp_path / "report.html") as report:
+        report.print_h1("Data")
+    assert os.listdir(tmp_path) == ["report.html"]
+
+
+def test_report__references_of_default_report_and_report_objects(
+    tmp_path, simple_dataframe
+):
+    # the references are created while different reports are printed into
+    default_reference = Reference()
+    with Report(tmp_path / "other.html", keep_stdout=False):
+        other_reference = Reference()
+    with Report(tmp_path / "report.html", keep_stdout=False):
+        report_reference = Reference()
+        for reference in [default_reference, other_reference, report_reference]:
+            print_table(simple_dataframe, reference=reference)
+        print_html(f"See {default_reference}, {other_reference}, {report_reference}.")
+
+    assert len({default_reference.id, other_reference.id, report_reference.id}) == 3
+    result = _read_report_body(tmp_path / "report.html")
+    assert (
+        'See <a href="#table-1">1</a>, <a href="#table-2">2</a>, '
+        '<a href="#table-3">3</a>.'
+    ) in result
+
+
+def _print_report_section(name, df, reference=None, linked_reference=None):
+    print_h2(f"Section {name}")
+    if linked_reference is not None:
+        print_html(f"See {linked_reference}.")
+    print_code_block(f"print({name!r})")
+    print_table(df, caption=name, reference=reference)
+    fig, ax = plt.subplots()
+    ax.plot([1, 2])
+    print_figure(fig, caption=name, matplotlib_format="png", embedded=False)
+    plt.close(fig)
+
+
+def _read_report_body(html_path):
+    with open(html_path) as f:
+        return f.read().split("<body>", 1)[1]
+
+
+def test_sections(tmp_path, simple_dataframe):
+    names = ["a", "b", "c", "d"]
+    parameters = {"numbered_headings": True, "keep_stdout": False}
+
+    with Report(tmp_path / "sequential" / "report.html", **parameters):
+        print_h1("Start")
+        print_table(simple_dataframe)
+        for name in names:
+            _print_report_section(name, simple_dataframe)
+        print_h1("End")
+
+    def print_section(name, section):
+        with section:
+            _print_report_section(name, simple_dataframe)
+
+    with Report(tmp_path / "parallel" / "report.html", **parameters):
+        print_h1("Start")
+        print_table(simple_dataframe)
+        with Sections() as sections:
+            declared_sections = [(name, sections.section()) for name in names]
+            # print the sections in the reversed order
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                for future in [
+                    executor.submit(print_section, name, section)
+                    for name, section in reversed(declared_sections)
+                ]:
+                    future.result()
+        print_h1("End")
+
+    result = _read_report_body(tmp_path / "parallel" / "report.html")
+    assert result == _read_report_body(tmp_path / "sequential" / "report.html")
+    assert "__pyreball_" not in result
+    assert "Table 5: d" in result
+    assert sorted(os.listdir(tmp_path / "parallel" / "report")) == [
+        "img_001.png",
+        "img_002.png",
+        "img_003.png",
+        "img_004.png",
+    ]
+
+
+def test_sections__report_method(tmp_path, simple_dataframe):
+    report = Report(tmp_path / "report.html")
+    other_report = Report(tmp_path / "other.html")
+    sections = report.sections()
+    second_section = sections.section()
+    first_section = sections.section()
+    with first_section:
+        print_table(simple_dataframe, caption="first")
+        # printing into another report is not captured by the section
+        other_report.print_div("other")
+    with second_section:
+        print_table(simple_dataframe, caption="second")
+    sections.merge()
+    report.close()
+    other_report.close()
+
+    result = _read_report_body(tmp_path / "report.html")
+    assert result.index("Table 1: second") < result.index("Table 2: first")
+    assert "other" not in result
+    assert "<div>other</div>" in _read_report_body(tmp_path / "other.html")
+    with pytest.raises(RuntimeError), first_section:
+        pass
+
+
+def test_sections__merge_until(tmp_path):
+    fig, ax = plt.subplots()
+    ax.plot([1, 2])
+    report = Report(tmp_path / "report.html", keep_stdout=False)
+    sections = report.sections()
+    first_section = sections.section()
+    second_section = sections.section()
+    # the file of the second section exists when the first one is merged
+    with second_section:
+        print_figure(fig, matplotlib_format="png", embedded=False)
+    with first_section:
+        print_figure(fig, matplotlib_format="png", embedded=False)
+    sections.merge(until=first_section)
+    assert first_section.merged
+    assert not second_section.merged
+    assert len(os.listdir(tmp_path / "report")) == 2
+    assert "img_001.png" in os.listdir(tmp_path / "report")
+    sections.merge()
+    report.close()
+    plt.close(fig)
+
+    assert sorted(os.listdir(tmp_path / "report")) == ["img_001.png", "img_002.png"]
+    result = _read_report_body(tmp_path / "report.html")
+    assert result.index("img_001.png") < result.index("img_002.png")
+
+
+def _print_altair_section(df):
+    print_figure(alt.Chart(df).mark_bar().encode(x="x2", y="x1"))
+
+
+def test_sections__shared_altair_dataset(tmp_path, simple_dataframe):
+    parameters = {"altair_data_mode": "external", "keep_stdout": False}
+
+    with Report(tmp_path / "sequential" / "report.html", **parameters):
+        for _ in range(2):
+            _print_altair_section(simple_dataframe)
+
+    report = Report(tmp_path / "sections" / "report.html", **parameters)
+    with report, report.sections() as sections:
+        declared_sections = [sections.section() for _ in range(2)]
+        # the dataset is printed by the second section first
+        for section in reversed(declared_sections):
+            with section:
+                _print_altair_section(simple_dataframe)
+
+    with Report(tmp_path / "processes" / "report.html", **parameters) as report:
+        report.build_sections(
+            [functools.partial(_print_altair_section, simple_dataframe)] * 2,
+            max_workers=2,
+        )
+
+    expected_result = _read_report_body(tmp_path / "sequential" / "report.html")
+    assert expected_result.count("<script src=") == 1
+    for name in ["sections", "processes"]:
+        assert _read_report_body(tmp_path / name / "report.html") == expected_result
+        data_file_names = os.listdir(tmp_path / name / "report")
+        assert len(data_file_names) == 1
+        assert data_file_names[0].startswith("altair_")
+
+
+def test_build_sections(tmp_path, simple_dataframe):
+    reference = Reference()
+    section_arguments = [
+        {"name": "a", "linked_reference": reference},
+        {"name": "b", "reference": reference},
+        {"name": "c"},
+    ]
+    parameters = {"numbered_headings": True, "keep_stdout": False}
+
+    with Report(tmp_path / "sequential" / "report.html", **parameters):
+        print_h1("Start")
+        for arguments in section_arguments:
+            _print_report_section(df=simple_dataframe, **arguments)
+        print_h1("End")
+
+    with Report(tmp_path / "parallel" / "report.html", **parameters) as report:
+        print_h1("Start")
+        report.build_sections(
+            [
+                functools.partial(
+                    _print_report_section, df=simple_dataframe, **arguments
+                )
+                for arguments in section_arguments
+            ],
+            max_workers=2,
+        )
+        print_h1("End")
+
+    result = _read_report_body(tmp_path / "parallel" / "report.html")
+    assert result == _read_report_body(tmp_path / "sequential" / "report.html")
+    assert 'See <a href="#table-2">2</a>.' in result
+    assert sorted(os.listdir(tmp_path / "parallel" / "report")) == [
+        "img_001.png",
+        "img_002.png",
+        "img_003.png",
+    ]
+
+
+def _print_section_with_nested_reference(df):
+    # the nested section gets its ID from the counter of the worker process
+    with Sections() as sections, sections.section():
+        reference = Reference()
+    print_table(df, reference=reference)
+    print_html(f"See {reference}.")
+
+
+def test_build_sections__references_created_in_workers(tmp_path, simple_dataframe):
+    with Report(tmp_path / "report.html", keep_stdout=False) as report:
+        report.build_sections(
+            [
+                functools.partial(
+                    _print_section_with_nested_reference, simple_dataframe
+                ),
+                functools.partial(
+                    _print_section_with_nested_reference, simple_dataframe
+                ),
+            ],
+            max_workers=2,
+            mp_context=multiprocessing.get_context("fork"),
+        )
+        # the parent process continues with its own counters
+        _print_section_with_nested_reference(simple_dataframe)
+
+    result = _read_report_body(tmp_path / "report.html")
+    for index in [1, 2, 3]:
+        assert f'See <a href="#table-{index}">{index}</a>.' in result
+
+
+def test_build_sections__reference_used_twice(tmp_path, simple_dataframe):
+    reference = Reference()
+    report = Report(tmp_path / "report.html")
+    with pytest.raises(ValueError):
+        build_sections(
+            [
+                functools.partial(
+                    _print_report_section, "a", simple_dataframe, reference=reference
+                ),
+                functools.partial(
+                    _print_report_section, "b", simple_dataframe, reference=reference
+                ),
+            ],
+            max_workers=2,
+            report=report,
+        )
+
+
+def test_async_report(tmp_path, simple_dataframe):
+    parameters = {"numbered_headings": True, "keep_stdout": False}
+    fig, ax = plt.subplots()
+    ax.plot([1, 2])
+
+    with Report(tmp_path / "sequential" / "report.html", **parameters) as report:
+        report.set_title("Title")
+        report.print_h1("Start")
+        for name in ["a", "b", "c"]:
+            report.print_h2(name)
+            report.print_table(simple_dataframe, caption=name)
+            report.print_figure(fig, matplotlib_format="png", embedded=False)
+        report.print_code_block("x = 1")
+
+    async def build_report():
+        async with AsyncReport(
+            tmp_path / "async" / "report.html", **parameters
+        ) as async_report:
+            await async_report.set_title("Title")
+            await async_report.print_h1("Start")
+            awaitables = []
+            for name in ["a", "b", "c"]:
+                awaitables += [
+                    async_report.print_h2(name),
+                    async_report.print_table(simple_dataframe, caption=name),
+                    async_report.print_figure(
+                        fig, matplotlib_format="png", embedded=False
+                    ),
+                ]
+            await asyncio.gather(*awaitables)
+            # the last element is written even if it is not awaited
+            async_report.print_code_block("x = 1")
+        return async_report
+
+    async_report = asyncio.run(build_report())
+    plt.close(fig)
+
+    assert async_report.report.closed
+    result = _read_report_body(tmp_path / "async" / "report.html")
+    assert result == _read_report_body(tmp_path / "sequential" / "report.html")
+    assert "__pyreball_" not in result
+    with open(tmp_path / "async" / "report.html") as f:
+        assert '<title class="custom_pyreball_title">Title</title>' in f.read()
+
+
+def test_async_report__failed_element(tmp_path):
+    async def build_report():
+        async with AsyncReport(tmp_path / "report.html") as async_report:
+            first = async_report.print_div("first")
+            failed = async_report.print_h1("failed", reference="not a reference")
+            last = async_report.print_div("last")
+            await first
+            with pytest.raises(AttributeError):
+                await failed
+            await last
+
+    asyncio.run(build_report())
+    result = _read_report_body(tmp_path / "report.html")
+    assert result.index("<div>first</div>") < result.index("<div>last</div>")
+
+
+def _print_partial_figure(fig):
+    print_div("partial")
+    print_figure(fig, matplotlib_format="png", embedded=False)
+    raise RuntimeError("failure")
+
+
+def test_async_report__failed_element_is_discarded(tmp_path):
+    fig, ax = plt.subplots()
+    ax.plot([1, 2])
+
+    async def build_report():
+        async with AsyncReport(
+            tmp_path / "report.html", keep_stdout=False
+        ) as async_report:
+            failed = async_report._print(_print_partial_figure, fig)
+            last = async_report.print_figure(
+                fig, matplotlib_format="png", embedded=False
+            )
+            with pytest.raises(RuntimeError):
+                await failed
+            await last
+
+    asyncio.run(build_report())
+    plt.close(fig)
+
+    result = _read_report_body(tmp_path / "report.html")
+    assert "partial" not in result
+    # the figure of the failed element is not counted nor kept
+    assert "Figure 1" in result
+    assert "Figure 2" not in result
+    assert os.listdir(tmp_path / "report") == ["img_001.png"]
+
+
+def _print_blocking_figure(fig, started, release):
+    print_div("partial")
+    print_figure(fig, matplotlib_format="png", embedded=False)
+    started.set()
+    release.wait()
+    print_div("late")
+
+
+def test_async_report__cancelled_element_is_discarded(tmp_path):
+    fig, ax = plt.subplots()
+    ax.plot([1, 2])
+    started = threading.Event()
+    release = threading.Event()
+
+    async def build_report():
+        async with AsyncReport(
+            tmp_path / "report.html",
+            keep_stdout=False,
+            executor=ThreadPoolExecutor(max_workers=2),
+        ) as async_report:
+            cancelled = async_report._print(
+                _print_blocking_figure, fig, started, release
+            )
+            last = async_report.print_figure(
+                fig, matplotlib_format="png", embedded=False
+            )
+            await asyncio.get_running_loop().run_in_executor(None, started.wait)
+            cancelled.cancel()
+            # the element is still being printed when the operation is cancelled
+            release.set()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            await last
+
+    asyncio.run(build_report())
+    plt.close(fig)
+
+    result = _read_report_body(tmp_path / "report.html")
+    assert "partial" not in result
+    assert "late" not in result
+    assert "__pyreball_" not in result
+    assert "Figure 1" in result
+    assert "Figure 2" not in result
+    assert os.listdir(tmp_path / "report") == ["img_001.png"]
+
+
+def _print_failed_heading(reference):
+    print_h2("Failed", reference=reference)
+    raise RuntimeError("failure")
+
+
+def test_async_report__reference_of_failed_element_is_released(tmp_path):
+    async def build_report():
+        async with AsyncReport(
+            tmp_path / "report.html", keep_stdout=False
+        ) as async_report:
+            reference = Reference()
+            with pytest.raises(RuntimeError):
+                await async_report._print(_print_failed_heading, reference)
+            # the reference was released when the failed element was discarded
+            await async_report.print_h2("Retry", reference=reference)
+
+    asyncio.run(build_report())
+
+    result = _read_report_body(tmp_path / "report.html")
+    assert "Failed" not in result
+    assert "Retry" in result
+
+
+def test_async_report__not_opened(tmp_path):
+    async_report = AsyncReport(tmp_path / "report.html")
+    with pytest.raises(RuntimeError):
+        async_report.print_div("text")
@@ -1,24 +1,41 @@
+import base64
+import hashlib
+import io
+import json
 import os
 import sys
 import textwrap
+import time
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
 
 from pyreball.__main__ import (
+    _INLINED_IMAGES_SCRIPT,
     _contains_class,
     _fill_bokeh_version_in_external_links,
+    _find_local_imports,
+    _finish_html_file,
+    _get_changed_paths,
     _get_config_directory,
     _get_output_dir_and_file_stem,
+    _inline_local_assets,
     _insert_heading_title_and_toc,
+    _insert_inline_highlight_script,
     _insert_js_and_css_links,
+    _localize_link,
     _parse_heading_info,
-    _replace_ids,
+    _patch_references,
+    _read_build_profile,
+    _take_snapshot,
+    _watch,
+    _write_build_profile,
+    _write_escaped_text_file,
     main,
     parse_arguments,
 )
-from pyreball._common import get_default_path_to_config
+from pyreball._common import get_build_profile_path, get_default_path_to_config
 from pyreball.constants import (
     CONFIG_INI_FILENAME,
     HTML_TEMPLATE_FILENAME,
@@ -27,101 +44,161 @@ from pyreball.constants import (
 )
 
 
-@pytest.mark.parametrize(
-    "lines,expected_result",
-    [
-        (
-            [
-                "<html>",
-                "</html>",
-            ],
-            [
-                "<html>",
-                "</html>",
-            ],
-        ),
-        (
-            [
-                "<html>",
-                'Reference to table <a href="#ref-id99">id99</a>',
-                'Reference to image <a href="#ref-id17">id17</a>',
-                (
-                    '<a name="img-id17-5">Image caption</a>'
-                    '<a name="table-id99-1">Table caption</a>'
-                ),
-                (
-                    'Reference to table <a href="#ref-id123">id123</a> and image '
-                    '<a href="#ref-id42">id42</a>'
-                ),
-                '<a name="table-id123-2">Another table caption</a>',
-                '<a name="img-id42-2">Another image caption</a>',
-                (
-                    'Reference again to table <a href="#ref-id123">id123</a> and image '
-                    '<a href="#ref-id42">id42</a>'
-                ),
-                "</html>",
-            ],
-            [
-                "<html>",
-                'Reference to table <a href="#table-1">1</a>',
-                'Reference to image <a href="#img-5">5</a>',
-                '<a name="img-5">Image caption</a><a name="table-1">Table caption</a>',
-                (
-                    'Reference to table <a href="#table-2">2</a> and image '
-                    '<a href="#img-2">2</a>'
-                ),
-                '<a name="table-2">Another table caption</a>',
-                '<a name="img-2">Another image caption</a>',
-                (
-                    'Reference again to table <a href="#table-2">2</a> and image '
-                    '<a href="#img-2">2</a>'
-                ),
-                "</html>",
-            ],
-        ),
-        (
-            [
-                "<html>",
-                'Reference to code block <a href="#ref-id99">id99</a>',
-                '<a name="code-block-id99-1">Code caption</a>',
-                "</html>",
-            ],
-            [
-                "<html>",
-                'Reference to code block <a href="#code-block-1">1</a>',
-                '<a name="code-block-1">Code caption</a>',
-                "</html>",
-            ],
-        ),
-        (
-            [
-                "<html>",
-                'Reference to chapter <a href="#ref-id123">id123</a>',
-                (
-                    '<h1 id="ch_id123_heading_1_1">My Chapter'
-                    '<a class="pyreball-anchor-link" href="#ch_id123_heading_1_1">'
-                    "\u00b6</a></h1>"
-                ),
-                'Reference to chapter <a href="#ref-id123">id123</a> again',
-                "</html>",
-            ],
-            [
-                "<html>",
-                'Reference to chapter <a href="#ch_heading_1_1">My Chapter</a>',
-                (
-                    '<h1 id="ch_heading_1_1">My Chapter'
-                    '<a class="pyreball-anchor-link" href="#ch_heading_1_1">\u00b6'
-                    "</a></h1>"
-                ),
-                'Reference to chapter <a href="#ch_heading_1_1">My Chapter</a> again',
-                "</html>",
-            ],
-        ),
-    ],
-)
-def test__replace_ids(lines, expected_result):
-    result = _replace_ids(lines)
-    assert result == expected_result
+def _write_html_with_reference_records(html_path, parts):
+    """Write parts of an HTML file and record the links like `_write_to_html`."""
+    records = []
+    with open(html_path, "w") as f:
+        for part in parts:
+            if isinstance(part, tuple):
+                kind, reference_id = part
+                records.append([kind, f.tell(), reference_id])
+                f.write(f"ref-{reference_id}" if kind == "link" else reference_id)
+            else:
+                f.write(part)
+    return records
+
+
+def test__patch_references(tmp_path):
+    html_path = tmp_path / "report.html"
+    records = _write_html_with_reference_records(
+        html_path,
+        [
+            '<html>\nSee table <a href="#',
+            ("link", "id1"),
+            '">',
+            ("text", "id1"),
+            '</a>, chapter <a href="#',
+            ("link", "id2"),
+            '">',
+            ("text", "id2"),
+            '</a> and <a href="#',
+            ("link", "id2"),
+            '">this chapter</a>.\n',
+            '<h1 id="ch_1_m\u00f6j_chapter_1">1\u00a0\u00a0M\u00f6j chapter</h1>\n',
+            '<a name="table-3">Table 3</a>\nUnknown <a href="#',
+            ("link", "id3"),
+            '">',
+            ("text", "id3"),
+            "</a>\n</html>\n",
+        ],
+    )
+    records += [
+        ["target", "id2", "ch_1_m\u00f6j_chapter_1", "1\u00a0\u00a0M\u00f6j chapter"],
+        ["target", "id1", "table-3", "3"],
+    ]
+    references_path = tmp_path / ".report.html.references"
+    with open(references_path, "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+    _patch_references(html_path)
+
+    with open(html_path) as f:
+        assert f.read() == (
+            '<html>\nSee table <a href="#table-3">3</a>, chapter '
+            '<a href="#ch_1_m\u00f6j_chapter_1">1\u00a0\u00a0M\u00f6j chapter</a> and '
+            '<a href="#ch_1_m\u00f6j_chapter_1">this chapter</a>.\n'
+            '<h1 id="ch_1_m\u00f6j_chapter_1">1\u00a0\u00a0M\u00f6j chapter</h1>\n'
+            '<a name="table-3">Table 3</a>\n'
+            'Unknown <a href="#ref-id3">id3</a>\n</html>\n'
+        )
+    assert not references_path.exists()
+
+
+def test__patch_references__shift(tmp_path):
+    html_path = tmp_path / "report.html"
+    records = _write_html_with_reference_records(
+        html_path,
+        [
+            '<title>a</title>\n<a href="#',
+            ("link", "id1"),
+            '">',
+            ("text", "id1"),
+            "</a>",
+        ],
+    )
+    # the title was changed after the link was written
+    with open(html_path) as f:
+        content = f.read()
+    with open(html_path, "w") as f:
+        f.write(content.replace("<title>a</title>", "<title>abc</title>"))
+    records += [["shift", 2], ["target", "id1", "img-1", "1"]]
+    with open(tmp_path / ".report.html.references", "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+    _patch_references(html_path)
+
+    with open(html_path) as f:
+        assert f.read() == '<title>abc</title>\n<a href="#img-1">1</a>'
+
+
+def test__patch_references__no_records(tmp_path):
+    html_path = tmp_path / "report.html"
+    with open(html_path, "w") as f:
+        f.write('<a href="#ref-id1">id1</a>')
+    _patch_references(html_path)
+    with open(html_path) as f:
+        assert f.read() == '<a href="#ref-id1">id1</a>'
+
+
+def _write_build_profile_records(html_path, records):
+    with open(get_build_profile_path(html_path), "w") as f:
+        for element, label, seconds in records:
+            record = {
+                "element": element,
+                "label": label,
+                "location": "script.py:1",
+                "seconds": seconds,
+                "bytes": 10,
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def test__read_build_profile(tmp_path):
+    html_path = tmp_path / "report.html"
+    assert _read_build_profile(html_path) == []
+    _write_build_profile_records(
+        html_path, [("table", "a", 0.5), ("h1", None, 0.1), ("table", None, 1.0)]
+    )
+    records = _read_build_profile(html_path)
+    assert [(r["element"], r["index"]) for r in records] == [
+        ("table", 1),
+        ("h1", 1),
+        ("table", 2),
+    ]
+    assert not get_build_profile_path(html_path).exists()
+
+
+@pytest.mark.parametrize("build_profile", ["no", "json", "section", "both"])
+def test__write_build_profile(build_profile, tmp_path):
+    html_path = tmp_path / "report.html"
+    html_path.write_text("<body>\n")
+    _write_build_profile_records(
+        html_path, [("h1", "<b>Intro</b>", 0.1), ("table", "Sales", 0.3)]
+    )
+    _write_build_profile(html_path, build_profile)
+
+    assert not get_build_profile_path(html_path).exists()
+    json_path = tmp_path / "report_profile.json"
+    assert json_path.exists() == (build_profile in ["json", "both"])
+    if json_path.exists():
+        with open(json_path) as f:
+            profile = json.load(f)
+        assert profile["report"] == "report.html"
+        assert profile["seconds"] == 0.4
+        assert profile["bytes"] == 20
+        assert len(profile["elements"]) == 2
+
+    result = html_path.read_text()
+    if build_profile in ["section", "both"]:
+        assert "2 elements printed in 0.400 s, 20 bytes written." in result
+        # the most expensive element is the first one
+        assert result.index("<td>Sales</td>") < result.index(
+            "<td>&lt;b&gt;Intro&lt;/b&gt;</td>"
+        )
+        assert '"order": [[4, "desc"]]' in result
+        assert _contains_class(result, "pyreball-table-wrapper")
+    else:
+        assert result == "<body>\n"
 
 
 @pytest.mark.parametrize(
@@ -372,6 +449,30 @@ def test__contains_class(html_text, class_name, expected_result):
     assert _contains_class(html_text, class_name) == expected_result
 
 
+@pytest.mark.parametrize(
+    "html_text,expected_result",
+    [
+        # the class name is a part of another class name
+        ('<div class="inline-block"></div>', False),
+        # the class name is in the text after the attribute
+        ('<div class="a"> inline "</div>', False),
+        ('<div class="a">x</div><p class="b inline"></p>', True),
+    ],
+)
+def test__contains_class__within_attribute_value(html_text, expected_result):
+    assert _contains_class(html_text, "inline") == expected_result
+
+
+def test__contains_class__large_document():
+    # each class attribute is searched only up to its end,
+    # so the time grows linearly with the size of the document
+    html_text = '<div class="a b c">text with several words</div>\n' * 5000
+    start_time = time.perf_counter()
+    assert not _contains_class(html_text, "inline")
+    assert _contains_class(html_text + '<p class="inline"></p>', "inline")
+    assert time.perf_counter() - start_time < 1
+
+
 @pytest.mark.parametrize(
     "external_links,expected",
     [
@@ -448,6 +549,7 @@ def test__fill_bokeh_version_in_external_links(external_links, expected):
                 '<div class="pyreball-plotly-fig">'
                 "</div>"
                 '<div class="pyreball-code-wrapper">'
+                '<pre><code class="block-highlight python"></code></pre>'
                 "</div>"
                 "</html>"
             ),
@@ -467,16 +569,328 @@ def test__fill_bokeh_version_in_external_links(external_links, expected):
                 '<div class="pyreball-plotly-fig">'
                 "</div>"
                 '<div class="pyreball-code-wrapper">'
+                '<pre><code class="block-highlight python"></code></pre>'
                 "</div>"
                 "</html>"
             ),
         ),
+        (
+            (
+                "<html><!--PYREBALL_HEAD_LINKS-->"
+                '<div class="pyreball-code-wrapper"><pre><code></code></pre></div>'
+                "</html>"
+            ),
+            {"jquery": ["l1"], "highlight_js": ["l2"]},
+            (
+                "<html>"
+                '<div class="pyreball-code-wrapper"><pre><code></code></pre></div>'
+                "</html>"
+            ),
+        ),
     ],
 )
 def test__insert_js_and_css_links(html_content, external_links, expected_result):
     assert _insert_js_and_css_links(html_content, external_links) == expected_result
 
 
+def test__insert_js_and_css_links__runtime_script():
+    html_content = (
+        "<html><!--PYREBALL_HEAD_LINKS-->"
+        '<div class="pyreball-plotly-fig">'
+        '<script type="application/json" class="pyreball-init" data-kind="plotly" '
+        'data-target="plotlyvis1">{}</script>'
+        "</div></html>"
+    )
+    result = _insert_js_and_css_links(html_content, {"plotly": ["l1"]})
+    assert result.startswith("<html>l1\n<script>\n(function () {")
+    assert "pyreball.initialize = function ()" in result
+    assert result.endswith(
+        "})();\n</script>" + html_content[len("<html><!--PYREBALL_HEAD_LINKS-->") :]
+    )
+
+
+@pytest.mark.parametrize("use_jquery", [True, False])
+def test__insert_js_and_css_links__use_jquery(use_jquery):
+    html_content = (
+        "<html><!--PYREBALL_HEAD_LINKS-->"
+        '<div class="pyreball-table-wrapper"></div></html>'
+    )
+    result = _insert_js_and_css_links(
+        html_content, {"jquery": ["l1"], "datatables": ["l2"]}, use_jquery=use_jquery
+    )
+    # DataTables always needs jQuery
+    assert result == '<html>l1\nl2<div class="pyreball-table-wrapper"></div></html>'
+
+    html_content = (
+        '<html><!--PYREBALL_HEAD_LINKS--><code class="inline-highlight"></code></html>'
+    )
+    result = _insert_js_and_css_links(
+        html_content, {"jquery": ["l1"], "highlight_js": ["l2"]}, use_jquery=use_jquery
+    )
+    expected_links = "l1\nl2" if use_jquery else "l2"
+    assert result == (
+        f'<html>{expected_links}<code class="inline-highlight"></code></html>'
+    )
+
+
+@pytest.mark.parametrize("use_jquery", [True, False])
+def test__insert_inline_highlight_script(use_jquery):
+    html_content = (
+        '<html><code class="inline-highlight python">x</code>'
+        "<!--PYREBALL_INLINE_HIGHLIGHT_SCRIPT--></html>"
+    )
+    result = _insert_inline_highlight_script(html_content, use_jquery=use_jquery)
+    assert "<!--PYREBALL_INLINE_HIGHLIGHT_SCRIPT-->" not in result
+    assert ("$(document).ready" in result) == use_jquery
+    assert ("hljs.highlightElement" in result) != use_jquery
+
+    result = _insert_inline_highlight_script(
+        "<html><!--PYREBALL_INLINE_HIGHLIGHT_SCRIPT--></html>", use_jquery=use_jquery
+    )
+    assert result == "<html></html>"
+
+
+def test__insert_js_and_css_links__deferred_scripts():
+    html_content = (
+        "<html><!--PYREBALL_HEAD_LINKS-->"
+        '<div class="pyreball-table-wrapper"></div>'
+        '<div class="pyreball-plotly-fig"></div>'
+        '<code class="inline-highlight python"></code></html>'
+    )
+    external_links = {
+        "jquery": ['<script src="jq.js"></script>'],
+        "datatables": [
+            '<link rel="stylesheet" href="dt.css" />',
+            '<script src="dt.js"></script>',
+        ],
+        "highlight_js": [
+            '<script src="hl.js"></script>',
+            "<script>hljs.highlightAll();</script>",
+        ],
+        "plotly": ['<script src="plotly.js" charset="utf-8"></script>'],
+    }
+    result = _insert_js_and_css_links(
+        html_content, external_links, deferred_scripts=True
+    )
+    assert result == (
+        "<html>"
+        '<link rel="preload" href="dt.css" as="style">\n'
+        '<script src="jq.js" defer></script>\n'
+        '<link rel="stylesheet" href="dt.css" />\n'
+        '<script src="dt.js" defer></script>\n'
+        '<script src="hl.js" defer></script>\n'
+        '<script>document.addEventListener("DOMContentLoaded", function () {'
+        "hljs.highlightAll();});</script>\n"
+        '<script src="plotly.js" charset="utf-8" async></script>'
+        + html_content[len("<html><!--PYREBALL_HEAD_LINKS-->") :]
+    )
+
+
+def test__insert_inline_highlight_script__deferred_scripts():
+    html_content = (
+        '<html><code class="inline-highlight python">x</code>'
+        "<!--PYREBALL_INLINE_HIGHLIGHT_SCRIPT--></html>"
+    )
+    result = _insert_inline_highlight_script(html_content, deferred_scripts=True)
+    assert (
+        '<script>document.addEventListener("DOMContentLoaded", function () {\n'
+        "    $(document).ready(function () {"
+    ) in result
+
+
+def test__insert_js_and_css_links__build_time_highlight():
+    html_content = (
+        "<html><!--PYREBALL_HEAD_LINKS-->"
+        '<div class="pyreball-code-wrapper">'
+        '<pre><code class="pyreball-highlight python">'
+        '<span class="n">x</span></code></pre></div></html>'
+    )
+    result = _insert_js_and_css_links(
+        html_content, {"jquery": ["l1"], "highlight_js": ["l2"]}
+    )
+    assert result.startswith("<html><style>\n.pyreball-highlight ")
+    assert "l1" not in result
+    assert "l2" not in result
+
+
+def test__localize_link(tmpdir):
+    tmpdir = Path(tmpdir)
+    (tmpdir / "cache").mkdir()
+    (tmpdir / "cache" / "bokeh-3.2.2.min.js").write_text("bokeh")
+    (tmpdir / "cache" / "vega@5").write_text("vega")
+    assets_dir_path = tmpdir / "out" / "_assets"
+    digest = hashlib.sha256(b"bokeh").hexdigest()[:16]
+
+    result = _localize_link(
+        '<script src="https://cdn.bokeh.org/bokeh/release/bokeh-3.2.2.min.js" '
+        'crossorigin="anonymous"></script>',
+        asset_cache_path=tmpdir / "cache",
+        assets_dir_path=assets_dir_path,
+        html_dir_path=tmpdir / "out",
+    )
+    assert result == f'<script src="_assets/bokeh-3.2.2.min.{digest}.js"></script>'
+    assert (assets_dir_path / f"bokeh-3.2.2.min.{digest}.js").read_text() == "bokeh"
+
+    # files without suffix and html files in other directories
+    result = _localize_link(
+        '<script src="https://cdn.jsdelivr.net/npm/vega@5"></script>',
+        asset_cache_path=tmpdir / "cache",
+        assets_dir_path=assets_dir_path,
+        html_dir_path=tmpdir / "out" / "sub",
+    )
+    digest = hashlib.sha256(b"vega").hexdigest()[:16]
+    assert result == f'<script src="../_assets/vega@5.{digest}"></script>'
+    assert sorted(p.name for p in assets_dir_path.iterdir()) == [
+        f"bokeh-3.2.2.min.{hashlib.sha256(b'bokeh').hexdigest()[:16]}.js",
+        f"vega@5.{digest}",
+    ]
+
+
+@pytest.mark.parametrize(
+    "link",
+    [
+        "<script>hljs.highlightAll();</script>",
+        '<link rel="stylesheet" href="https://cdn.datatables.net/jquery.css" />',
+    ],
+)
+def test__localize_link__kept_links(link, tmpdir):
+    tmpdir = Path(tmpdir)
+    result = _localize_link(
+        link,
+        asset_cache_path=tmpdir,
+        assets_dir_path=tmpdir / "_assets",
+        html_dir_path=tmpdir,
+    )
+    assert result == link
+    assert not (tmpdir / "_assets").exists()
+
+
+def test__insert_js_and_css_links__link_resolver():
+    html_content = (
+        '<html><!--PYREBALL_HEAD_LINKS--><div class="pyreball-plotly-fig"></div></html>'
+    )
+    result = _insert_js_and_css_links(
+        html_content,
+        {"plotly": ["l1", "l2"]},
+        link_resolver=lambda link: link.upper(),
+    )
+    assert result == '<html>L1\nL2<div class="pyreball-plotly-fig"></div></html>'
+
+
+def test__finish_html_file__shared_assets_directory(tmpdir):
+    tmpdir = Path(tmpdir)
+    (tmpdir / "cache").mkdir()
+    (tmpdir / "cache" / "plotly.min.js").write_text("plotly")
+    digest = hashlib.sha256(b"plotly").hexdigest()[:16]
+    external_links = {
+        "plotly": ['<script src="https://cdn.plot.ly/plotly.min.js"></script>']
+    }
+    for html_path in [tmpdir / "out" / "a.html", tmpdir / "out" / "b" / "b.html"]:
+        html_path.parent.mkdir(parents=True, exist_ok=True)
+        html_path.write_text(
+            "<html><!--PYREBALL_HEAD_LINKS--><!--PYREBALL_INLINE_HIGHLIGHT_SCRIPT-->"
+            '<div class="pyreball-plotly-fig"></div></html>'
+        )
+        _finish_html_file(
+            html_path=html_path,
+            include_toc=False,
+            external_links=external_links,
+            asset_cache_path=tmpdir / "cache",
+            assets_dir_path=tmpdir / "out" / "_assets",
+        )
+
+    assert (
+        f'<script src="_assets/plotly.min.{digest}.js">'
+        in (tmpdir / "out" / "a.html").read_text()
+    )
+    assert (
+        f'<script src="../_assets/plotly.min.{digest}.js">'
+        in (tmpdir / "out" / "b" / "b.html").read_text()
+    )
+    assert [p.name for p in (tmpdir / "out" / "_assets").iterdir()] == [
+        f"plotly.min.{digest}.js"
+    ]
+    assert not (tmpdir / "out" / "b" / "_assets").exists()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 100])
+def test__write_escaped_text_file(chunk_size, tmpdir):
+    src_path = Path(tmpdir) / "a.js"
+    src_path.write_text('var a = "</script>"; // </SCRIPT </scrip <</script', "utf-8")
+    f = io.StringIO()
+    _write_escaped_text_file(src_path, "script", f, chunk_size=chunk_size)
+    assert f.getvalue() == ('var a = "<\\/script>"; // <\\/SCRIPT </scrip <<\\/script')
+
+
+def test__inline_local_assets(tmpdir):
+    tmpdir = Path(tmpdir)
+    (tmpdir / "report").mkdir()
+    png_bytes = b"\x89PNG"
+    (tmpdir / "report" / "img_001.png").write_bytes(png_bytes)
+    (tmpdir / "report" / "altair_data.js").write_text("var d = 1;")
+    (tmpdir / "cache").mkdir()
+    (tmpdir / "cache" / "style.css").write_text("p {color: red;}")
+    html_path = tmpdir / "report.html"
+    html_path.write_text(
+        "<html><head>\n"
+        '<link rel="stylesheet" href="cache/style.css" />\n'
+        '<script src="https://cdn.example.com/lib.js"></script>\n'
+        "</head><body>\n"
+        '<div><img src="report/img_001.png"></div>\n'
+        '<script src="report/altair_data.js"></script>'
+        '<script src="report/altair_data.js"></script>\n'
+        '<img src="report/missing.png">\n'
+        "</body></html>\n"
+    )
+    _inline_local_assets(html_path)
+    png_digest = hashlib.sha256(png_bytes).hexdigest()[:16]
+    assert html_path.read_text() == (
+        "<html><head>\n"
+        "<style>\np {color: red;}\n</style>\n"
+        '<script src="https://cdn.example.com/lib.js"></script>\n'
+        "</head><body>\n"
+        f'<div><img id="pyreball-inlined-{png_digest}" src="data:image/png;base64,'
+        f'{base64.b64encode(png_bytes).decode()}"></div>\n'
+        "<script>\nvar d = 1;\n</script>\n"
+        '<img src="report/missing.png">\n'
+        "</body></html>\n"
+    )
+    assert sorted(p.name for p in tmpdir.iterdir()) == [
+        "cache",
+        "report",
+        "report.html",
+    ]
+
+
+def test__inline_local_assets__same_contents(tmp_path):
+    (tmp_path / "report").mkdir()
+    png_bytes = b"\x89PNG"
+    for name in ["img_001.png", "img_002.png"]:
+        (tmp_path / "report" / name).write_bytes(png_bytes)
+    for name in ["a.js", "b.js"]:
+        (tmp_path / "report" / name).write_text("var d = 1;")
+    html_path = tmp_path / "report.html"
+    html_path.write_text(
+        "<html><body>\n"
+        '<script src="report/a.js"></script><script src="report/b.js"></script>\n'
+        '<img src="report/img_001.png">\n'
+        '<img src="report/img_002.png"><img src="report/img_001.png">\n'
+        "</body></html>\n"
+    )
+    _inline_local_assets(html_path)
+
+    result = html_path.read_text()
+    image_id = f"pyreball-inlined-{hashlib.sha256(png_bytes).hexdigest()[:16]}"
+    assert result.count(base64.b64encode(png_bytes).decode()) == 1
+    assert result.count("var d = 1;") == 1
+    assert result.count(f'<img data-pyreball-src="{image_id}">') == 2
+    assert result.index(f'<img id="{image_id}" src="data:image/png;base64,') < (
+        result.index("data-pyreball-src")
+    )
+    # the script copying the data URI runs after all images are parsed
+    assert result.endswith(f"{_INLINED_IMAGES_SCRIPT}</body></html>\n")
+
+
 def test__get_config_directory__custom_path_does_not_exist(tmpdir):
     tmpdir = Path(tmpdir)
     config_dir = "my_config_dir"
@@ -718,6 +1132,10 @@ def test_parse_arguments__invalid_arguments(args):
                 "script_args": ["-p", "20", "img.png"],
             },
         ),
+        (
+            ["--watch", "scripts/report.py"],
+            {"watch": True, "input_path": Path("scripts/report.py")},
+        ),
         # wrong page-width will be parsed as it is, but fixed later
         (
             ["--page-width", "20", "scripts/report.py"],
@@ -742,16 +1160,32 @@ def test_parse_arguments__valid_arguments(args, expected_non_empty_result):
         "tables_paging_sizes": None,
         "tables_search_box": None,
         "tables_datatables_style": None,
+        "lazy_tables": None,
         "align_figures": None,
         "figure_captions_position": None,
         "numbered_figures": None,
         "matplotlib_format": None,
         "matplotlib_embedded": None,
+        "lazy_figures": None,
+        "plotly_data_encoding": None,
+        "altair_data_mode": None,
+        "asset_cache_path": None,
+        "script_loading": None,
+        "javascript_runtime": None,
+        "code_highlighting": None,
+        "assets_path": None,
+        "self_contained": None,
+        "build_profile": None,
         "numbered_headings": None,
         "page_width": None,
         "keep_stdout": None,
         "output_path": None,
         "config_path": None,
+        "watch": False,
+        "fan_out": None,
+        "max_workers": None,
+        "trace": None,
+        "profile": None,
         "input_path": None,
         "script_args": [],
     }
@@ -829,3 +1263,282 @@ def test_main__module_input(tmpdir):
     assert "<html>" in result_html_content
     assert "Square of 4 is 16" in result_html_content
     assert "</html>" in result_html_content
+
+
+def test__find_local_imports(tmp_path):
+    (tmp_path / "package" / "subpackage").mkdir(parents=True)
+    for path in [
+        "package/__init__.py",
+        "package/subpackage/__init__.py",
+        "package/subpackage/sub.py",
+        "other.py",
+    ]:
+        (tmp_path / path).touch()
+    (tmp_path / "package" / "module.py").write_text("from .subpackage import sub\n")
+    (tmp_path / "helpers.py").write_text("import other\nimport os\n")
+    script_path = tmp_path / "report.py"
+    script_path.write_text(
+        "import sys\n"
+        "import helpers\n"
+        "from package.module import function\n"
+        "import pyreball as pb\n"
+        "import missing.module\n"
+    )
+
+    result = _find_local_imports(script_path, search_directory=tmp_path)
+    assert result == sorted(
+        tmp_path / path
+        for path in [
+            "helpers.py",
+            "other.py",
+            "package/__init__.py",
+            "package/module.py",
+            "package/subpackage/__init__.py",
+            "package/subpackage/sub.py",
+        ]
+    )
+
+
+def test__get_changed_paths(tmp_path):
+    first_path = tmp_path / "first.py"
+    second_path = tmp_path / "second.py"
+    third_path = tmp_path / "third.py"
+    first_path.write_text("a = 1")
+    second_path.write_text("b = 1")
+    paths = [first_path, second_path, third_path]
+    snapshot = _take_snapshot(paths, {})
+
+    # touching a file does not change it
+    stat = os.stat(first_path)
+    os.utime(first_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    second_path.write_text("b = 22")
+    third_path.write_text("c = 1")
+    new_snapshot = _take_snapshot(paths, snapshot)
+    assert _get_changed_paths(snapshot, new_snapshot) == [second_path, third_path]
+
+    third_path.unlink()
+    assert _get_changed_paths(new_snapshot, _take_snapshot(paths, new_snapshot)) == [
+        third_path
+    ]
+
+
+def test__watch(tmp_path, capsys):
+    script_path = tmp_path / "report.py"
+    script_path.write_text("a = 1")
+    html_path = tmp_path / "report.html"
+    contents = iter(["first", "first", "second"])
+
+    def build():
+        html_path.write_text(next(contents))
+
+    def fake_sleep(seconds):
+        # the second poll finds a change
+        fake_sleep.calls += 1
+        if fake_sleep.calls % 2 == 0:
+            script_path.write_text(f"a = {fake_sleep.calls}")
+
+    fake_sleep.calls = 0
+    with patch("pyreball.__main__.time.sleep", side_effect=fake_sleep):
+        _watch(
+            build,
+            get_watched_paths=lambda: [script_path],
+            html_path=html_path,
+            max_builds=3,
+        )
+
+    output_lines = capsys.readouterr().out.splitlines()
+    assert output_lines[0].startswith(f"Report {html_path} updated, built in ")
+    assert output_lines[1:3] == ["Watching for changes...", f"Changed: {script_path}."]
+    assert output_lines[3].startswith(f"Report {html_path} unchanged, built in ")
+    assert output_lines[6].startswith(f"Report {html_path} updated, built in ")
+    assert len(output_lines) == 7
+    assert html_path.read_text() == "second"
+
+
+def test_main__fan_out(tmp_path, capsys):
+    script_path = tmp_path / "report.py"
+    script_path.write_text(
+        textwrap.dedent(
+            """\
+            import argparse
+
+            import pyreball as pb
+
+            parser = argparse.ArgumentParser()
+            parser.add_argument("--prefix")
+            parser.add_argument("--customer")
+            args = parser.parse_args()
+            pb.print_div(f"{args.prefix} {args.customer}")
+            if args.customer == "failing":
+                raise ValueError("Failed report.")
+            """
+        ),
+        encoding="utf-8",
+    )
+    sets_path = tmp_path / "sets.json"
+    sets_path.write_text(json.dumps({"customer": ["acme", "failing", "zeta"]}))
+
+    argv = [
+        "pyreball",
+        "--fan-out",
+        str(sets_path),
+        "--max-workers",
+        "2",
+        "--keep-stdout",
+        "no",
+        "--output-path",
+        str(tmp_path / "output" / "customer.html"),
+        str(script_path),
+        "--",
+        "--prefix",
+        "Customer",
+    ]
+    with patch("sys.argv", argv):
+        main()
+
+    for index, customer in enumerate(["acme", "failing", "zeta"], start=1):
+        with open(tmp_path / "output" / f"customer_{index}.html") as f:
+            result_html_content = f.read()
+        assert f"<div>Customer {customer}</div>" in result_html_content
+        assert "</html>" in result_html_content
+
+    with open(tmp_path / "output" / "customer_index.json") as f:
+        index = json.load(f)
+    assert [report["output"] for report in index["reports"]] == [
+        "customer_1.html",
+        "customer_2.html",
+        "customer_3.html",
+    ]
+    assert [report["arguments"] for report in index["reports"]] == [
+        {"customer": "acme"},
+        {"customer": "failing"},
+        {"customer": "zeta"},
+    ]
+    assert [report["exit_code"] for report in index["reports"]] == [0, 1, 0]
+    with open(tmp_path / "output" / "customer_index.html") as f:
+        assert '<a href="customer_2.html">customer_2.html</a>' in f.read()
+    assert "3 reports rendered in" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "mode,table_ids",
+    [
+        (
+            "cpu",
+            ["pyreball-profile-by-own-time", "pyreball-profile-by-cumulative-time"],
+        ),
+        ("memory", ["pyreball-profile-allocation-sites"]),
+    ],
+)
+def test_main__profile(tmp_path, mode, table_ids):
+    script_path = tmp_path / "report.py"
+    script_path.write_text(
+        textwrap.dedent(
+            """\
+            import pyreball as pb
+
+            rows = [list(range(100)) for _ in range(1000)]
+            pb.print_div("Text")
+            """
+        ),
+        encoding="utf-8",
+    )
+    argv = ["pyreball", "--profile", mode, "--keep-stdout", "no"]
+    with patch("sys.argv", [*argv, str(script_path)]):
+        main()
+
+    assert "Text" in (tmp_path / "report.html").read_text(encoding="utf-8")
+    assert not (tmp_path / ".report.html.profile-results").exists()
+    profile_html = (tmp_path / f"report_{mode}_profile.html").read_text(
+        encoding="utf-8"
+    )
+    assert '<a href="report.html">report.html</a>' in profile_html
+    for table_id in table_ids:
+        assert f'id="{table_id}"' in profile_html
+    if mode == "memory":
+        assert "rows = [list(range(100)) for _ in range(1000)]" in profile_html
+
+
+def test_main__profile__path_with_spaces(tmp_path):
+    # characters with a special meaning in a shell must not break the command
+    directory = tmp_path / "my reports; $(touch injected)"
+    directory.mkdir()
+    script_path = directory / "my report.py"
+    script_path.write_text(
+        textwrap.dedent(
+            """\
+            import sys
+            import pyreball as pb
+
+            pb.print_div("Arguments:", *sys.argv[1:])
+            """
+        ),
+        encoding="utf-8",
+    )
+    argv = ["pyreball", "--profile", "cpu", "--keep-stdout", "no"]
+    with patch("sys.argv", [*argv, str(script_path), "--", "a b", "c"]):
+        main()
+
+    result = (directory / "my report.html").read_text(encoding="utf-8")
+    assert "<div>Arguments:a bc</div>" in result
+    assert (directory / "my report_cpu_profile.html").exists()
+    assert not list(tmp_path.glob("**/injected"))
+    assert not (Path.cwd() / "injected").exists()
+
+
+def test_main__trace(tmp_path):
+    script_path = tmp_path / "report.py"
+    script_path.write_text(
+        textwrap.dedent(
+            """\
+            import pyreball as pb
+
+            pb.print_h1("Heading")
+            pb.print_div("Text")
+            """
+        ),
+        encoding="utf-8",
+    )
+    trace_path = tmp_path / "trace.json"
+    argv = ["pyreball", "--trace", str(trace_path), "--keep-stdout", "no"]
+    with patch("sys.argv", [*argv, str(script_path)]):
+        main()
+
+    with open(trace_path) as f:
+        events = json.load(f)["traceEvents"]
+    assert not (tmp_path / ".trace.json.events").exists()
+    process_names = {
+        event["pid"]: event["args"]["name"] for event in events if event["ph"] == "M"
+    }
+    assert sorted(process_names.values()) == ["pyreball", "report report.html"]
+    spans = {
+        (process_names[event["pid"]], event["name"])
+        for event in events
+        if event["ph"] == "X"
+    }
+    assert {
+        ("pyreball", "load configuration"),
+        ("pyreball", "run script"),
+        ("pyreball", "patch references"),
+        ("pyreball", "insert title and table of contents"),
+        ("report report.html", "script startup"),
+        ("report report.html", "print_h1"),
+        ("report report.html", "print_div"),
+    } <= spans
+    # the print inside print_div is not a separate span
+    assert ("report report.html", "print") not in spans
+    assert all(
+        event["args"]["report"] == "report.html"
+        for event in events
+        if event["ph"] == "X"
+    )
+
+
+def test_parse_arguments__watch_and_fan_out():
+    with pytest.raises(SystemExit):
+        parse_arguments(["--watch", "--fan-out", "sets.csv", "report.py"])
+
+
+def test_parse_arguments__profile_and_fan_out():
+    with pytest.raises(SystemExit):
+        parse_arguments(["--profile", "cpu", "--fan-out", "sets.csv", "report.py"])
@@ -124,6 +124,34 @@ def test_code_block__with_syntax_highlight():
     assert code_block("a", "b", sep="\n", syntax_highlight="python") == expected_result
 
 
+def test_code__with_build_time_syntax_highlight(monkeypatch, tmpdir):
+    monkeypatch.setenv("PYREBALL_CACHE_DIR", str(tmpdir))
+    monkeypatch.setenv(
+        "_TMP_PYREBALL_GENERATOR_PARAMETERS", '{"code_highlighting": "build"}'
+    )
+    expected_result = (
+        '<code class="pyreball-highlight python">'
+        '<span class="n">a</span><span class="o">=</span><span class="mi">1</span>'
+        "</code>"
+    )
+    assert code("a=1", syntax_highlight="python") == expected_result
+
+
+def test_code_block__with_build_time_syntax_highlight(monkeypatch, tmpdir):
+    monkeypatch.setenv("PYREBALL_CACHE_DIR", str(tmpdir))
+    monkeypatch.setenv(
+        "_TMP_PYREBALL_GENERATOR_PARAMETERS", '{"code_highlighting": "build"}'
+    )
+    expected_result = (
+        '<pre><code class="pyreball-highlight python">\n'
+        '<span class="n">a</span>\n<span class="n">b</span>\n</code></pre>'
+    )
+    assert code_block("a", "b", sep="\n", syntax_highlight="python") == expected_result
+    # unknown languages are left to the browser
+    expected_result = '<pre><code class="block-highlight unknown">a</code></pre>'
+    assert code_block("a", syntax_highlight="unknown") == expected_result
+
+
 def test_code_block__with_syntax_highlight_and_attributes():
     expected_result = (
         '<pre class="pre1" pa="pv">'
@@ -0,0 +1,109 @@
+import os
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from pyreball.__main__ import parameter_specifications
+from pyreball._common import get_default_path_to_config
+from pyreball.constants import (
+    CONFIG_INI_FILENAME,
+    HTML_TEMPLATE_FILENAME,
+    LINKS_INI_FILENAME,
+    STYLES_TEMPLATE_FILENAME,
+)
+from pyreball.utils import config_cache
+from pyreball.utils.config_cache import get_compiled_config
+
+MODULE_PATH = "pyreball.utils.config_cache"
+
+
+@pytest.fixture
+def config_directory(tmpdir):
+    config_directory = Path(tmpdir) / "config"
+    config_directory.mkdir()
+    for filename in [
+        CONFIG_INI_FILENAME,
+        LINKS_INI_FILENAME,
+        STYLES_TEMPLATE_FILENAME,
+        HTML_TEMPLATE_FILENAME,
+    ]:
+        (config_directory / filename).write_text(
+            (get_default_path_to_config() / filename).read_text()
+        )
+    yield config_directory
+    config_cache._compiled_config_memory.clear()
+
+
+def _get_compiled_config(config_directory):
+    return get_compiled_config(
+        config_directory=config_directory,
+        html_template_path=config_directory / HTML_TEMPLATE_FILENAME,
+        parameter_specifications=parameter_specifications,
+    )
+
+
+def test_get_compiled_config(config_directory):
+    result = _get_compiled_config(config_directory)
+    assert result["parameters"]["page_width"] == 80
+    assert result["parameters"]["tables_display_option"] == "full"
+    assert set(result["external_links"]) == {
+        "altair",
+        "bokeh",
+        "datatables",
+        "highlight_js",
+        "jquery",
+        "plotly",
+    }
+    assert "{{page_width}}" in result["css_template"]
+    assert "<!--PYREBALL_REPORT_CONTENTS-->" in result["html_template"]
+
+
+def test_get_compiled_config__reuses_cache(config_directory):
+    first_result = _get_compiled_config(config_directory)
+    with mock.patch(f"{MODULE_PATH}._compile_config") as compile_mock:
+        # from memory
+        assert _get_compiled_config(config_directory) == first_result
+        # from disk, e.g. in another process
+        config_cache._compiled_config_memory.clear()
+        assert _get_compiled_config(config_directory) == first_result
+        # touched files with unchanged contents
+        config_ini_path = config_directory / CONFIG_INI_FILENAME
+        stat = os.stat(config_ini_path)
+        os.utime(config_ini_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        result = _get_compiled_config(config_directory)
+        assert result["parameters"] == first_result["parameters"]
+    compile_mock.assert_not_called()
+
+
+def test_get_compiled_config__warnings_on_every_run(config_directory, caplog):
+    config_ini_path = config_directory / CONFIG_INI_FILENAME
+    config_ini_path.write_text(
+        config_ini_path.read_text().replace("lazy-tables = no\n", "")
+    )
+    for _ in range(2):
+        caplog.clear()
+        result = _get_compiled_config(config_directory)
+        assert result["parameters"]["lazy_tables"] == "no"
+        assert "Parameter lazy_tables was not set" in caplog.text
+        # the following runs use the cache on disk
+        config_cache._compiled_config_memory.clear()
+
+
+def test_get_compiled_config__invalidated_by_changes(config_directory):
+    _get_compiled_config(config_directory)
+    config_ini_path = config_directory / CONFIG_INI_FILENAME
+    config_ini_path.write_text(
+        config_ini_path.read_text().replace("page-width = 80", "page-width = 60")
+    )
+    assert _get_compiled_config(config_directory)["parameters"]["page_width"] == 60
+
+    css_path = config_directory / STYLES_TEMPLATE_FILENAME
+    css_path.write_text("body {}")
+    assert _get_compiled_config(config_directory)["css_template"] == "body {}"
+
+
+def test_get_compiled_config__returns_copies(config_directory):
+    result = _get_compiled_config(config_directory)
+    result["external_links"]["bokeh"] = []
+    assert _get_compiled_config(config_directory)["external_links"]["bokeh"] != []
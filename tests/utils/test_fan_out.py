@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from pyreball.utils.fan_out import format_script_args, load_argument_sets
+
+
+def test_load_argument_sets__csv(tmp_path):
+    path = tmp_path / "sets.csv"
+    path.write_text("customer,year\nacme,2023\nzeta,\n")
+    assert load_argument_sets(path) == [
+        {"customer": "acme", "year": "2023"},
+        {"customer": "zeta"},
+    ]
+
+
+def test_load_argument_sets__json_list(tmp_path):
+    path = tmp_path / "sets.json"
+    argument_sets = [{"customer": "acme", "year": 2023}, {"customer": "zeta"}]
+    path.write_text(json.dumps(argument_sets))
+    assert load_argument_sets(path) == argument_sets
+
+
+def test_load_argument_sets__json_grid(tmp_path):
+    path = tmp_path / "grid.JSON"
+    path.write_text(json.dumps({"customer": ["acme", "zeta"], "year": [1, 2], "x": 0}))
+    assert load_argument_sets(path) == [
+        {"customer": "acme", "year": 1, "x": 0},
+        {"customer": "acme", "year": 2, "x": 0},
+        {"customer": "zeta", "year": 1, "x": 0},
+        {"customer": "zeta", "year": 2, "x": 0},
+    ]
+
+
+@pytest.mark.parametrize(
+    "filename,contents",
+    [("sets.json", "[1, 2]"), ("sets.json", '"text"'), ("sets.txt", "")],
+)
+def test_load_argument_sets__invalid_file(tmp_path, filename, contents):
+    path = tmp_path / filename
+    path.write_text(contents)
+    with pytest.raises(ValueError):
+        load_argument_sets(path)
+
+
+def test_format_script_args():
+    argument_set = {
+        "customer": "acme",
+        "-y": 2023,
+        "regions": ["eu", "us"],
+        "verbose": True,
+        "debug": False,
+        "limit": None,
+    }
+    assert format_script_args(argument_set) == [
+        "--customer",
+        "acme",
+        "-y",
+        "2023",
+        "--regions",
+        "eu",
+        "us",
+        "--verbose",
+    ]
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from pyreball._common import get_cache_directory
+from pyreball.utils.highlight import (
+    get_highlight_style_definitions,
+    highlight_code,
+)
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmpdir):
+    monkeypatch.setenv("PYREBALL_CACHE_DIR", str(tmpdir))
+    return Path(tmpdir) / "highlight"
+
+
+@pytest.mark.parametrize(
+    "code_html,language,expected_result",
+    [
+        (
+            "x = 1",
+            "python",
+            '<span class="n">x</span> <span class="o">=</span> '
+            '<span class="mi">1</span>',
+        ),
+        (
+            "x\n",
+            "python",
+            '<span class="n">x</span>\n',
+        ),
+        (
+            "<b>&quot;a&lt;b&quot;</b>",
+            "python",
+            '<span class="s2">&quot;a&lt;b&quot;</span>',
+        ),
+        ("x = 1", "unknown-language", None),
+    ],
+)
+def test_highlight_code(code_html, language, expected_result, cache_dir):
+    assert highlight_code(code_html, language) == expected_result
+
+
+def test_highlight_code__cache(cache_dir):
+    result = highlight_code("x = 1", "python")
+    cached_files = list(cache_dir.iterdir())
+    assert len(cached_files) == 1
+    assert cached_files[0].read_text() == result
+
+    cached_files[0].write_text("cached")
+    assert highlight_code("x = 1", "python") == "cached"
+    assert highlight_code("x = 2", "python") != "cached"
+
+
+def test_get_highlight_style_definitions():
+    lines = get_highlight_style_definitions().splitlines()
+    assert len(lines) > 0
+    assert all(line.startswith(".pyreball-highlight") for line in lines)
+
+
+def test_get_cache_directory(monkeypatch, tmpdir):
+    monkeypatch.delenv("PYREBALL_CACHE_DIR", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+    assert get_cache_directory("highlight") == Path(tmpdir) / "pyreball" / "highlight"
+    monkeypatch.setenv("PYREBALL_CACHE_DIR", str(tmpdir / "custom"))
+    assert get_cache_directory("highlight") == Path(tmpdir) / "custom" / "highlight"
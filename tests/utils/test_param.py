@@ -1,6 +1,8 @@
 import configparser
 import logging
 import os
+import pickle
+from dataclasses import FrozenInstanceError
 from pathlib import Path
 from unittest import mock
 
@@ -9,10 +11,13 @@ import pytest
 from pyreball.utils.param import (
     ChoiceParameter,
     IntegerParameter,
+    Settings,
     StringParameter,
     Substitutor,
     _map_env_value,
     _matches_paging_sizes_string,
+    _parse_tables_datatables_style,
+    _parse_tables_paging_sizes,
     carefully_remove_directory_if_exists,
     check_and_fix_parameters,
     check_choice_string_parameter,
@@ -21,6 +26,7 @@ from pyreball.utils.param import (
     get_external_links_from_config,
     get_file_config,
     get_parameter_value,
+    get_settings,
     make_sure_dir_exists,
     merge_parameter_dictionaries,
     merge_values,
@@ -525,6 +531,105 @@ def test_get_parameter_value():
         assert get_parameter_value("html_file_path") == "/tmp/dir.html"
 
 
+@pytest.mark.parametrize(
+    "sizes,expected_result",
+    [
+        ("20", [20]),
+        ("20,30", [20, 30]),
+        ("20,30,100", [20, 30, 100]),
+        ("20,30,100,All", [20, 30, 100, "All"]),
+        ("20,all,100", [20, "all", 100]),
+        ("ALL", ["ALL"]),
+    ],
+)
+def test__parse_tables_paging_sizes(sizes, expected_result):
+    assert _parse_tables_paging_sizes(sizes) == expected_result
+
+
+@pytest.mark.parametrize(
+    "style,expected_result",
+    [
+        ("display", ["display"]),
+        ("display,compact", ["display", "compact"]),
+        ("display compact", ["display", "compact"]),
+    ],
+)
+def test__parse_tables_datatables_style(style, expected_result):
+    assert _parse_tables_datatables_style(style) == expected_result
+
+
+def test_settings_from_parameters():
+    settings = Settings.from_parameters(
+        {
+            "html_dir_path": "/tmp/dir",
+            "page_width": 80,
+            "keep_stdout": "yes",
+            "toc": "no",
+            "align_tables": "left",
+            "tables_paging_sizes": "10,all",
+            "tables_datatables_style": "display,compact",
+            "lazy_figures": True,
+            "assets_path": "None",
+            "unknown_key": "value",
+        }
+    )
+    assert settings.html_dir_path == "/tmp/dir"
+    assert settings.html_dir_name == "dir"
+    assert settings.html_file_path == "/tmp/dir.html"
+    assert settings.page_width == 80
+    assert settings.keep_stdout is True
+    assert settings.toc is False
+    assert settings.align_tables == "left"
+    assert settings.tables_paging_sizes == [10, "all"]
+    assert settings.tables_datatables_style == ["display", "compact"]
+    assert settings.lazy_figures is True
+    assert settings.assets_path is None
+    assert settings.numbered_tables is None
+    assert not hasattr(settings, "unknown_key")
+
+
+def test_settings_from_parameters__already_parsed_values():
+    settings = Settings.from_parameters(
+        {
+            "html_dir_path": "/tmp/dir",
+            "html_dir_name": "other",
+            "tables_paging_sizes": [10, 20],
+            "tables_datatables_style": ["display"],
+        }
+    )
+    assert settings.html_dir_name == "other"
+    assert settings.html_file_path == "/tmp/dir.html"
+    assert settings.tables_paging_sizes == [10, 20]
+    assert settings.tables_datatables_style == ["display"]
+
+
+def test_settings__immutable():
+    settings = Settings.from_parameters({"toc": "yes"})
+    with pytest.raises(FrozenInstanceError):
+        settings.toc = False  # type: ignore[misc]
+    with pytest.raises((AttributeError, TypeError)):
+        settings.new_attribute = 1  # type: ignore[attr-defined]
+    assert not hasattr(settings, "__dict__")
+
+
+def test_settings__pickle():
+    settings = Settings.from_parameters(
+        {"html_dir_path": "/tmp/dir", "tables_paging_sizes": "10,all"}
+    )
+    assert pickle.loads(pickle.dumps(settings)) == settings
+
+
+def test_get_settings():
+    pars = '{"html_dir_path": "/tmp/dir", "toc": "yes", "tables_paging_sizes": "5"}'
+    with mock.patch.dict(os.environ, {"_TMP_PYREBALL_GENERATOR_PARAMETERS": pars}):
+        settings = get_settings()
+        assert settings.html_file_path == "/tmp/dir.html"
+        assert settings.toc is True
+        assert settings.tables_paging_sizes == [5]
+        # the settings are built only once per session
+        assert get_settings() is settings
+
+
 def test_make_sure_dir_exists(tmpdir):
     directory = str(tmpdir / "mydir")
     assert not os.path.exists(directory)
@@ -566,7 +671,7 @@ def test_carefully_remove_directory_if_exists__with_image_files(tmpdir):
     directory.mkdir(parents=True)
 
     # Creates empty files
-    filenames = ["img.png", "img.jpg", "img.svg"]
+    filenames = ["img.png", "img.jpg", "img.svg", "altair_data.js"]
     for filename in filenames:
         (directory / filename).touch()
 
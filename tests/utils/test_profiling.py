@@ -0,0 +1,115 @@
+import json
+import sys
+import textwrap
+
+import pytest
+
+from pyreball.utils.profiling import (
+    get_profile_results_path,
+    main,
+    run_profiled_script,
+)
+
+
+@pytest.fixture
+def script_path(tmp_path, monkeypatch):
+    # the script changes the arguments and the import path of this process
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    path = tmp_path / "report.py"
+    path.write_text(
+        textwrap.dedent(
+            """\
+            import sys
+
+            def create_rows(count):
+                return [list(range(100)) for _ in range(count)]
+
+            rows = create_rows(int(sys.argv[1]))
+            if len(sys.argv) > 2:
+                raise RuntimeError(sys.argv[2])
+            """
+        ),
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_get_profile_results_path(tmp_path):
+    assert (
+        get_profile_results_path(tmp_path / "report.html")
+        == tmp_path / ".report.html.profile-results"
+    )
+
+
+def test_run_profiled_script__cpu(tmp_path, script_path):
+    results_path = tmp_path / "results.json"
+    run_profiled_script(
+        "cpu", results_path, script_path=script_path, script_args=["10"]
+    )
+
+    with open(results_path) as f:
+        results = json.load(f)
+    assert results["mode"] == "cpu"
+    assert results["calls"] > 0
+    assert len(results["by_own_time"]) <= 50
+    own_times = [record["own_seconds"] for record in results["by_own_time"]]
+    assert own_times == sorted(own_times, reverse=True)
+    create_rows_record = next(
+        record
+        for record in results["by_cumulative_time"]
+        if record["function"] == "create_rows"
+    )
+    assert create_rows_record["location"] == f"{script_path}:3"
+    assert create_rows_record["calls"] == 1
+
+
+def test_run_profiled_script__memory(tmp_path, script_path):
+    results_path = tmp_path / "results.json"
+    run_profiled_script(
+        "memory", results_path, script_path=script_path, script_args=["1000"]
+    )
+
+    with open(results_path) as f:
+        results = json.load(f)
+    assert results["mode"] == "memory"
+    assert results["peak_bytes"] >= results["current_bytes"] > 0
+    # the rows are still referenced by the script, so the line is the top site
+    top_site = results["sites"][0]
+    assert top_site["location"] == f"{script_path}:4"
+    assert top_site["code"] == "return [list(range(100)) for _ in range(count)]"
+    assert top_site["blocks"] >= 1000
+
+
+@pytest.mark.parametrize("mode", ["cpu", "memory"])
+def test_run_profiled_script__failing_script(tmp_path, script_path, mode):
+    results_path = tmp_path / "results.json"
+    with pytest.raises(RuntimeError, match="failure"):
+        run_profiled_script(
+            mode, results_path, script_path=script_path, script_args=["10", "failure"]
+        )
+
+    with open(results_path) as f:
+        assert json.load(f)["mode"] == mode
+
+
+def test_run_profiled_script__invalid_mode(tmp_path, script_path):
+    with pytest.raises(ValueError, match="Profile mode"):
+        run_profiled_script("disk", tmp_path / "results.json", script_path=script_path)
+
+
+@pytest.mark.parametrize(
+    "args", [[], ["cpu", "results.json"], ["cpu", "results.json", "-m"]]
+)
+def test_main__missing_script(args, capsys):
+    with pytest.raises(SystemExit):
+        main(args)
+    assert "usage: python -m pyreball.utils.profiling" in capsys.readouterr().err
+
+
+def test_main__module(tmp_path, script_path, monkeypatch):
+    monkeypatch.chdir(script_path.parent)
+    results_path = tmp_path / "results.json"
+    main(["cpu", str(results_path), "-m", "report", "10"])
+    with open(results_path) as f:
+        assert json.load(f)["mode"] == "cpu"
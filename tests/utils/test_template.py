@@ -3,7 +3,7 @@ from pathlib import Path
 
 import pytest
 
-from pyreball.utils.template import get_css, get_html
+from pyreball.utils.template import get_css, get_html, render_css, render_html
 
 
 def test_get_html(tmpdir):
@@ -41,3 +41,22 @@ def test_get_css__non_existing_file(tmpdir, caplog):
     with pytest.raises(SystemExit):
         get_css(filename, directory, page_width=30)
     assert "There was a problem reading file" in caplog.text
+
+
+def test_render_css():
+    assert render_css("body {width: {{page_width}}%;}", page_width=55) == (
+        "body {width: 55%;}"
+    )
+
+
+def test_render_html():
+    result_begin, result_end = render_html(
+        html_template=(
+            "<html><!--PYREBALL_PAGE_TITLE--><!--PYREBALL_CSS_DEFINITIONS-->"
+            "<!--PYREBALL_REPORT_CONTENTS--></html>"
+        ),
+        title="t1",
+        css_definitions="c1",
+    )
+    assert result_begin == "<html>t1c1"
+    assert result_end == "</html>"
@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from pyreball.utils.trace import (
+    SCRIPT_START_ENV_VARIABLE,
+    TRACE_EVENTS_ENV_VARIABLE,
+    get_trace_events_path,
+    is_tracing_enabled,
+    mark_script_start,
+    start_tracing,
+    trace_script_startup,
+    trace_span,
+    write_trace,
+)
+
+
+@pytest.fixture
+def clean_trace_environment(monkeypatch):
+    # the variables set by the tested functions are removed after the test
+    monkeypatch.delenv(TRACE_EVENTS_ENV_VARIABLE, raising=False)
+    monkeypatch.delenv(SCRIPT_START_ENV_VARIABLE, raising=False)
+    monkeypatch.setattr("pyreball.utils.trace._script_startup_traced", False)
+
+
+def test_trace_span__disabled(tmp_path, clean_trace_environment):
+    with trace_span("span", "test"):
+        pass
+    mark_script_start()
+    trace_script_startup("report.html")
+    assert not is_tracing_enabled()
+    assert os.listdir(tmp_path) == []
+
+
+def test_trace(tmp_path, clean_trace_environment):
+    trace_path = tmp_path / "trace.json"
+    start_tracing(trace_path)
+    assert is_tracing_enabled()
+    mark_script_start()
+    args = {"bytes": 0}
+    with trace_span("outer", "cli", report="report.html"):
+        with trace_span("inner", "print", report="report.html", args=args):
+            # the arguments are read when the span ends
+            args["bytes"] = 10
+        trace_script_startup("report.html")
+        trace_script_startup("report.html")
+    write_trace(trace_path)
+
+    assert not is_tracing_enabled()
+    assert not get_trace_events_path(trace_path).exists()
+    with open(trace_path) as f:
+        trace = json.load(f)
+    metadata_event, *events = trace["traceEvents"]
+    assert metadata_event == {
+        "name": "process_name",
+        "ph": "M",
+        "pid": os.getpid(),
+        "args": {"name": "pyreball"},
+    }
+    # sorted by the start time
+    assert [event["name"] for event in events] == ["script startup", "outer", "inner"]
+    assert all(event["ph"] == "X" and event["pid"] == os.getpid() for event in events)
+    script_startup, outer, inner = events
+    assert inner["args"] == {"report": "report.html", "bytes": 10}
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert script_startup["cat"] == "script"
+
+
+def test_write_trace__other_processes(tmp_path, clean_trace_environment):
+    trace_path = tmp_path / "trace.json"
+    start_tracing(trace_path)
+    with open(get_trace_events_path(trace_path), "a") as f:
+        for report in ["a.html", "b.html", "a.html"]:
+            event = {"name": "print", "ph": "X", "ts": 1, "dur": 1, "pid": 0}
+            f.write(json.dumps({**event, "args": {"report": report}}) + "\n")
+    write_trace(trace_path)
+    with open(trace_path) as f:
+        trace = json.load(f)
+    assert trace["traceEvents"][0]["args"] == {"name": "report a.html, b.html"}